@@ -6,18 +6,21 @@ Suporta operações de mercado, saldo, histórico e análise de dados
 
 import os
 import time
-import hmac
-import hashlib
-import base64
 import json
 import requests
 import logging
+import threading
 from pathlib import Path
 from typing import List, Dict, Any, Optional, Callable, Tuple
 from functools import wraps
-from datetime import datetime, timedelta
+from datetime import datetime
 from urllib.parse import urlencode
 
+try:
+    from .http_session import http_get as _http_get, http_post as _http_post
+except ImportError:
+    from http_session import http_get as _http_get, http_post as _http_post
+
 # ====================== CONFIGURAÇÃO DE LOGGING ======================
 LOG_DIR = Path(__file__).resolve().parent / "logs"
 LOG_DIR.mkdir(parents=True, exist_ok=True)
@@ -107,7 +110,8 @@ def _get_secret(key, default=""):
         except Exception:
             pass
         return default
-    except (ImportError, AttributeError):
+    except (ImportError, AttributeError, FileNotFoundError):
+        # FileNotFoundError: streamlit instalado mas sem secrets.toml (CLI, testes)
         return default
 
 # ====================== API CREDENTIALS ======================
@@ -128,17 +132,35 @@ WEBHOOK_DRYRUN = int(_get_secret("WEBHOOK_DRYRUN", "0"))
 TRADES_DB = _get_secret("TRADES_DB", "")
 
 # ====================== RATE LIMITING ======================
-_last_request_time = 0
-_min_request_interval = 0.1  # 100ms entre requests
-
-def rate_limit():
-    """Rate limiting para evitar throttling da API"""
-    global _last_request_time
-    now = time.time()
-    elapsed = now - _last_request_time
-    if elapsed < _min_request_interval:
-        time.sleep(_min_request_interval - elapsed)
-    _last_request_time = time.time()
+try:
+    from .rate_limiter import acquire_for as _rl_acquire, get_limiter as _rl_get_limiter
+except ImportError:
+    from rate_limiter import acquire_for as _rl_acquire, get_limiter as _rl_get_limiter
+
+try:
+    from .api_metrics import mark_retry as _metrics_mark_retry, snapshot as _metrics_snapshot
+except ImportError:
+    from api_metrics import mark_retry as _metrics_mark_retry, snapshot as _metrics_snapshot
+
+
+def rate_limit(endpoint: str = None, method: str = "GET", block: bool = True) -> bool:
+    """Rate limiting para evitar throttling da API.
+
+    Consome o peso de ``endpoint`` do pool correspondente (public/spot/management)
+    num token bucket compartilhado por todos os processos do host; espera só o
+    necessário. Sem ``endpoint`` conta como chamada pública de peso 1.
+    """
+    return _rl_acquire(endpoint, method, block=block)
+
+
+def rate_limit_snapshot() -> Dict[str, Any]:
+    """Nível atual dos baldes de rate limit (para métricas/diagnóstico)."""
+    return _rl_get_limiter().snapshot()
+
+
+def api_metrics_snapshot() -> Dict[str, Any]:
+    """Latência/status/erros por endpoint das chamadas deste processo."""
+    return _metrics_snapshot()
 
 # ====================== RETRY DECORATOR ======================
 def retry_on_failure(max_retries: int = 3, backoff: float = 2.0):
@@ -156,6 +178,7 @@ def retry_on_failure(max_retries: int = 3, backoff: float = 2.0):
                     wait_time = backoff ** attempt
                     logger.warning(f"⚠️ Attempt {attempt + 1} failed, retrying in {wait_time}s: {e}")
                     time.sleep(wait_time)
+                    _metrics_mark_retry()
                 except Exception as e:
                     logger.error(f"❌ Unexpected error in {func.__name__}: {e}")
                     raise
@@ -164,6 +187,19 @@ def retry_on_failure(max_retries: int = 3, backoff: float = 2.0):
     return decorator
 
 # ====================== HELPER FUNCTIONS ======================
+def _api_async():
+    """Módulo ``api_async`` se o aiohttp estiver instalado (import tardio: evita ciclo)."""
+    if str(os.environ.get("KUCOIN_ASYNC", "1")).strip().lower() in ("0", "false", "no", "off"):
+        return None
+    try:
+        try:
+            from . import api_async
+        except ImportError:
+            import api_async
+    except Exception:
+        return None
+    return api_async if api_async.available() else None
+
 def _base_url() -> str:
     """Retorna URL base da API"""
     return KUCOIN_BASE
@@ -203,187 +239,168 @@ def validate_credentials():
         )
 
 # ====================== TIME SYNC ======================
-# Cache do offset de tempo entre servidor e local para evitar chamadas repetidas
-_time_offset_ms: int = 0  # offset = server_time - local_time
-_time_offset_updated: float = 0.0  # quando foi atualizado
-_TIME_OFFSET_TTL: float = 300.0  # atualizar offset a cada 5 minutos
-_time_sync_failures: int = 0  # contador de falhas consecutivas
+# O offset servidor/local é mantido por uma thread (clock_sync); assinar só lê memória.
+try:
+    from .clock_sync import get_clock as _get_clock
+except ImportError:
+    from clock_sync import get_clock as _get_clock
+
+_CLOCK_WARMUP: float = float(os.environ.get("KUCOIN_CLOCK_WARMUP", "2") or 2)
+_clock_warmed: bool = False
 
 
 def _sync_time_offset() -> bool:
-    """Sincroniza o offset de tempo com o servidor KuCoin.
-    
-    Retorna True se sincronizou com sucesso, False caso contrário.
-    """
-    global _time_offset_ms, _time_offset_updated, _time_sync_failures
-    
-    try:
-        rate_limit()
-        local_before = int(time.time() * 1000)
-        r = requests.get(f"{KUCOIN_BASE}/api/v1/timestamp", timeout=10)
-        local_after = int(time.time() * 1000)
-        
-        if r.status_code == 200:
-            server_time = int(r.json().get("data", 0))
-            if server_time > 0:
-                # Usar média do tempo local para calcular offset
-                local_avg = (local_before + local_after) // 2
-                _time_offset_ms = server_time - local_avg
-                _time_offset_updated = time.time()
-                _time_sync_failures = 0
-                
-                if abs(_time_offset_ms) > 1000:
-                    logger.info(f"🕐 Time offset synchronized: {_time_offset_ms}ms")
-                return True
-    except Exception as e:
-        _time_sync_failures += 1
-        logger.warning(f"⚠️ Time sync failed (attempt {_time_sync_failures}): {e}")
-    
-    return False
+    """Força uma rodada de sincronização agora (bloqueante; fora do caminho de assinatura)."""
+    return _get_clock().refresh()
 
 
-def _get_synced_timestamp() -> int:
-    """Obtém timestamp sincronizado com o servidor.
-    
-    Usa cache de offset para evitar chamadas repetidas ao servidor.
-    Se não conseguir sincronizar, usa tempo local com offset anterior.
+def _server_time() -> int:
+    """Timestamp do servidor estimado em milliseconds, sem I/O de rede.
+
+    Só o primeiro uso no processo espera (até KUCOIN_CLOCK_WARMUP segundos) a
+    primeira sincronização da thread de fundo; depois é leitura de memória.
     """
-    global _time_offset_ms, _time_offset_updated, _time_sync_failures
-    
-    now = time.time()
-    
-    # Verificar se precisa re-sincronizar
-    needs_sync = (
-        _time_offset_updated == 0.0 or  # nunca sincronizou
-        (now - _time_offset_updated) > _TIME_OFFSET_TTL or  # TTL expirado
-        (_time_sync_failures > 0 and _time_sync_failures < 3)  # retry após falha
-    )
-    
-    if needs_sync:
-        _sync_time_offset()
-    
-    # Retornar tempo local + offset (mesmo que offset seja 0)
-    return int(now * 1000) + _time_offset_ms
+    global _clock_warmed
+    clock = _get_clock()
+    if not _clock_warmed:
+        clock.wait_synced(_CLOCK_WARMUP)
+        _clock_warmed = True
+    return clock.now_ms()
 
 
-@retry_on_failure(max_retries=2)
-def _server_time() -> int:
-    """Obtém timestamp sincronizado em milliseconds.
-    
-    Usa sistema de cache de offset para melhor performance e resiliência.
-    """
-    return _get_synced_timestamp()
+_get_synced_timestamp = _server_time
+
+
+def start_clock_sync() -> None:
+    """Inicia a sincronização de relógio em background (idempotente)."""
+    _get_clock()
+
+
+def clock_sync_snapshot() -> Dict[str, Any]:
+    """Offset, RTT, deriva e idade da sincronização de relógio (para métricas)."""
+    return _get_clock().stats()
+
+# ====================== SIGNING ======================
+try:
+    from .signing import Signer
+except ImportError:
+    from signing import Signer
+
+_signer: Optional[Signer] = None
+_signer_creds: Optional[tuple] = None
+_signer_lock = threading.Lock()
+
+
+def get_signer() -> Signer:
+    """``Signer`` das credenciais atuais (criado e validado uma vez por conjunto)."""
+    global _signer, _signer_creds
+    creds = (API_KEY, API_SECRET, API_PASSPHRASE, API_KEY_VERSION)
+    signer = _signer
+    if signer is not None and _signer_creds == creds:
+        return signer
+    validate_credentials()
+    with _signer_lock:
+        if _signer is None or _signer_creds != creds:
+            _signer = Signer(*creds)
+            _signer_creds = creds
+        return _signer
+
 
 def _build_headers(method: str, endpoint: str, body_str: str = "", use_server_time: bool = True) -> Dict[str, str]:
     """Constrói headers para endpoints privados (suporta V1 e V2).
 
-    `use_server_time=False` evita chamada ao endpoint de timestamp e usa o relógio local.
+    `use_server_time=False` usa o relógio local em vez do offset do servidor.
     Útil para telas/UI onde preferimos falhar rápido ao invés de bloquear o render.
     """
-    validate_credentials()
-
-    ts = str(_server_time() if use_server_time else int(time.time() * 1000))
-    method_up = method.upper()
-    to_sign = ts + method_up + endpoint + (body_str or "")
-    
-    signature = base64.b64encode(
-        hmac.new(API_SECRET.encode(), to_sign.encode(), hashlib.sha256).digest()
-    ).decode()
-    
-    # V1: passphrase em plain text
-    # V2: passphrase encriptada com HMAC-SHA256
-    if API_KEY_VERSION == "1":
-        passphrase = API_PASSPHRASE
-    else:
-        passphrase = base64.b64encode(
-            hmac.new(API_SECRET.encode(), API_PASSPHRASE.encode(), hashlib.sha256).digest()
-        ).decode()
-
-    return {
-        "KC-API-KEY": API_KEY,
-        "KC-API-SIGN": signature,
-        "KC-API-TIMESTAMP": ts,
-        "KC-API-PASSPHRASE": passphrase,
-        "KC-API-KEY-VERSION": API_KEY_VERSION,
-        "Content-Type": "application/json"
-    }
+    signer = get_signer()
+    ts = _server_time() if use_server_time else int(time.time() * 1000)
+    return signer.headers(method, endpoint, body_str, ts)
 
 
+def build_headers_batch(requests_: List[tuple], use_server_time: bool = True) -> List[Dict[str, str]]:
+    """Headers de ``(method, endpoint[, body])`` em lote, com um único timestamp."""
+    signer = get_signer()
+    ts = _server_time() if use_server_time else int(time.time() * 1000)
+    return signer.headers_many(requests_, ts)
 
 
 # ====================== PUBLIC ENDPOINTS ======================
 
-@retry_on_failure(max_retries=2)
-def get_orderbook_price(symbol: str) -> Optional[Dict[str, Any]]:
-    url = f"{KUCOIN_BASE}/api/v1/market/orderbook/level1?symbol={symbol}"
-
-    try:
-        rate_limit()
-        r = requests.get(url, timeout=5)
-        r.raise_for_status()
-        j = r.json()
-    except Exception as e:
-        logger.warning(f"⚠️ Error fetching orderbook for {symbol}: {e}")
-        return None
-
-    # 🔑 VALIDAÇÃO OBRIGATÓRIA DA KUCOIN
-    if not isinstance(j, dict) or j.get("code") != "200000":
-        logger.error(f"❌ KuCoin API error ({symbol}): {j}")
-        return None
-
-    data = j.get("data")
-    # KuCoin sometimes returns {code:200000, data:null} for unsupported symbols.
-    # This is not an app error; treat it as "no market data".
-    if data is None:
-        logger.debug(f"No orderbook data for {symbol} (data=null)")
-        return None
-    if not isinstance(data, dict):
-        logger.debug(f"Invalid orderbook payload type for {symbol}: {type(data)}")
-        return None
+def _parse_level1(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Extrai mid/ask/bid/timestamp do payload de ``orderbook/level1``."""
+    out: Dict[str, Any] = {}
 
-    
-    out = {}
-    
     # Mid price
     for k in ("price", "last", "lastPrice", "close"):
         if k in data and data[k] is not None:
             try:
                 out["mid_price"] = float(data[k])
                 break
-            except:
+            except Exception:
                 pass
-    
+
     # Best ask
     for ka in ("bestAsk", "best_ask", "ask"):
         if ka in data and data[ka] is not None:
             try:
                 out["best_ask"] = float(data[ka])
                 break
-            except:
+            except Exception:
                 pass
-    
+
     # Best bid
     for kb in ("bestBid", "best_bid", "bid"):
         if kb in data and data[kb] is not None:
             try:
                 out["best_bid"] = float(data[kb])
                 break
-            except:
+            except Exception:
                 pass
-    
+
     # Calcula mid_price se não encontrou
     if "mid_price" not in out and "best_ask" in out and "best_bid" in out:
         out["mid_price"] = (out["best_ask"] + out["best_bid"]) / 2.0
-    
+
     # Timestamp
     for kt in ("timestamp", "time", "ts"):
         if kt in data and data[kt] is not None:
             try:
                 out["timestamp"] = int(data[kt])
                 break
-            except:
+            except Exception:
                 pass
-    
+    return out
+
+
+@retry_on_failure(max_retries=2)
+def get_orderbook_price(symbol: str) -> Optional[Dict[str, Any]]:
+    url = f"{KUCOIN_BASE}/api/v1/market/orderbook/level1?symbol={symbol}"
+
+    try:
+        rate_limit("/api/v1/market/orderbook/level1")
+        r = _http_get(url, timeout=5)
+        r.raise_for_status()
+        j = r.json()
+    except Exception as e:
+        logger.warning(f"⚠️ Error fetching orderbook for {symbol}: {e}")
+        return None
+
+    # 🔑 VALIDAÇÃO OBRIGATÓRIA DA KUCOIN
+    if not isinstance(j, dict) or j.get("code") != "200000":
+        logger.error(f"❌ KuCoin API error ({symbol}): {j}")
+        return None
+
+    data = j.get("data")
+    # KuCoin sometimes returns {code:200000, data:null} for unsupported symbols.
+    # This is not an app error; treat it as "no market data".
+    if data is None:
+        logger.debug(f"No orderbook data for {symbol} (data=null)")
+        return None
+    if not isinstance(data, dict):
+        logger.debug(f"Invalid orderbook payload type for {symbol}: {type(data)}")
+        return None
+
+    out = _parse_level1(data)
     if not out:
         logger.warning(f"⚠️ Could not extract price data for {symbol}")
         return None
@@ -398,8 +415,8 @@ def get_orderbook_price_fast(symbol: str, timeout: float = 1.5) -> Optional[Dict
     url = f"{KUCOIN_BASE}/api/v1/market/orderbook/level1?symbol={symbol}"
 
     try:
-        rate_limit()
-        r = requests.get(url, timeout=float(timeout))
+        rate_limit("/api/v1/market/orderbook/level1")
+        r = _http_get(url, timeout=float(timeout))
         r.raise_for_status()
         j = r.json()
     except Exception as e:
@@ -418,43 +435,7 @@ def get_orderbook_price_fast(symbol: str, timeout: float = 1.5) -> Optional[Dict
     if not isinstance(data, dict):
         return None
 
-    out: Dict[str, Any] = {}
-
-    for k in ("price", "last", "lastPrice", "close"):
-        if k in data and data[k] is not None:
-            try:
-                out["mid_price"] = float(data[k])
-                break
-            except Exception:
-                pass
-
-    for ka in ("bestAsk", "best_ask", "ask"):
-        if ka in data and data[ka] is not None:
-            try:
-                out["best_ask"] = float(data[ka])
-                break
-            except Exception:
-                pass
-
-    for kb in ("bestBid", "best_bid", "bid"):
-        if kb in data and data[kb] is not None:
-            try:
-                out["best_bid"] = float(data[kb])
-                break
-            except Exception:
-                pass
-
-    if "mid_price" not in out and "best_ask" in out and "best_bid" in out:
-        out["mid_price"] = (out["best_ask"] + out["best_bid"]) / 2.0
-
-    for kt in ("timestamp", "time", "ts"):
-        if kt in data and data[kt] is not None:
-            try:
-                out["timestamp"] = int(data[kt])
-                break
-            except Exception:
-                pass
-
+    out = _parse_level1(data)
     if not out:
         return None
     return out
@@ -495,8 +476,8 @@ def get_candles(symbol: str, ktype: str = "1hour", startAt: int = None,
     if endAt:
         url += f"&endAt={int(endAt)}"
     
-    rate_limit()
-    r = requests.get(url, timeout=timeout)
+    rate_limit("/api/v1/market/candles")
+    r = _http_get(url, timeout=timeout)
     if r.status_code != 200:
         raise RuntimeError(f"❌ Error fetching candles: {r.status_code} - {r.text}")
     
@@ -564,8 +545,8 @@ def get_candles_fast(
         url += f"&endAt={int(endAt)}"
 
     try:
-        rate_limit()
-        r = requests.get(url, timeout=float(timeout))
+        rate_limit("/api/v1/market/candles")
+        r = _http_get(url, timeout=float(timeout))
         r.raise_for_status()
         j = r.json()
         if not isinstance(j, dict) or j.get("code") != "200000":
@@ -586,8 +567,8 @@ def get_all_symbols() -> List[Dict[str, Any]]:
     url = f"{KUCOIN_BASE}/api/v1/symbols"
     
     try:
-        rate_limit()
-        r = requests.get(url, timeout=10)
+        rate_limit("/api/v1/symbols")
+        r = _http_get(url, timeout=10)
         r.raise_for_status()
         symbols = r.json().get("data", [])
         logger.info(f"✅ Fetched {len(symbols)} symbols")
@@ -614,24 +595,132 @@ def get_trading_pairs(quote_currency: str = "USDT") -> List[str]:
     logger.info(f"✅ Found {len(pairs)} active {quote_currency} pairs")
     return sorted(pairs)
 
-# ====================== PRIVATE ENDPOINTS ======================
+
+# ====================== MARKET SNAPSHOT ======================
+# Um único GET /market/allTickers cota todos os pares; o resultado fica em cache
+# por KUCOIN_TICKERS_TTL segundos e é compartilhado pelas threads do processo.
+_TICKERS_TTL = float(os.environ.get("KUCOIN_TICKERS_TTL", 30))
+_snapshot_lock = threading.Lock()
+_snapshot: Dict[str, Any] = {"ts": 0.0, "prices": {}}
+
 
 @retry_on_failure(max_retries=2)
-def get_fills(
+def get_all_tickers(timeout: float = 10.0) -> Dict[str, Any]:
+    """Retorna ``data`` de ``/api/v1/market/allTickers`` (``{"time", "ticker": [...]}``)."""
+    endpoint = "/api/v1/market/allTickers"
+    rate_limit(endpoint)
+    r = _http_get(KUCOIN_BASE + endpoint, timeout=timeout)
+    if r.status_code != 200:
+        raise RuntimeError(f"❌ Error fetching tickers: {r.status_code} - {r.text[:300]}")
+    j = r.json()
+    if not isinstance(j, dict) or j.get("code") != "200000":
+        raise RuntimeError(f"❌ KuCoin API error (allTickers): {j}")
+    return j.get("data") or {}
+
+
+def _tickers_to_prices(data: Dict[str, Any]) -> Dict[str, float]:
+    """``{símbolo: preço}`` (último negócio; sem ele, média de bid/ask)."""
+    prices: Dict[str, float] = {}
+    for t in (data or {}).get("ticker") or []:
+        symbol = t.get("symbol")
+        if not symbol:
+            continue
+        price = None
+        try:
+            price = float(t.get("last") or 0) or None
+        except (TypeError, ValueError):
+            pass
+        if price is None:
+            try:
+                bid, ask = float(t.get("buy") or 0), float(t.get("sell") or 0)
+                if bid > 0 and ask > 0:
+                    price = (bid + ask) / 2.0
+            except (TypeError, ValueError):
+                pass
+        if price:
+            prices[symbol] = price
+    return prices
+
+
+def get_market_snapshot(max_age: float = None) -> Dict[str, float]:
+    """Preços de todos os pares, com cache de ``max_age`` segundos (padrão KUCOIN_TICKERS_TTL).
+
+    Só uma thread atualiza por vez. Se a atualização falhar e existir um
+    snapshot anterior, ele é devolvido (com aviso) em vez de propagar o erro.
+    """
+    ttl = _TICKERS_TTL if max_age is None else float(max_age)
+    if _snapshot["prices"] and time.time() - _snapshot["ts"] < ttl:
+        return _snapshot["prices"]
+    with _snapshot_lock:
+        if _snapshot["prices"] and time.time() - _snapshot["ts"] < ttl:
+            return _snapshot["prices"]
+        try:
+            prices = _tickers_to_prices(get_all_tickers())
+        except Exception as e:
+            if _snapshot["prices"]:
+                age = time.time() - _snapshot["ts"]
+                logger.warning(f"⚠️ allTickers failed, using snapshot from {age:.0f}s ago: {e}")
+                return _snapshot["prices"]
+            raise
+        if prices:
+            _snapshot["prices"] = prices
+            _snapshot["ts"] = time.time()
+        return prices
+
+
+def usdt_value(currency: str, amount: float, prices: Dict[str, float]) -> Tuple[Optional[float], Optional[str]]:
+    """Valor de ``amount`` em USDT e o par usado (direto X-USDT/X-USDC, depois invertido)."""
+    if currency in ("USDT", "USDC"):
+        return float(amount), currency
+    for quote in ("USDT", "USDC"):
+        price = prices.get(f"{currency}-{quote}")
+        if price:
+            return amount * price, f"{currency}-{quote}"
+    for quote in ("USDT", "USDC"):
+        price = prices.get(f"{quote}-{currency}")
+        if price and price > 0:
+            return amount / price, f"{quote}-{currency} (inv)"
+    return None, None
+
+
+def value_accounts(accounts: List[Dict[str, Any]], prices: Dict[str, float]) -> Tuple[float, List[Dict[str, Any]]]:
+    """Converte contas da KuCoin para USDT usando um snapshot de preços."""
+    total_usdt = 0.0
+    rows = []
+    for acc in accounts:
+        curr = acc.get("currency")
+        balance = float(acc.get("balance", 0) or 0)
+        converted, used_pair = (None, None)
+        if balance > 0:
+            converted, used_pair = usdt_value(curr, balance, prices)
+            if converted is not None:
+                total_usdt += converted
+        rows.append({
+            "currency": curr,
+            "balance": balance,
+            "available": float(acc.get("available", 0) or 0),
+            "holds": float(acc.get("holds", 0) or 0),
+            "converted_usdt": round(converted, 6) if converted else 0.0,
+            "used_pair": used_pair,
+            "account_type": acc.get("type"),
+        })
+    return round(total_usdt, 6), rows
+
+# ====================== PRIVATE ENDPOINTS ======================
+
+def _fills_params(
     symbol: str | None = None,
     start_at: int | None = None,
     end_at: int | None = None,
     page_size: int = 100,
     current_page: int = 1,
+    clamp_to_recent: bool = True,
 ) -> Dict[str, Any]:
-    """Busca execuções (fills) da conta.
+    """Query string de ``/api/v1/fills`` já saneada (ms, pageSize >= 10, janela de 7 dias).
 
-    Observação: start_at/end_at são timestamps em MILISSEGUNDOS.
+    Com ``clamp_to_recent=False`` janelas antigas são mantidas (só o tamanho de
+    7 dias e o ``endAt`` no futuro são corrigidos), para sincronizar histórico.
     """
-    validate_credentials()
-
-    endpoint = "/api/v1/fills"
-
     def _normalize_ms_ts(v: int | None) -> int | None:
         if v is None:
             return None
@@ -684,13 +773,14 @@ def get_fills(
             if end_ms > now_ms:
                 end_ms = now_ms
 
-            # If endAt is too old (outside the permitted window), move it to now.
-            if end_ms < now_ms - max_range_ms:
-                end_ms = now_ms
+            if clamp_to_recent:
+                # If endAt is too old (outside the permitted window), move it to now.
+                if end_ms < now_ms - max_range_ms:
+                    end_ms = now_ms
 
-            # Clamp startAt to the permitted window.
-            if start_ms < now_ms - max_range_ms:
-                start_ms = now_ms - max_range_ms
+                # Clamp startAt to the permitted window.
+                if start_ms < now_ms - max_range_ms:
+                    start_ms = now_ms - max_range_ms
 
             # Ensure the range itself is within max_range_ms.
             if end_ms - start_ms > max_range_ms:
@@ -703,13 +793,36 @@ def get_fills(
     if end_ms is not None:
         params["endAt"] = int(end_ms)
 
+    return params
+
+
+@retry_on_failure(max_retries=2)
+def get_fills(
+    symbol: str | None = None,
+    start_at: int | None = None,
+    end_at: int | None = None,
+    page_size: int = 100,
+    current_page: int = 1,
+    clamp_to_recent: bool = True,
+) -> Dict[str, Any]:
+    """Busca execuções (fills) da conta.
+
+    Observação: start_at/end_at são timestamps em MILISSEGUNDOS. Por padrão o
+    intervalo é trazido para os últimos 7 dias; ``clamp_to_recent=False``
+    consulta a janela pedida (ver ``fills_sync``).
+    """
+    validate_credentials()
+
+    endpoint = "/api/v1/fills"
+    params = _fills_params(symbol, start_at, end_at, page_size, current_page, clamp_to_recent)
+
     qs = urlencode(params)
     signed_endpoint = f"{endpoint}?{qs}" if qs else endpoint
     url = f"{KUCOIN_BASE}{signed_endpoint}"
 
+    rate_limit(endpoint)
     headers = _build_headers("GET", signed_endpoint)
-    rate_limit()
-    r = requests.get(url, headers=headers, timeout=12)
+    r = _http_get(url, headers=headers, timeout=12)
     if r.status_code != 200:
         raise RuntimeError(f"❌ API fills error: {r.status_code} - {r.text}")
     j = r.json()
@@ -769,14 +882,14 @@ def get_accounts_raw() -> List[Dict[str, Any]]:
         Lista de contas com saldos
     """
     endpoint = "/api/v1/accounts"
+    rate_limit(endpoint)
     headers = _build_headers("GET", endpoint, "")
-    rate_limit()
     try:
         logger.debug("[DEBUG KuCoin get_accounts_raw()] URL: %s", KUCOIN_BASE + endpoint)
         logger.debug("[DEBUG KuCoin get_accounts_raw()] HEADERS: %s", _mask_headers_for_log(headers))
     except Exception:
         pass
-    r = requests.get(KUCOIN_BASE + endpoint, headers=headers, timeout=15)
+    r = _http_get(KUCOIN_BASE + endpoint, headers=headers, timeout=15)
     try:
         logger.debug("[DEBUG KuCoin get_accounts_raw()] STATUS: %s", r.status_code)
         # Log a truncated payload (avoid leaking secrets in unexpected places)
@@ -795,9 +908,9 @@ def get_accounts_raw() -> List[Dict[str, Any]]:
 def get_accounts_raw_fast(timeout: float = 4.0) -> List[Dict[str, Any]]:
     """Versão *sem retry* e com timeout curto (ideal para Streamlit/UI)."""
     endpoint = "/api/v1/accounts"
+    rate_limit(endpoint)
     headers = _build_headers("GET", endpoint, "", use_server_time=False)
-    rate_limit()
-    r = requests.get(KUCOIN_BASE + endpoint, headers=headers, timeout=float(timeout))
+    r = _http_get(KUCOIN_BASE + endpoint, headers=headers, timeout=float(timeout))
     if r.status_code != 200:
         raise RuntimeError(f"❌ API accounts error [fast]: {r.status_code} - {r.text}")
     return r.json().get("data", [])
@@ -880,66 +993,8 @@ def get_balance(details: bool = False) -> Any:
     """
     try:
         accounts = get_accounts_raw()
-        total_usdt = 0.0
-        rows = []
-        
-        for acc in accounts:
-            curr = acc.get("currency")
-            balance = float(acc.get("balance", 0) or 0)
-            available = float(acc.get("available", 0) or 0)
-            holds = float(acc.get("holds", 0) or 0)
-
-            converted = None
-            used_pair = None
-
-            if balance > 0:
-                if curr in ("USDT", "USDC"):
-                    converted = balance
-                    used_pair = curr
-                    total_usdt += converted
-                else:
-                    # Tenta pares diretos
-                    for quote in ("USDT", "USDC"):
-                        symbol = f"{curr}-{quote}"
-                        try:
-                            ob = get_orderbook_price(symbol)
-                            if ob and isinstance(ob, dict):
-                                price = ob.get("mid_price")
-                                if price:
-                                    converted = balance * price
-                                    used_pair = symbol
-                                    total_usdt += converted
-                                    break
-                        except:
-                            continue
-                    
-                    # Tenta pares invertidos
-                    if converted is None:
-                        for quote in ("USDT", "USDC"):
-                            symbol = f"{quote}-{curr}"
-                            try:
-                                ob = get_orderbook_price(symbol)
-                                if ob and isinstance(ob, dict):
-                                    price = ob.get("mid_price")
-                                    if price and price > 0:
-                                        converted = balance / price
-                                        used_pair = f"{symbol} (inv)"
-                                        total_usdt += converted
-                                        break
-                            except:
-                                continue
-
-            rows.append({
-                "currency": curr,
-                "balance": balance,
-                "available": available,
-                "holds": holds,
-                "converted_usdt": round(converted, 6) if converted else 0.0,
-                "used_pair": used_pair,
-                "account_type": acc.get("type")
-            })
-
-        total_usdt = round(total_usdt, 6)
+        # Uma chamada (allTickers, em cache) cota todas as moedas.
+        total_usdt, rows = value_accounts(accounts, get_market_snapshot())
         logger.info(f"💰 Total balance: ${total_usdt:,.2f} USDT")
         
         if details:
@@ -950,6 +1005,28 @@ def get_balance(details: bool = False) -> Any:
         logger.error(f"❌ Error getting balance: {e}")
         raise
 
+def _market_order_body(symbol: str, side: str, funds: float = None,
+                       size: float = None, client_oid: str = None) -> str:
+    """Corpo JSON (compacto, como é assinado) de uma ordem de mercado."""
+    if client_oid is None:
+        client_oid = f"bot_{int(time.time() * 1e6)}"
+    
+    payload = {
+        "clientOid": client_oid,
+        "side": side.lower(),
+        "symbol": symbol,
+        "type": "market",
+    }
+    
+    if funds is not None:
+        payload["funds"] = str(round(float(funds), 8))
+    elif size is not None:
+        payload["size"] = str(round(float(size), 12))
+    else:
+        raise ValueError("❌ Must specify either 'funds' or 'size'")
+    
+    return json.dumps(payload, separators=(",", ":"))
+
 @retry_on_failure(max_retries=3)
 def place_market_order(symbol: str, side: str, funds: float = None, 
                        size: float = None, client_oid: str = None) -> Dict[str, Any]:
@@ -969,31 +1046,12 @@ def place_market_order(symbol: str, side: str, funds: float = None,
     validate_credentials()
     
     endpoint = "/api/v1/orders"
-    
-    if client_oid is None:
-        client_oid = f"bot_{int(time.time() * 1e6)}"
-    
-    payload = {
-        "clientOid": client_oid,
-        "side": side.lower(),
-        "symbol": symbol,
-        "type": "market",
-    }
-    
-    if funds is not None:
-        payload["funds"] = str(round(float(funds), 8))
-    elif size is not None:
-        payload["size"] = str(round(float(size), 12))
-    else:
-        raise ValueError("❌ Must specify either 'funds' or 'size'")
-    
-    body_str = json.dumps(payload, separators=(",", ":"))
-    headers = _build_headers("POST", endpoint, body_str)
-    
+    body_str = _market_order_body(symbol, side, funds, size, client_oid)
     logger.info(f"📤 Placing {side.upper()} order: {symbol} - funds={funds}, size={size}")
     
-    rate_limit()
-    r = requests.post(KUCOIN_BASE + endpoint, headers=headers, 
+    rate_limit(endpoint, "POST")
+    headers = _build_headers("POST", endpoint, body_str)
+    r = _http_post(KUCOIN_BASE + endpoint, headers=headers, 
                      data=body_str, timeout=15)
     
     if r.status_code not in (200, 201):
@@ -1027,10 +1085,9 @@ def get_order_details(order_id: str) -> Optional[Dict[str, Any]]:
     validate_credentials()
     
     endpoint = f"/api/v1/orders/{order_id}"
+    rate_limit(endpoint)
     headers = _build_headers("GET", endpoint, "")
-    
-    rate_limit()
-    r = requests.get(KUCOIN_BASE + endpoint, headers=headers, timeout=10)
+    r = _http_get(KUCOIN_BASE + endpoint, headers=headers, timeout=10)
     
     if r.status_code != 200:
         logger.warning(f"⚠️ Error fetching order {order_id}: {r.status_code}")
@@ -1071,10 +1128,9 @@ def get_recent_orders(symbol: str = None, status: str = None,
     if params:
         endpoint += "?" + "&".join(params)
     
+    rate_limit(endpoint)
     headers = _build_headers("GET", endpoint, "")
-    
-    rate_limit()
-    r = requests.get(KUCOIN_BASE + endpoint, headers=headers, timeout=15)
+    r = _http_get(KUCOIN_BASE + endpoint, headers=headers, timeout=15)
     
     if r.status_code != 200:
         logger.error(f"❌ Error fetching orders: {r.status_code}")
@@ -1120,10 +1176,9 @@ def get_account_history(currency: str = None, start_at: int = None,
     if params:
         endpoint += "?" + "&".join(params)
     
+    rate_limit(endpoint)
     headers = _build_headers("GET", endpoint, "")
-    
-    rate_limit()
-    r = requests.get(KUCOIN_BASE + endpoint, headers=headers, timeout=15)
+    r = _http_get(KUCOIN_BASE + endpoint, headers=headers, timeout=15)
     
     if r.status_code != 200:
         logger.error(f"❌ Error fetching account history: {r.status_code}")
@@ -1203,6 +1258,15 @@ def get_market_overview(symbols: List[str] = None) -> List[Dict[str, Any]]:
     if symbols is None:
         symbols = ["BTC-USDT", "ETH-USDT", "BNB-USDT", "SOL-USDT", "XRP-USDT"]
     
+    aio = _api_async()
+    if aio is not None:
+        try:
+            overview = aio.fetch_market_overview(list(symbols))
+            logger.info(f"📈 Market overview: {len(overview)} symbols fetched")
+            return overview
+        except Exception as e:
+            logger.warning(f"⚠️ Async market overview failed, falling back to sequential: {e}")
+    
     overview = []
     
     for symbol in symbols:
@@ -1234,7 +1298,7 @@ __all__ = [
     
     # Public
     'get_orderbook_price', 'get_price', 'get_candles', 'get_candles_safe',
-    'get_all_symbols', 'get_trading_pairs',
+    'get_all_symbols', 'get_trading_pairs', 'get_all_tickers', 'get_market_snapshot',
     
     # Private
     'get_accounts_raw', 'get_balances', 'get_balance', 
@@ -1245,7 +1309,9 @@ __all__ = [
     'get_portfolio_summary', 'get_market_overview',
     
     # Utils
-    '_has_keys', '_base_url', 'validate_credentials'
+    '_has_keys', '_base_url', 'validate_credentials',
+    'rate_limit_snapshot', 'start_clock_sync', 'clock_sync_snapshot',
+    'api_metrics_snapshot',
 ]
 
 # ====================== SELF-TEST ======================
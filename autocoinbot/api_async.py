@@ -0,0 +1,345 @@
+# api_async.py
+# Variante asyncio do cliente KuCoin (consultas multi-símbolo concorrentes)
+
+"""
+Cliente KuCoin assíncrono (``aiohttp``) com a mesma superfície de ``api.py``:
+orderbook, candles, fills, contas e ordens.
+
+Assinatura (``api._build_headers``), saneamento de parâmetros e parsing são
+os mesmos do cliente síncrono, e cada requisição consome o mesmo token bucket
+compartilhado (``rate_limiter``) — a espera é feita com ``asyncio.sleep``, sem
+bloquear o loop. Assim buscar 20 símbolos custa ~1 RTT em vez de 20.
+
+Uso assíncrono:
+    async with AsyncKucoinClient() as client:
+        prices = await client.get_orderbook_prices(["BTC-USDT", "ETH-USDT"])
+
+Uso a partir de código síncrono (UI, bots):
+    prices = api_async.fetch_orderbook_prices(["BTC-USDT", "ETH-USDT"])
+
+``aiohttp`` é opcional: sem ele ``available()`` retorna False e os chamadores
+de ``api.py`` continuam no caminho sequencial.
+"""
+
+import json
+import time
+import asyncio
+import logging
+import threading
+from typing import Any, Awaitable, Dict, Iterable, List, Optional
+from urllib.parse import urlencode
+
+try:
+    import aiohttp
+except ImportError:  # dependência opcional
+    aiohttp = None
+
+try:
+    from . import api
+    from .rate_limiter import penalize_for as _rl_penalize, reserve_for as _rl_reserve
+    from .http_session import USER_AGENT, default_timeout
+    from .api_metrics import get_api_metrics, kucoin_code, metrics_enabled
+except ImportError:
+    import api
+    from rate_limiter import penalize_for as _rl_penalize, reserve_for as _rl_reserve
+    from http_session import USER_AGENT, default_timeout
+    from api_metrics import get_api_metrics, kucoin_code, metrics_enabled
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONCURRENCY = 16
+_METRICS = metrics_enabled()
+
+
+class KucoinAsyncError(RuntimeError):
+    """Resposta HTTP/KuCoin inválida no cliente assíncrono."""
+
+
+def available() -> bool:
+    return aiohttp is not None
+
+
+class AsyncKucoinClient:
+    """Sessão ``aiohttp`` com keep-alive, limite de concorrência e rate limit compartilhado."""
+
+    def __init__(self, concurrency: int = DEFAULT_CONCURRENCY, timeout: Optional[float] = None,
+                 max_retries: int = 2, backoff: float = 2.0):
+        if aiohttp is None:
+            raise RuntimeError("aiohttp não instalado (pip install aiohttp)")
+        self.concurrency = max(1, int(concurrency))
+        connect, read = default_timeout()
+        self.timeout = float(timeout) if timeout is not None else float(read)
+        self.connect_timeout = float(connect)
+        self.max_retries = max(1, int(max_retries))
+        self.backoff = float(backoff)
+        self._session: Optional["aiohttp.ClientSession"] = None
+        self._sem: Optional[asyncio.Semaphore] = None
+
+    async def __aenter__(self) -> "AsyncKucoinClient":
+        await self.open()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def open(self):
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.concurrency, ttl_dns_cache=300),
+                headers={"User-Agent": USER_AGENT},
+            )
+            self._sem = asyncio.Semaphore(self.concurrency)
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    # ---------- núcleo ----------
+
+    async def _throttle(self, endpoint: str, method: str, max_wait: Optional[float]) -> bool:
+        wait = _rl_reserve(endpoint, method, max_wait=max_wait)
+        if wait is None:
+            return False
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return True
+
+    async def _request(
+        self,
+        method: str,
+        endpoint: str,
+        params: Optional[Dict[str, Any]] = None,
+        body: str = "",
+        signed: bool = False,
+        timeout: Optional[float] = None,
+        retries: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        """Executa uma chamada e devolve o JSON (``code == 200000``) ou levanta ``KucoinAsyncError``."""
+        await self.open()
+        qs = urlencode(params) if params else ""
+        path = f"{endpoint}?{qs}" if qs else endpoint
+        url = f"{api.KUCOIN_BASE}{path}"
+        client_timeout = aiohttp.ClientTimeout(
+            total=None, sock_connect=self.connect_timeout,
+            sock_read=float(timeout) if timeout is not None else self.timeout,
+        )
+        attempts = self.max_retries if retries is None else max(1, int(retries))
+
+        for attempt in range(attempts):
+            try:
+                async with self._sem:
+                    await self._throttle(endpoint, method, None)
+                    headers = {}
+                    if signed:
+                        # Assina depois da espera do rate limit (timestamp fresco). A
+                        # assinatura só lê memória; o 1º uso ainda pode esperar o relógio.
+                        if api._clock_warmed:
+                            headers = api._build_headers(method, path, body)
+                        else:
+                            headers = await asyncio.to_thread(api._build_headers, method, path, body)
+                    started = time.perf_counter()
+                    try:
+                        async with self._session.request(
+                            method, url, headers=headers, data=body or None, timeout=client_timeout
+                        ) as r:
+                            raw = await r.read()
+                    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                        if _METRICS:
+                            get_api_metrics().record(method, url, time.perf_counter() - started,
+                                                     error=type(e).__name__, retry=attempt > 0)
+                        raise
+                    if _METRICS:
+                        get_api_metrics().record(method, url, time.perf_counter() - started,
+                                                 status=r.status, bytes_in=len(raw), bytes_out=len(body or ""),
+                                                 code=kucoin_code(raw), retry=attempt > 0)
+                    if r.status == 429:
+                        _rl_penalize(endpoint, method, r.headers)
+                    text = raw.decode("utf-8", errors="replace")
+                    if r.status not in (200, 201):
+                        raise KucoinAsyncError(f"❌ {method} {endpoint}: {r.status} - {text[:300]}")
+                    j = json.loads(text)
+                if not isinstance(j, dict) or j.get("code") != "200000":
+                    raise KucoinAsyncError(f"❌ KuCoin API error ({endpoint}): {j}")
+                return j
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                if attempt == attempts - 1:
+                    raise KucoinAsyncError(f"❌ {method} {endpoint} failed after {attempts} attempts: {e}") from e
+                wait_time = self.backoff ** attempt
+                logger.warning(f"⚠️ Attempt {attempt + 1} failed, retrying in {wait_time}s: {e}")
+                await asyncio.sleep(wait_time)
+        raise KucoinAsyncError(f"❌ {method} {endpoint}: no response")
+
+    async def _gather(self, keys: List[str], coros: Iterable[Awaitable[Any]]) -> Dict[str, Any]:
+        """``{chave: resultado}``; falhas individuais viram None (logadas)."""
+        results = await asyncio.gather(*coros, return_exceptions=True)
+        out: Dict[str, Any] = {}
+        for key, res in zip(keys, results):
+            if isinstance(res, BaseException):
+                logger.warning(f"⚠️ Failed to get data for {key}: {res}")
+                out[key] = None
+            else:
+                out[key] = res
+        return out
+
+    # ---------- públicos ----------
+
+    async def get_orderbook_price(self, symbol: str, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        j = await self._request("GET", "/api/v1/market/orderbook/level1",
+                                {"symbol": symbol}, timeout=timeout)
+        data = j.get("data")
+        if not isinstance(data, dict):
+            return None
+        return api._parse_level1(data) or None
+
+    async def get_orderbook_prices(self, symbols: Iterable[str],
+                                   timeout: Optional[float] = None) -> Dict[str, Optional[Dict[str, Any]]]:
+        symbols = list(dict.fromkeys(symbols))
+        return await self._gather(symbols, (self.get_orderbook_price(s, timeout) for s in symbols))
+
+    async def get_candles(self, symbol: str, ktype: str = "1hour", startAt: int = None,
+                          endAt: int = None, timeout: Optional[float] = None) -> List[Any]:
+        params: Dict[str, Any] = {"type": ktype, "symbol": symbol}
+        if startAt:
+            params["startAt"] = int(startAt)
+        if endAt:
+            params["endAt"] = int(endAt)
+        j = await self._request("GET", "/api/v1/market/candles", params, timeout=timeout)
+        return j.get("data") or []
+
+    async def get_candles_many(self, symbols: Iterable[str], ktype: str = "1hour",
+                               startAt: int = None, endAt: int = None) -> Dict[str, Optional[List[Any]]]:
+        symbols = list(dict.fromkeys(symbols))
+        return await self._gather(
+            symbols, (self.get_candles(s, ktype, startAt, endAt) for s in symbols)
+        )
+
+    # ---------- privados ----------
+
+    async def get_fills(self, symbol: str | None = None, start_at: int | None = None,
+                        end_at: int | None = None, page_size: int = 100,
+                        current_page: int = 1) -> Dict[str, Any]:
+        api.validate_credentials()
+        params = api._fills_params(symbol, start_at, end_at, page_size, current_page)
+        return await self._request("GET", "/api/v1/fills", params, signed=True, timeout=12)
+
+    async def get_accounts_raw(self) -> List[Dict[str, Any]]:
+        api.validate_credentials()
+        j = await self._request("GET", "/api/v1/accounts", signed=True, timeout=15)
+        return j.get("data") or []
+
+    async def get_order_details(self, order_id: str) -> Optional[Dict[str, Any]]:
+        api.validate_credentials()
+        j = await self._request("GET", f"/api/v1/orders/{order_id}", signed=True)
+        return j.get("data")
+
+    async def get_orders_details(self, order_ids: Iterable[str]) -> Dict[str, Optional[Dict[str, Any]]]:
+        order_ids = list(dict.fromkeys(order_ids))
+        return await self._gather(order_ids, (self.get_order_details(o) for o in order_ids))
+
+    async def get_recent_orders(self, symbol: str = None, status: str = None,
+                                limit: int = 50) -> List[Dict[str, Any]]:
+        api.validate_credentials()
+        params: Dict[str, Any] = {}
+        if symbol:
+            params["symbol"] = symbol
+        if status:
+            params["status"] = status
+        if limit:
+            params["pageSize"] = min(limit, 500)
+        j = await self._request("GET", "/api/v1/orders", params, signed=True, timeout=15)
+        return (j.get("data") or {}).get("items", [])
+
+    async def place_market_order(self, symbol: str, side: str, funds: float = None,
+                                 size: float = None, client_oid: str = None) -> Dict[str, Any]:
+        api.validate_credentials()
+        body_str = api._market_order_body(symbol, side, funds, size, client_oid)
+        # Sem retry: reenviar um POST de ordem pode duplicá-la.
+        return await self._request("POST", "/api/v1/orders", body=body_str,
+                                   signed=True, timeout=15, retries=1)
+
+    # ---------- agregados ----------
+
+    async def get_market_overview(self, symbols: List[str]) -> List[Dict[str, Any]]:
+        books = await self.get_orderbook_prices(symbols)
+        return [_overview_row(s, books.get(s)) for s in symbols if books.get(s)]
+
+    async def get_all_tickers(self) -> Dict[str, Any]:
+        j = await self._request("GET", "/api/v1/market/allTickers")
+        return j.get("data") or {}
+
+    async def get_balance(self, details: bool = False) -> Any:
+        """Como ``api.get_balance``: contas e allTickers buscados em paralelo."""
+        accounts, tickers = await asyncio.gather(self.get_accounts_raw(), self.get_all_tickers())
+        total_usdt, rows = api.value_accounts(accounts, api._tickers_to_prices(tickers))
+        return (total_usdt, rows) if details else total_usdt
+
+
+def _overview_row(symbol: str, ob: Dict[str, Any]) -> Dict[str, Any]:
+    mid = ob.get("mid_price")
+    return {
+        "symbol": symbol,
+        "price": mid,
+        "best_ask": ob.get("best_ask"),
+        "best_bid": ob.get("best_bid"),
+        "spread": round(((ob.get("best_ask", 0) - ob.get("best_bid", 0)) / mid) * 100, 3) if mid else None,
+        "timestamp": ob.get("timestamp"),
+    }
+
+
+# ====================== WRAPPERS SÍNCRONOS ======================
+
+def run_sync(coro_factory, timeout: Optional[float] = None):
+    """Executa ``coro_factory(client)`` num loop próprio e devolve o resultado.
+
+    Funciona também quando a thread atual já tem um loop rodando (ex.: tornado
+    do Streamlit): nesse caso o loop novo roda numa thread auxiliar.
+    """
+    async def _main():
+        async with AsyncKucoinClient() as client:
+            coro = coro_factory(client)
+            return await (asyncio.wait_for(coro, timeout) if timeout else coro)
+
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(_main())
+
+    box: Dict[str, Any] = {}
+
+    def _worker():
+        try:
+            box["result"] = asyncio.run(_main())
+        except BaseException as e:  # repassado ao chamador
+            box["error"] = e
+
+    t = threading.Thread(target=_worker, name="kucoin-async", daemon=True)
+    t.start()
+    t.join()
+    if "error" in box:
+        raise box["error"]
+    return box.get("result")
+
+
+def fetch_orderbook_prices(symbols: Iterable[str], timeout: Optional[float] = None) -> Dict[str, Optional[Dict[str, Any]]]:
+    symbols = list(symbols)
+    return run_sync(lambda c: c.get_orderbook_prices(symbols), timeout)
+
+
+def fetch_candles_many(symbols: Iterable[str], ktype: str = "1hour", startAt: int = None,
+                       endAt: int = None) -> Dict[str, Optional[List[Any]]]:
+    symbols = list(symbols)
+    return run_sync(lambda c: c.get_candles_many(symbols, ktype, startAt, endAt))
+
+
+def fetch_orders_details(order_ids: Iterable[str]) -> Dict[str, Optional[Dict[str, Any]]]:
+    order_ids = list(order_ids)
+    return run_sync(lambda c: c.get_orders_details(order_ids))
+
+
+def fetch_market_overview(symbols: List[str]) -> List[Dict[str, Any]]:
+    return run_sync(lambda c: c.get_market_overview(symbols))
+
+
+def fetch_balance(details: bool = False) -> Any:
+    return run_sync(lambda c: c.get_balance(details))
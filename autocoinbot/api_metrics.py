@@ -0,0 +1,297 @@
+# api_metrics.py
+# Métricas por endpoint das chamadas REST à KuCoin (latência, status, erros, retries, bytes)
+
+"""
+Instrumentação das requisições à KuCoin.
+
+``http_session.request`` (e o cliente aiohttp de ``api_async``) chamam
+``record`` a cada requisição, então toda chamada REST do processo entra aqui
+sem mudar os chamadores. Por ``(método, endpoint)`` são mantidos:
+
+* histograma de latência (buckets fixos, em segundos), soma e contagem;
+* contagem por status HTTP e por código de erro da KuCoin (``code`` != 200000);
+* exceções de transporte por classe (timeout, conexão...);
+* retries (marcados por ``retry_on_failure`` via ``mark_retry``) e bytes
+  enviados/recebidos.
+
+O endpoint é o path sem query string, com ids (orderId, accountId...)
+trocados por ``{id}`` para não explodir a cardinalidade.
+
+Cada processo grava seu snapshot em ``<dir>/<pid>.json`` no máximo a cada
+``KUCOIN_METRICS_DUMP_INTERVAL`` segundos; ``collect`` junta os snapshots de
+todos os processos vivos do host e ``render_prometheus`` os formata para o
+``/metrics`` de ``terminal_component.start_api_server``.
+
+Variáveis de ambiente:
+    KUCOIN_METRICS                0 desliga a coleta
+    KUCOIN_METRICS_DIR            diretório dos snapshots (padrão /dev/shm/autocoinbot_metrics)
+    KUCOIN_METRICS_DUMP_INTERVAL  intervalo mínimo entre gravações em segundos (padrão 10)
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import logging
+import tempfile
+import threading
+from typing import Any, Dict, Iterable, List, Optional
+from urllib.parse import urlsplit
+
+logger = logging.getLogger(__name__)
+
+BUCKETS = (0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_ID_SEGMENT = re.compile(r"^(?:[0-9a-fA-F]{16,}|\d{6,})$")
+_CODE_RE = re.compile(rb'"code"\s*:\s*"?(\d+)')
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.environ.get(name, default))
+    except Exception:
+        return float(default)
+
+
+def _default_dir() -> str:
+    base = "/dev/shm" if os.path.isdir("/dev/shm") and os.access("/dev/shm", os.W_OK) else tempfile.gettempdir()
+    return os.path.join(base, "autocoinbot_metrics")
+
+
+def metrics_enabled() -> bool:
+    return str(os.environ.get("KUCOIN_METRICS", "1")).strip().lower() not in ("0", "false", "no", "off")
+
+
+def endpoint_of(url: str) -> str:
+    """Path normalizado: sem host/query e com segmentos de id trocados por ``{id}``."""
+    path = urlsplit(url).path or "/"
+    return "/".join("{id}" if _ID_SEGMENT.match(seg) else seg for seg in path.split("/"))
+
+
+def kucoin_code(body: bytes) -> Optional[str]:
+    """``code`` do envelope JSON da KuCoin (só o começo do corpo é examinado)."""
+    m = _CODE_RE.search(body[:96]) if body else None
+    return m.group(1).decode() if m else None
+
+
+def _new_entry() -> Dict[str, Any]:
+    return {
+        "count": 0, "sum_s": 0.0, "buckets": [0] * (len(BUCKETS) + 1),
+        "status": {}, "kucoin_codes": {}, "errors": {},
+        "retries": 0, "bytes_in": 0, "bytes_out": 0,
+    }
+
+
+class ApiMetrics:
+    """Contadores do processo, protegidos por um lock (gravação em disco periódica)."""
+
+    def __init__(self, directory: Optional[str] = None, dump_interval: float = 10.0,
+                 process: Optional[str] = None):
+        self.directory = directory or _default_dir()
+        self.dump_interval = float(dump_interval)
+        self.process = process or os.path.basename(sys.argv[0] or "") or "python"
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._endpoints: Dict[str, Dict[str, Any]] = {}
+        self._last_dump = 0.0
+        self._pid = os.getpid()
+
+    def mark_retry(self):
+        """A próxima requisição desta thread é uma nova tentativa."""
+        self._local.retry = True
+
+    def record(self, method: str, url: str, latency_s: float, status: Optional[int] = None,
+               bytes_in: int = 0, bytes_out: int = 0, code: Optional[str] = None,
+               error: Optional[str] = None, retry: bool = False):
+        if getattr(self._local, "retry", False):
+            self._local.retry = False
+            retry = True
+        key = f"{method.upper()} {endpoint_of(url)}"
+        idx = len(BUCKETS)
+        for i, bound in enumerate(BUCKETS):
+            if latency_s <= bound:
+                idx = i
+                break
+        with self._lock:
+            if os.getpid() != self._pid:  # processo filho: não herda os contadores do pai
+                self._endpoints, self._pid, self._last_dump = {}, os.getpid(), 0.0
+            e = self._endpoints.get(key)
+            if e is None:
+                e = self._endpoints[key] = _new_entry()
+            e["count"] += 1
+            e["sum_s"] += latency_s
+            e["buckets"][idx] += 1
+            if status is not None:
+                s = str(status)
+                e["status"][s] = e["status"].get(s, 0) + 1
+            if code and code != "200000":
+                e["kucoin_codes"][code] = e["kucoin_codes"].get(code, 0) + 1
+            if error:
+                e["errors"][error] = e["errors"].get(error, 0) + 1
+            if retry:
+                e["retries"] += 1
+            e["bytes_in"] += int(bytes_in or 0)
+            e["bytes_out"] += int(bytes_out or 0)
+            now = time.time()
+            due = now - self._last_dump >= self.dump_interval
+            if due:
+                self._last_dump = now
+        if due:
+            self.dump()
+
+    def record_response(self, method: str, url: str, response: Any, latency_s: float):
+        """Registra um ``requests.Response`` (status, código KuCoin, bytes)."""
+        try:
+            body = response.content or b""
+        except Exception:
+            body = b""
+        sent = getattr(getattr(response, "request", None), "body", None) or b""
+        self.record(method, url, latency_s, status=response.status_code, bytes_in=len(body),
+                    bytes_out=len(sent), code=kucoin_code(body))
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            endpoints = {
+                k: dict(v, buckets=list(v["buckets"]), status=dict(v["status"]),
+                        kucoin_codes=dict(v["kucoin_codes"]), errors=dict(v["errors"]))
+                for k, v in self._endpoints.items()
+            }
+        return {"pid": os.getpid(), "process": self.process, "updated_at": time.time(),
+                "buckets": list(BUCKETS), "endpoints": endpoints}
+
+    def dump(self):
+        """Grava o snapshot do processo para o ``/metrics`` de outros processos."""
+        snap = self.snapshot()
+        path = os.path.join(self.directory, f"{snap['pid']}.json")
+        tmp = f"{path}.tmp"
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(tmp, "w") as f:
+                json.dump(snap, f)
+            os.replace(tmp, path)
+        except OSError as e:
+            logger.debug("api_metrics: falha ao gravar %s: %s", path, e)
+
+    def reset(self):
+        with self._lock:
+            self._endpoints = {}
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    except OSError:
+        return False
+    return True
+
+
+def collect(metrics: Optional[ApiMetrics] = None) -> List[Dict[str, Any]]:
+    """Snapshots de todos os processos vivos (o deste processo lido da memória)."""
+    metrics = metrics or get_api_metrics()
+    own = metrics.snapshot()
+    out = [own]
+    try:
+        names = os.listdir(metrics.directory)
+    except OSError:
+        return out
+    for name in names:
+        if not name.endswith(".json"):
+            continue
+        try:
+            pid = int(name[:-5])
+        except ValueError:
+            continue
+        if pid == own["pid"]:
+            continue
+        path = os.path.join(metrics.directory, name)
+        if not _pid_alive(pid):
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+            continue
+        try:
+            with open(path) as f:
+                out.append(json.load(f))
+        except (OSError, ValueError):
+            continue
+    return out
+
+
+def _label(v: Any) -> str:
+    return str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", " ")
+
+
+def render_prometheus(snapshots: Iterable[Dict[str, Any]],
+                      rate_limits: Optional[Dict[str, Any]] = None) -> str:
+    """Formato texto do Prometheus para os snapshots de ``collect``."""
+    lines = {
+        "duration": ["# TYPE kucoin_api_request_duration_seconds histogram"],
+        "responses": ["# TYPE kucoin_api_responses_total counter"],
+        "codes": ["# TYPE kucoin_api_error_codes_total counter"],
+        "errors": ["# TYPE kucoin_api_exceptions_total counter"],
+        "retries": ["# TYPE kucoin_api_retries_total counter"],
+        "bytes_in": ["# TYPE kucoin_api_response_bytes_total counter"],
+        "bytes_out": ["# TYPE kucoin_api_request_bytes_total counter"],
+    }
+    for snap in snapshots:
+        bounds = snap.get("buckets") or list(BUCKETS)
+        proc = f'process="{_label(snap.get("process"))}",pid="{snap.get("pid")}"'
+        for key, e in sorted((snap.get("endpoints") or {}).items()):
+            method, _, endpoint = key.partition(" ")
+            base = f'{proc},method="{method}",endpoint="{_label(endpoint)}"'
+            acc = 0
+            for bound, n in zip(list(bounds) + ["+Inf"], e["buckets"]):
+                acc += n
+                lines["duration"].append(f'kucoin_api_request_duration_seconds_bucket{{{base},le="{bound}"}} {acc}')
+            lines["duration"].append(f"kucoin_api_request_duration_seconds_sum{{{base}}} {e['sum_s']:.6f}")
+            lines["duration"].append(f"kucoin_api_request_duration_seconds_count{{{base}}} {e['count']}")
+            for status, n in sorted(e["status"].items()):
+                lines["responses"].append(f'kucoin_api_responses_total{{{base},status="{status}"}} {n}')
+            for code, n in sorted(e["kucoin_codes"].items()):
+                lines["codes"].append(f'kucoin_api_error_codes_total{{{base},code="{code}"}} {n}')
+            for err, n in sorted(e["errors"].items()):
+                lines["errors"].append(f'kucoin_api_exceptions_total{{{base},error="{_label(err)}"}} {n}')
+            lines["retries"].append(f"kucoin_api_retries_total{{{base}}} {e['retries']}")
+            lines["bytes_in"].append(f"kucoin_api_response_bytes_total{{{base}}} {e['bytes_in']}")
+            lines["bytes_out"].append(f"kucoin_api_request_bytes_total{{{base}}} {e['bytes_out']}")
+    out = [line for group in lines.values() for line in group]
+    if rate_limits:
+        out.append("# TYPE kucoin_ratelimit_tokens gauge")
+        for pool, v in sorted(rate_limits.items()):
+            if isinstance(v, dict) and "tokens" in v:
+                out.append(f'kucoin_ratelimit_tokens{{pool="{_label(pool)}"}} {v["tokens"]}')
+    return "\n".join(out) + "\n"
+
+
+# ====================== MÉTRICAS GLOBAIS (POR PROCESSO) ======================
+_METRICS: Optional[ApiMetrics] = None
+_METRICS_LOCK = threading.Lock()
+
+
+def get_api_metrics() -> ApiMetrics:
+    global _METRICS
+    if _METRICS is not None:
+        return _METRICS
+    with _METRICS_LOCK:
+        if _METRICS is None:
+            _METRICS = ApiMetrics(
+                directory=os.environ.get("KUCOIN_METRICS_DIR") or None,
+                dump_interval=_env_float("KUCOIN_METRICS_DUMP_INTERVAL", 10.0),
+            )
+        return _METRICS
+
+
+def snapshot() -> Dict[str, Any]:
+    """Snapshot em memória deste processo."""
+    return get_api_metrics().snapshot()
+
+
+def mark_retry():
+    if metrics_enabled():
+        get_api_metrics().mark_retry()
@@ -7,6 +7,14 @@ def get_account_balances_detail():
     except Exception as e:
         return None, [], {'error': str(e)}
 
+    # Um único allTickers (cache com TTL) cota todas as moedas da conta.
+    # Sem snapshot (e sem cache) os saldos ainda saem: estáveis valem 1, o resto fica sem cotação.
+    tickers_error = None
+    try:
+        prices = api.get_market_snapshot()
+    except Exception as e:
+        prices, tickers_error = None, f"tickers unavailable: {e}"
+
     total = 0.0
     rows = []
 
@@ -47,32 +55,18 @@ def get_account_balances_detail():
                 total += float(converted)
             continue
 
-        if converted is None:
-            for q in ('USDT','USDC'):
-                symbol = f"{currency}-{q}"
-                try:
-                    price = api.get_orderbook_price(symbol)
-                    if price is not None:
-                        converted = balance * float(price)
-                        quote_used = q
-                        break
-                except Exception as e:
-                    converted_error = f"{symbol}: {e}"
-                    continue
-
-        if converted is None:
-            for q in ('USDT','USDC'):
-                symbol_inv = f"{q}-{currency}"
-                try:
-                    price_inv = api.get_orderbook_price(symbol_inv)
-                    if price_inv:
-                        converted = balance * (1.0 / float(price_inv))
-                        quote_used = q
-                        converted_error = f"converted via inverse {symbol_inv}"
-                        break
-                except Exception as e:
-                    converted_error = (converted_error or '') + f" ; inv {symbol_inv}: {e}"
-                    continue
+        if converted is None and prices is None:
+            converted_error = tickers_error
+        elif converted is None:
+            converted, pair = api.usdt_value(currency, balance, prices)
+            if pair:
+                symbol = pair.split(' ')[0]
+                base, quote = symbol.split('-', 1)
+                quote_used = quote if base == currency else base
+                if pair.endswith('(inv)'):
+                    converted_error = f"converted via inverse {symbol}"
+            else:
+                converted_error = f"no {currency}-USDT/USDC ticker"
 
         converted_f = float(converted) if converted is not None else None
         if converted_f is not None and not (isinstance(converted_f, float) and math.isnan(converted_f)):
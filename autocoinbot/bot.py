@@ -182,12 +182,14 @@ def place_market_order(symbol: str, side: str, funds: Optional[float] = None,
     # Respostas KuCoin com code != 200000 devem ser tratadas como rejeição (sem retry).
     for attempt in range(max_retries):
         try:
-            import requests
+            from http_session import http_post
             endpoint = "/api/v1/orders"
             url = api._base_url() + endpoint
             body_str = json.dumps(payload, separators=(",", ":"))
+            api.rate_limit(endpoint, "POST")
+            # Assina depois da espera do rate limit (timestamp fresco)
             headers = api._build_headers("POST", endpoint, body_str)
-            r = requests.post(url, headers=headers, data=body_str, timeout=20)
+            r = http_post(url, headers=headers, data=body_str, timeout=20)
             r.raise_for_status()
 
             resp = None
@@ -376,9 +378,9 @@ class EnhancedTradeBot:
             enable = True
         if enable:
             try:
-                db = self._get_db()
+                learning = self._get_learning_cache()
                 candidates = [0.2, 0.35, 0.5, 0.75, 1.0, 1.5, 2.0]
-                chosen = db.choose_bandit_param(self.symbol, self._learn_param_name, candidates=candidates, epsilon=0.25)
+                chosen = learning.choose_param(self.symbol, self._learn_param_name, candidates=candidates, epsilon=0.25)
                 self._take_profit_trailing_pct = float(chosen)
                 self._learn_selected_trailing = float(chosen)
                 self._learn_selected_params[self._learn_param_name] = float(chosen)
@@ -406,12 +408,12 @@ class EnhancedTradeBot:
 
             if enable_flow:
                 try:
-                    db = self._get_db()
+                    learning = self._get_learning_cache()
 
                     # Flow thresholds (candidates centered around current defaults).
                     p_min_conf = "flow_min_confidence"
                     c_min_conf = [0.20, 0.25, 0.30, 0.35, 0.40, 0.45, 0.55]
-                    v_min_conf = db.choose_bandit_param(self.symbol, p_min_conf, candidates=c_min_conf, epsilon=0.25)
+                    v_min_conf = learning.choose_param(self.symbol, p_min_conf, candidates=c_min_conf, epsilon=0.25)
                     self.flow_min_confidence = float(v_min_conf)
                     self._learn_selected_params[p_min_conf] = float(v_min_conf)
                     self._log(
@@ -423,7 +425,7 @@ class EnhancedTradeBot:
 
                     p_max_spread = "flow_max_spread_bps"
                     c_max_spread = [12.0, 15.0, 20.0, 25.0, 30.0, 40.0, 55.0]
-                    v_max_spread = db.choose_bandit_param(self.symbol, p_max_spread, candidates=c_max_spread, epsilon=0.25)
+                    v_max_spread = learning.choose_param(self.symbol, p_max_spread, candidates=c_max_spread, epsilon=0.25)
                     self.flow_max_spread_bps = float(v_max_spread)
                     self._learn_selected_params[p_max_spread] = float(v_max_spread)
                     self._log(
@@ -435,7 +437,7 @@ class EnhancedTradeBot:
 
                     p_cooldown = "flow_trade_cooldown_s"
                     c_cooldown = [5.0, 10.0, 15.0, 20.0, 30.0, 45.0, 60.0]
-                    v_cooldown = db.choose_bandit_param(self.symbol, p_cooldown, candidates=c_cooldown, epsilon=0.25)
+                    v_cooldown = learning.choose_param(self.symbol, p_cooldown, candidates=c_cooldown, epsilon=0.25)
                     self.flow_trade_cooldown_s = float(v_cooldown)
                     self._learn_selected_params[p_cooldown] = float(v_cooldown)
                     self._log(
@@ -448,6 +450,33 @@ class EnhancedTradeBot:
                     self._log("auto_learn_flow_param_error", error=str(e))
 
         self._last_price = self.entry_price
+        # WebSockets (ws_market / ws_private): None = ainda não tentado, False = indisponível
+        self._ws_feed = None
+        self._ws_account = None
+        self._last_tick_seq: Optional[int] = None
+        try:
+            self._ws_max_age = float(os.environ.get("KUCOIN_WS_MAX_AGE", "15"))
+            self._ws_min_tick = float(os.environ.get("KUCOIN_WS_MIN_TICK", "0.5"))
+        except ValueError:
+            self._ws_max_age, self._ws_min_tick = 15.0, 0.5
+        # True quando o último preço veio do fallback (price_fetcher/quadro) ou não foi atualizado
+        self._price_stale = False
+        self._price_age = None
+        self._stale_streak = 0
+        try:
+            self._max_stale_ticks = int(os.environ.get("KUCOIN_PRICE_MAX_DEFERRED", "3"))
+        except ValueError:
+            self._max_stale_ticks = 3
+        # Regras do símbolo (symbol_rules): None = ainda não tentado, False = indisponível
+        self._symbol_rules = None
+        if HAS_API and api and not self.dry_run:
+            # Offset de relógio pronto antes da primeira ordem assinada
+            try:
+                api.start_clock_sync()
+            except Exception as e:
+                self._log("clock_sync_unavailable", error=str(e))
+            # Primeira carga das regras (síncrona só sem arquivo em disco) fora do tick
+            self._get_symbol_rule()
         self._peak_price = self.entry_price if self.mode == "sell" else None
         self._valley_price = self.entry_price if self.mode == "buy" else None
 
@@ -504,13 +533,19 @@ class EnhancedTradeBot:
     def _get_available_balance_fast(self, currency: str) -> float:
         """Best-effort available balance (trade account).
 
-        Uses a short-timeout private endpoint. If it fails, returns 0.
+        Reads the private WebSocket stream when it is live; otherwise uses a
+        short-timeout private endpoint. If that fails, returns 0.
         """
         if not HAS_API or not api:
             return 0.0
         cur = str(currency or "").upper().strip()
         if not cur:
             return 0.0
+        stream = self._get_account_stream()
+        if stream is not None:
+            live = stream.available(cur, "trade")
+            if live is not None:
+                return float(live)
         try:
             accounts = api.get_accounts_raw_fast(timeout=3.5)
         except Exception:
@@ -768,16 +803,115 @@ class EnhancedTradeBot:
             return simulated
         
         try:
-            ob = api.get_orderbook_price(self.symbol)
+            feed = self._get_market_feed()
+            if feed is not None:
+                tick = feed.latest(self.symbol, max_age=self._ws_max_age)
+                if tick:
+                    self._last_tick_seq = tick.get("sequence")
+                    self._price_stale = False
+                    return float(tick["mid_price"])
+            board = self._get_ticker_board()
+            if board is not None:
+                # Um fetcher por símbolo no host; os demais bots leem o quadro.
+                ob = board.get(self.symbol, max_age=self.interval)
+            else:
+                # Prazo fixo por tick; estourado, volta a última cotação com stale=True.
+                ob = self._get_price_fetcher().fetch(self.symbol)
             if ob and isinstance(ob, dict):
                 price = ob.get("mid_price")
                 if price:
+                    self._price_stale = bool(ob.get("stale"))
+                    self._price_age = ob.get("age_s")
                     return float(price)
+            self._price_stale = True
             return self._last_price
         except Exception as e:
             self._log("price_fetch_error", error=str(e))
+            self._price_stale = True
             return self._last_price
 
+    def _get_market_feed(self):
+        """Feed WebSocket de ticker do processo (None em dry-run ou se indisponível)"""
+        if not HAS_API or self.dry_run:
+            return None
+        if self._ws_feed is False:
+            return None
+        try:
+            try:
+                from .ws_market import get_market_feed
+            except ImportError:
+                from ws_market import get_market_feed
+            self._ws_feed = get_market_feed([self.symbol]) or False
+        except Exception as e:
+            self._log("ws_feed_unavailable", error=str(e))
+            self._ws_feed = False
+        return self._ws_feed or None
+
+    def _get_account_stream(self):
+        """Stream privado de saldos/ordens do processo (None em dry-run ou se indisponível)"""
+        if self.dry_run or self._ws_account is False:
+            return None
+        try:
+            try:
+                from .ws_private import get_account_stream
+            except ImportError:
+                from ws_private import get_account_stream
+            self._ws_account = get_account_stream() or False
+        except Exception as e:
+            self._log("ws_private_unavailable", error=str(e))
+            self._ws_account = False
+        return self._ws_account or None
+
+    def _wait_next_price(self, timeout: float):
+        """Dorme até ``timeout`` ou até chegar um tick novo do feed (respeitando KUCOIN_WS_MIN_TICK)."""
+        feed = self._get_market_feed()
+        if feed is None:
+            time.sleep(timeout)
+            return
+        started = time.monotonic()
+        feed.wait_for_tick(self.symbol, after_seq=self._last_tick_seq, timeout=timeout)
+        # Evita girar o loop (logs/DB) a cada tick de símbolos muito líquidos.
+        spare = self._ws_min_tick - (time.monotonic() - started)
+        if spare > 0:
+            self._stopped.wait(spare)
+
+    def _get_ticker_board(self):
+        """Quadro de cotações compartilhado entre processos (None se desligado)"""
+        try:
+            from .ticker_board import board_enabled, get_ticker_board
+        except ImportError:
+            from ticker_board import board_enabled, get_ticker_board
+        if not board_enabled():
+            return None
+        fetcher = self._get_price_fetcher()
+        # O quadro tem seu próprio fallback: só publica cotações frescas.
+        return get_ticker_board(lambda symbol: fetcher.fetch(symbol, allow_stale=False))
+
+    def _get_price_fetcher(self):
+        """Busca de level1 com prazo e hedge, compartilhada pelo processo"""
+        try:
+            from .price_fetcher import get_price_fetcher
+        except ImportError:
+            from price_fetcher import get_price_fetcher
+        return get_price_fetcher(api.get_orderbook_price_fast)
+
+    def _get_symbol_rule(self):
+        """Mínimos/incrementos do símbolo (None em dry-run, se desconhecido ou indisponível)"""
+        if not HAS_API or self.dry_run or self._symbol_rules is False:
+            return None
+        try:
+            if self._symbol_rules is None:
+                try:
+                    from .symbol_rules import get_symbol_rules
+                except ImportError:
+                    from symbol_rules import get_symbol_rules
+                self._symbol_rules = get_symbol_rules(api.get_all_symbols)
+            return self._symbol_rules.get(self.symbol)
+        except Exception as e:
+            self._log("symbol_rules_unavailable", error=str(e))
+            self._symbol_rules = False
+            return None
+
     def _calculate_portion_size(self, portion: float) -> float:
         """Calcula tamanho da ordem"""
         if self.size: 
@@ -793,6 +927,19 @@ class EnhancedTradeBot:
         Retorna (result, computed_size) para registrar no banco o tamanho real solicitado.
         """
         size = self._calculate_portion_size(portion)
+        rule = self._get_symbol_rule() if size else None
+        if rule is not None:
+            if not rule.enabled:
+                # enableTrading vem de um cache de até um dia: só avisa e deixa a
+                # exchange decidir, em vez de bloquear ordens de um par já reaberto.
+                self._log("symbol_trading_disabled_cached", side=side, symbol=self.symbol)
+            # Arredonda no baseIncrement e recusa localmente abaixo do mínimo: o chamador
+            # acumula a fração (carryover) sem gastar uma ida e volta na exchange.
+            size, reject = rule.prepare_size(size, price=self._last_price)
+            if reject:
+                self._log("order_rejected_locally", side=side, portion=round(portion, 4),
+                          size=round(size, 8), reason=reject)
+                return {"code": "local_reject", "msg": reject, "local": True}, float(size)
         self._log("executing_order", side=side, portion=round(portion, 4), size=round(size, 8))
 
         result = place_market_order(
@@ -902,7 +1049,7 @@ class EnhancedTradeBot:
                             penalized_pct=round(profit_pct, 4),
                         )
                     
-                    db = self._get_db()
+                    learning = self._get_learning_cache()
 
                     # Optional shaping for FLOW params: penalize wide spreads to prefer
                     # conditions that support better effective exits/entries.
@@ -920,7 +1067,7 @@ class EnhancedTradeBot:
                         try:
                             pname_s = str(pname)
                             reward = float(flow_reward) if pname_s.startswith("flow_") else float(profit_pct)
-                            db.update_bandit_reward(self.symbol, pname_s, float(pval), float(reward))
+                            learning.record_reward(self.symbol, pname_s, float(pval), float(reward))
                             self._log(
                                 "auto_learn_reward",
                                 param=pname_s,
@@ -1125,6 +1272,14 @@ class EnhancedTradeBot:
         except ImportError:
             from database import DatabaseManager
         return DatabaseManager()
+
+    def _get_learning_cache(self):
+        """Cache do bandit no processo (escolhas sem ir ao banco, recompensas em lote)"""
+        try:
+            from .learning_cache import get_learning_cache
+        except ImportError:
+            from learning_cache import get_learning_cache
+        return get_learning_cache(self._get_db)
     
     def _run_eternal(self):
         """Executa em modo eternal - reinicia automaticamente após completar targets"""
@@ -1230,6 +1385,23 @@ class EnhancedTradeBot:
                     self._log("price_unavailable")
                     time.sleep(self.interval)
                     continue
+
+                if self._price_stale:
+                    # Cotação velha (fallback do fetcher/quadro): adia no máximo
+                    # KUCOIN_PRICE_MAX_DEFERRED ticks; depois stop/alvos seguem com o
+                    # último preço conhecido. Um log por sequência, não por tick.
+                    self._stale_streak += 1
+                    if self._stale_streak == 1:
+                        self._log("price_stale", price=price, age_s=self._price_age,
+                                  max_deferred_ticks=self._max_stale_ticks)
+                    if self._stale_streak <= self._max_stale_ticks:
+                        time.sleep(self.interval)
+                        continue
+                    if self._stale_streak == self._max_stale_ticks + 1:
+                        self._log("price_stale_acting", price=price, age_s=self._price_age)
+                elif self._stale_streak:
+                    self._log("price_fresh", stale_ticks=self._stale_streak)
+                    self._stale_streak = 0
                 
                 self._last_price = price
 
@@ -1520,7 +1692,7 @@ class EnhancedTradeBot:
                     self._log("completion_check", message="✅ Concluído!")
                     break
                 
-                time.sleep(self.check_interval)
+                self._wait_next_price(self.check_interval)
         
         except KeyboardInterrupt:
             self._log("bot_interrupted")
@@ -1552,6 +1724,12 @@ class EnhancedTradeBot:
         }
         _append_history(final)
 
+        # Grava as recompensas do bandit acumuladas localmente
+        try:
+            self._get_learning_cache().flush()
+        except Exception as e:
+            self._log("auto_learn_flush_error", error=str(e))
+
     def stop(self):
         """Para o bot"""
         self._stopped.set()
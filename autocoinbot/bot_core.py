@@ -79,6 +79,42 @@ except ImportError:
     except ImportError:
         EnhancedTradeBot = None
 
+try:
+    from .log_writer import get_log_writer
+except ImportError:
+    from log_writer import get_log_writer
+
+# Stream privado de saldos (opcional): sem ele, REST + espera fixa
+try:
+    from . import ws_private
+except ImportError:
+    try:
+        import ws_private  # type: ignore
+    except ImportError:
+        ws_private = None
+
+
+def _trade_balances():
+    """Saldos da conta trade: stream privado quando conectado; senão REST."""
+    if ws_private is not None:
+        return ws_private.trade_balances()
+    try:
+        from . import api as kucoin_api
+    except Exception:
+        import api as kucoin_api  # type: ignore
+    return kucoin_api.get_balances(account_type="trade")
+
+
+def _wait_balance_change(timeout: float):
+    """Acorda num evento de saldo do stream ou, no pior caso, após ``timeout``."""
+    if ws_private is None:
+        time.sleep(timeout)
+        return
+    try:
+        ws_private.wait_for_balance_change(timeout)
+    except Exception:
+        time.sleep(timeout)
+
 
 #from .utils import parse_targets 
 
@@ -108,12 +144,21 @@ def parse_targets(s: str):
 # LOG SETUP — GRAVA EM POSTGRESQL VIA DATABASE.PY
 # ======================================================
 class DatabaseLogger:
-    """Wrapper que permite usar DatabaseManager como um logger Python"""
+    """Wrapper que permite usar DatabaseManager como um logger Python.
+
+    Os logs vão para o ``BatchedLogWriter`` do processo (gravação em lote via
+    COPY); chame ``flush()`` antes de sair para garantir a gravação.
+    """
     def __init__(self, db_manager, bot_id: str):
         self.db = db_manager
         self.bot_id = bot_id
         self.handlers = []  # Fake handlers para compatibilidade
         self.propagate = False
+        try:
+            self.writer = get_log_writer(db_manager)
+        except Exception as e:
+            print(f"[LOG ERROR] escritor em lote indisponível: {e}", file=sys.stderr)
+            self.writer = None
     
     def setLevel(self, level):
         """Noop para compatibilidade"""
@@ -122,34 +167,39 @@ class DatabaseLogger:
     def addHandler(self, handler):
         """Noop para compatibilidade"""
         self.handlers.append(handler)
-    
-    def info(self, message: str):
-        """Grava INFO log"""
+
+    def _write(self, level: str, message: str):
         try:
-            self.db.add_bot_log(self.bot_id, "INFO", message, {"message": message})
+            if self.writer is not None:
+                self.writer.write(self.bot_id, level, message, {"message": message})
+            else:
+                self.db.add_bot_log(self.bot_id, level, message, {"message": message})
         except Exception as e:
             print(f"[LOG ERROR] {e}", file=sys.stderr)
     
+    def info(self, message: str):
+        """Grava INFO log"""
+        self._write("INFO", message)
+    
     def error(self, message: str):
         """Grava ERROR log"""
-        try:
-            self.db.add_bot_log(self.bot_id, "ERROR", message, {"message": message})
-        except Exception as e:
-            print(f"[LOG ERROR] {e}", file=sys.stderr)
+        self._write("ERROR", message)
     
     def warning(self, message: str):
         """Grava WARNING log"""
-        try:
-            self.db.add_bot_log(self.bot_id, "WARNING", message, {"message": message})
-        except Exception as e:
-            print(f"[LOG ERROR] {e}", file=sys.stderr)
+        self._write("WARNING", message)
     
     def debug(self, message: str):
         """Grava DEBUG log"""
-        try:
-            self.db.add_bot_log(self.bot_id, "DEBUG", message, {"message": message})
-        except Exception as e:
-            print(f"[LOG ERROR] {e}", file=sys.stderr)
+        self._write("DEBUG", message)
+
+    def flush(self):
+        """Aguarda a gravação dos logs pendentes"""
+        if self.writer is not None:
+            try:
+                self.writer.flush()
+            except Exception as e:
+                print(f"[LOG ERROR] {e}", file=sys.stderr)
 
 
 def init_log(bot_id: str):
@@ -384,11 +434,8 @@ if __name__ == "__main__":
             while True:
                 try:
                     # api pode falhar / credenciais inválidas; se falhar, espera
-                    try:
-                        from . import api as kucoin_api
-                    except Exception:
-                        import api as kucoin_api  # type: ignore
-                    balances = kucoin_api.get_balances(account_type="trade")
+                    # stream privado quando conectado; senão REST (mesmo formato de get_balances)
+                    balances = _trade_balances()
                     avail_qty = 0.0
                     for b in balances or []:
                         if (b.get("currency") or "").upper() == asset:
@@ -428,7 +475,7 @@ if __name__ == "__main__":
                     "free": free_qty,
                     "desired": desired_qty or 0.0,
                 })
-                time.sleep(5)
+                _wait_balance_change(5)
 
         else:
             # Modo dry-run: simula saldo e reserva %
@@ -530,12 +577,8 @@ if __name__ == "__main__":
         while True:
             try:
                 # api pode falhar / credenciais inválidas; se falhar, espera
-                try:
-                    from . import api as kucoin_api
-                except Exception:
-                    import api as kucoin_api  # type: ignore
-
-                balances = kucoin_api.get_balances(account_type="trade")
+                # stream privado quando conectado; senão REST (mesmo formato de get_balances)
+                balances = _trade_balances()
                 avail_qty = 0.0
                 for b in balances or []:
                     if (b.get("currency") or "").upper() == asset:
@@ -575,7 +618,7 @@ if __name__ == "__main__":
                 "free": free_qty,
                 "desired": desired_qty or 0.0,
             })
-            time.sleep(5)
+            _wait_balance_change(5)
 
         # Se ainda não temos entry, usa preço atual
         if computed_entry is None:
@@ -743,4 +786,9 @@ if __name__ == "__main__":
             db.update_bot_session(args.bot_id, {"status": "stopped", "end_ts": time.time()})
         except Exception:
             pass
+        # Grava os logs ainda na fila antes do processo terminar
+        try:
+            logger.flush()
+        except Exception:
+            pass
 
@@ -0,0 +1,229 @@
+# candle_backfill.py
+# Backfill paginado de candles históricos para o candle_store
+
+"""
+Backfill de histórico de candles em janelas paralelas.
+
+A KuCoin devolve no máximo 1500 candles por chamada. ``backfill`` divide o
+intervalo em janelas desse tamanho (sobrepostas em um candle, para não
+depender de os limites serem inclusivos), busca as janelas em paralelo com
+``api.get_candles`` (que passa pelo rate limiter compartilhado) e funde cada
+uma no ``candle_store`` assim que chega; linhas repetidas nas bordas são
+deduplicadas pelo próprio store.
+
+Retomada: as janelas concluídas ficam num checkpoint JSON ao lado da série
+(``<SÍMBOLO>_<ktype>.backfill.json``). Rodar de novo com o mesmo início pula o
+que já foi feito (reaproveitando o ``end`` gravado se nenhum for passado), e
+janelas já cobertas de forma contínua pelo store também são puladas. Quando
+todas as janelas terminam o início é marcado como coberto no store e o
+checkpoint é removido.
+
+Uso:
+    python -m autocoinbot.candle_backfill BTC-USDT --ktype 5min --days 365
+    python -m autocoinbot.candle_backfill ETH-USDT --ktype 1hour --start 2024-01-01 --workers 8
+"""
+
+import os
+import json
+import time
+import logging
+import argparse
+from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+try:
+    from .candle_store import KTYPE_SECONDS, CandleStore, get_candle_store
+except ImportError:
+    from candle_store import KTYPE_SECONDS, CandleStore, get_candle_store
+
+logger = logging.getLogger(__name__)
+
+PAGE = 1500
+
+
+def _api():
+    try:
+        from . import api
+    except ImportError:
+        import api
+    return api
+
+
+def _rest_fetcher(symbol: str, ktype: str, start: int, end: int) -> List[Any]:
+    return _api().get_candles(symbol, ktype=ktype, startAt=start, endAt=end)
+
+
+def _live_fetcher(symbol: str, ktype: str, start: int, end: int) -> List[Any]:
+    return _api().get_candles_fast(symbol, ktype=ktype, startAt=start, endAt=end, timeout=2.5)
+
+
+def plan_windows(start: int, end: int, step: int, page: int = PAGE) -> List[Tuple[int, int]]:
+    """Janelas ``(ini, fim)`` de até ``page`` candles cobrindo ``[start, end]``."""
+    ws = int(start) - int(start) % step
+    span = step * (page - 1)
+    windows = []
+    while ws < end:
+        we = min(ws + span, int(end))
+        windows.append((ws, we))
+        if we >= end:
+            break
+        ws = we  # sobrepõe um candle com a próxima janela
+    return windows
+
+
+def _checkpoint_path(store: CandleStore, symbol: str, ktype: str) -> str:
+    return os.path.join(store.directory, f"{symbol}_{ktype}.backfill.json")
+
+
+def _load_checkpoint(path: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _save_checkpoint(path: str, state: Dict[str, Any]):
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(state, f)
+    os.replace(tmp, path)
+
+
+def _fetch_window(fetcher, symbol: str, ktype: str, window: Tuple[int, int],
+                  retries: int, backoff: float) -> List[Any]:
+    for attempt in range(retries + 1):
+        try:
+            return fetcher(symbol, ktype, window[0], window[1]) or []
+        except Exception as e:
+            if attempt >= retries:
+                raise
+            logger.debug("backfill %s %s %s: %s (tentativa %d)", symbol, ktype, window, e, attempt + 1)
+            time.sleep(backoff * (2 ** attempt))
+    return []
+
+
+def backfill(
+    symbol: str,
+    ktype: str,
+    start: int,
+    end: Optional[int] = None,
+    store: Optional[CandleStore] = None,
+    fetcher: Optional[Callable[[str, str, int, int], List[Any]]] = None,
+    workers: int = 4,
+    page: int = PAGE,
+    retries: int = 2,
+    backoff: float = 1.0,
+) -> Dict[str, Any]:
+    """Preenche ``[start, end]`` de ``symbol``/``ktype`` no store; retorna um relatório."""
+    step = KTYPE_SECONDS.get(ktype)
+    if step is None:
+        raise ValueError(f"ktype desconhecido: {ktype}")
+    symbol = symbol.upper()
+    store = store or get_candle_store(_live_fetcher)
+    fetcher = fetcher or _rest_fetcher
+    start = int(start)
+
+    ckpt_path = _checkpoint_path(store, symbol, ktype)
+    ckpt = _load_checkpoint(ckpt_path)
+    if ckpt and ckpt.get("start") == start and (end is None or ckpt.get("end") == int(end)):
+        end = int(ckpt["end"])
+        done = set(int(w) for w in ckpt.get("done", []))
+    else:
+        end = int(end if end is not None else time.time())
+        done = set()
+    state = {"symbol": symbol, "ktype": ktype, "start": start, "end": end, "done": sorted(done)}
+
+    windows = plan_windows(start, end, step, page)
+    bounds = store.bounds(symbol, ktype)
+    pending = []
+    for w in windows:
+        if w[0] in done:
+            continue
+        if bounds and bounds["covered_from"] <= w[0] and w[1] <= bounds["last"]:
+            continue  # já contínuo no store
+        pending.append(w)
+
+    report = {"symbol": symbol, "ktype": ktype, "start": start, "end": end,
+              "windows": len(windows), "fetched": 0, "skipped": len(windows) - len(pending),
+              "failed": 0, "rows": 0}
+    if pending:
+        _save_checkpoint(ckpt_path, state)
+    with ThreadPoolExecutor(max_workers=max(1, int(workers)), thread_name_prefix="candle-backfill") as pool:
+        futures = {pool.submit(_fetch_window, fetcher, symbol, ktype, w, retries, backoff): w for w in pending}
+        for fut in as_completed(futures):
+            w = futures[fut]
+            try:
+                rows = fut.result()
+            except Exception as e:
+                report["failed"] += 1
+                logger.warning("backfill %s %s janela %s falhou: %s", symbol, ktype, w, e)
+                continue
+            report["rows"] += store.merge(symbol, ktype, rows)
+            report["fetched"] += 1
+            done.add(w[0])
+            state["done"] = sorted(done)
+            _save_checkpoint(ckpt_path, state)
+
+    report["complete"] = report["failed"] == 0
+    if report["complete"]:
+        store.mark_covered(symbol, ktype, start)
+        try:
+            os.unlink(ckpt_path)
+        except OSError:
+            pass
+    report["gaps"] = _count_gaps(store, symbol, ktype, start, end, step)
+    return report
+
+
+def _count_gaps(store: CandleStore, symbol: str, ktype: str, start: int, end: int, step: int) -> int:
+    """Candles ausentes entre o primeiro e o último guardados no intervalo (pares sem negócios também geram)."""
+    rows = store.read(symbol, ktype, start, end)
+    if len(rows) < 2:
+        return 0
+    times = sorted(int(r[0]) for r in rows)
+    return sum(max(0, (b - a) // step - 1) for a, b in zip(times, times[1:]))
+
+
+def _parse_ts(value: str) -> int:
+    try:
+        return int(float(value))
+    except ValueError:
+        dt = datetime.fromisoformat(value)
+        if dt.tzinfo is None:
+            dt = dt.replace(tzinfo=timezone.utc)
+        return int(dt.timestamp())
+
+
+def main():
+    p = argparse.ArgumentParser(description="Backfill de candles da KuCoin para o candle_store")
+    p.add_argument("symbol")
+    p.add_argument("--ktype", default="1hour", choices=sorted(KTYPE_SECONDS, key=KTYPE_SECONDS.get))
+    p.add_argument("--days", type=float, default=None, help="histórico até agora (alternativa a --start)")
+    p.add_argument("--start", default=None, help="epoch ou data ISO (UTC)")
+    p.add_argument("--end", default=None, help="epoch ou data ISO (UTC); padrão: agora ou o do checkpoint")
+    p.add_argument("--workers", type=int, default=4)
+    args = p.parse_args()
+
+    if args.start:
+        start = _parse_ts(args.start)
+    elif args.days:
+        start = int(time.time() - args.days * 86400)
+        start -= start % max(86400, KTYPE_SECONDS[args.ktype])  # estável no dia: permite retomar
+    else:
+        p.error("informe --start ou --days")
+
+    logging.basicConfig(level=logging.INFO)
+    report = backfill(
+        args.symbol,
+        args.ktype,
+        start,
+        end=_parse_ts(args.end) if args.end else None,
+        workers=args.workers,
+    )
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
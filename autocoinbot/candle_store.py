@@ -0,0 +1,314 @@
+# candle_store.py
+# Armazenamento local e incremental de candles por (símbolo, ktype)
+
+"""
+Cache de candles em disco com atualização incremental.
+
+Cada par (símbolo, ktype) vira um ``.npz`` pequeno com duas matrizes
+(``time`` int64 e ``ohlcv`` float64 com open/close/high/low/volume/amount) e
+fica em memória depois da primeira leitura. Uma consulta só vai à API quando:
+
+* o início pedido é anterior ao que já foi coberto (busca a janela inteira);
+* começou um candle novo desde a última busca (busca a partir do último
+  candle guardado, que é reescrito porque estava em formação).
+
+Dentro do candle corrente nenhuma requisição é feita. Histórico longo é
+preenchido por ``candle_backfill`` através de ``merge``/``mark_covered``. O arquivo é trocado
+atomicamente e relido quando outro processo o atualiza (mtime), então os
+bots do host compartilham o histórico. Se a API falhar, o que está guardado
+é servido mesmo assim.
+
+``get`` devolve linhas no formato de ``api.get_candles_fast`` (mais novo
+primeiro): ``[time, open, close, high, low, volume, amount]``.
+
+Configuração via variáveis de ambiente:
+    KUCOIN_CANDLE_STORE      0 desliga (cada chamada baixa a janela inteira)
+    KUCOIN_CANDLE_DIR        diretório dos arquivos (padrão <tmp>/autocoinbot_candles)
+    KUCOIN_CANDLE_MAX_ROWS   candles mantidos por par (padrão 0 = sem limite)
+"""
+
+import os
+import re
+import time
+import logging
+import tempfile
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+KTYPE_SECONDS = {
+    "1min": 60,
+    "3min": 180,
+    "5min": 300,
+    "15min": 900,
+    "30min": 1800,
+    "1hour": 3600,
+    "2hour": 7200,
+    "4hour": 14400,
+    "6hour": 21600,
+    "8hour": 28800,
+    "12hour": 43200,
+    "1day": 86400,
+    "1week": 604800,
+}
+
+_SAFE = re.compile(r"[^A-Za-z0-9_.-]")
+_API_PAGE = 1500  # máximo de candles por resposta de /api/v1/market/candles
+_NO_COVERAGE = 2 ** 62  # série sem trecho contínuo garantido (próximo get busca a janela)
+
+
+def store_enabled() -> bool:
+    return str(os.environ.get("KUCOIN_CANDLE_STORE", "1")).strip().lower() not in ("0", "false", "no", "off")
+
+
+def _parse_rows(rows: List[Any]):
+    """Linhas cruas da API -> (times int64, ohlcv float64[N, 6]) ordenadas por tempo."""
+    times, values = [], []
+    for row in rows or []:
+        try:
+            times.append(int(row[0]))
+            values.append([float(v) for v in row[1:7]])
+        except (TypeError, ValueError, IndexError):
+            continue
+    t = np.asarray(times, dtype=np.int64)
+    v = np.asarray(values, dtype=np.float64).reshape(-1, 6)
+    order = np.argsort(t, kind="stable")
+    return t[order], v[order]
+
+
+def _rows(s: Optional["_Series"], start: int, end: int) -> List[List[Any]]:
+    """Fatia ``[start, end]`` da série no formato da API (mais novo primeiro)."""
+    if s is None or not len(s.times):
+        return []
+    lo, hi = np.searchsorted(s.times, [start, end + 1])
+    t, v = s.times[lo:hi], s.values[lo:hi]
+    return [[int(t[i]), *v[i].tolist()] for i in range(len(t) - 1, -1, -1)]
+
+
+class _Series:
+    __slots__ = ("times", "values", "fetched_at", "covered_from", "mtime")
+
+    def __init__(self, times, values, fetched_at: float, covered_from: int, mtime: float = 0.0):
+        self.times = times
+        self.values = values
+        self.fetched_at = float(fetched_at)
+        self.covered_from = int(covered_from)
+        self.mtime = mtime
+
+
+class CandleStore:
+    """Candles por (símbolo, ktype) em memória + ``.npz``, buscando só o que falta."""
+
+    def __init__(
+        self,
+        fetcher: Callable[[str, str, int, int], List[Any]],
+        directory: Optional[str] = None,
+        max_rows: int = 0,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.fetcher = fetcher
+        self.directory = directory or os.path.join(tempfile.gettempdir(), "autocoinbot_candles")
+        self.max_rows = int(max_rows)
+        self.clock = clock
+        os.makedirs(self.directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._key_locks: Dict[str, threading.Lock] = {}
+        self._series: Dict[str, _Series] = {}
+        self._stats = {"hits": 0, "fetches": 0, "rows_fetched": 0, "errors": 0}
+
+    # ---------- API pública ----------
+
+    def get(self, symbol: str, ktype: str, start: int, end: Optional[int] = None) -> List[List[Any]]:
+        """Candles com ``start <= time <= end``, mais novo primeiro (formato da API)."""
+        step = KTYPE_SECONDS.get(ktype)
+        if step is None:
+            raise ValueError(f"ktype desconhecido: {ktype}")
+        symbol = symbol.upper()
+        now = self.clock()
+        end = int(end if end is not None else now)
+        start = int(start)
+        key = f"{symbol}_{ktype}"
+
+        with self._key_lock(key):
+            s = self._load(key)
+            if s is None or start < s.covered_from:
+                self._fetch(key, symbol, ktype, start, end, now, covers=start)
+            elif int(s.fetched_at // step) < int(now // step):
+                last = int(s.times[-1]) if len(s.times) else start
+                self._fetch(key, symbol, ktype, last, end, now)
+            else:
+                self._bump("hits")
+            s = self._series.get(key)
+
+        return _rows(s, start, end)
+
+    def read(self, symbol: str, ktype: str, start: int, end: int) -> List[List[Any]]:
+        """Como ``get``, mas só com o que está guardado (nunca chama a API)."""
+        key = f"{symbol.upper()}_{ktype}"
+        with self._key_lock(key):
+            s = self._load(key)
+        return _rows(s, int(start), int(end))
+
+    def merge(self, symbol: str, ktype: str, rows: List[Any], covered_from: Optional[int] = None) -> int:
+        """Funde candles obtidos por fora (ex.: ``candle_backfill``); retorna quantos entraram.
+
+        ``covered_from`` só deve ser passado quando a série é contínua a partir dele.
+        """
+        if ktype not in KTYPE_SECONDS:
+            raise ValueError(f"ktype desconhecido: {ktype}")
+        key = f"{symbol.upper()}_{ktype}"
+        with self._key_lock(key):
+            s = self._load(key)
+            if covered_from is None:
+                # Janelas soltas não provam continuidade: mantém a cobertura atual.
+                covered_from = s.covered_from if s is not None else _NO_COVERAGE
+            return self._merge(key, rows, covered_from=covered_from)
+
+    def mark_covered(self, symbol: str, ktype: str, covered_from: int):
+        """Declara a série contínua desde ``covered_from`` (fim de um backfill completo)."""
+        key = f"{symbol.upper()}_{ktype}"
+        with self._key_lock(key):
+            s = self._load(key)
+            if s is not None and int(covered_from) < s.covered_from:
+                s.covered_from = int(covered_from)
+                self._save(key, s)
+
+    def bounds(self, symbol: str, ktype: str) -> Optional[Dict[str, int]]:
+        """Primeiro/último candle guardados e início coberto (None se não houver série)."""
+        key = f"{symbol.upper()}_{ktype}"
+        with self._key_lock(key):
+            s = self._load(key)
+        if s is None or not len(s.times):
+            return None
+        return {"first": int(s.times[0]), "last": int(s.times[-1]),
+                "covered_from": s.covered_from, "rows": int(len(s.times))}
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            out = dict(self._stats)
+            out["series"] = len(self._series)
+        return out
+
+    # ---------- internos ----------
+
+    def _key_lock(self, key: str) -> threading.Lock:
+        with self._lock:
+            lock = self._key_locks.get(key)
+            if lock is None:
+                lock = self._key_locks[key] = threading.Lock()
+            return lock
+
+    def _bump(self, name: str, n: int = 1):
+        with self._lock:
+            self._stats[name] += n
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, _SAFE.sub("_", key) + ".npz")
+
+    def _load(self, key: str) -> Optional[_Series]:
+        """Série em memória, relida do disco se outro processo a atualizou."""
+        cached = self._series.get(key)
+        path = self._path(key)
+        try:
+            mtime = os.stat(path).st_mtime
+        except OSError:
+            return cached
+        if cached is not None and cached.mtime >= mtime:
+            return cached
+        try:
+            with np.load(path, allow_pickle=False) as z:
+                meta = z["meta"]
+                s = _Series(z["time"].astype(np.int64), z["ohlcv"].astype(np.float64),
+                            fetched_at=float(meta[0]), covered_from=int(meta[1]), mtime=mtime)
+        except Exception as e:
+            logger.debug("candle_store: arquivo ilegível %s: %s", path, e)
+            return cached
+        self._series[key] = s
+        return s
+
+    def _fetch(self, key: str, symbol: str, ktype: str, start: int, end: int, now: float,
+               covers: Optional[int] = None):
+        try:
+            rows = self.fetcher(symbol, ktype, start, end)
+        except Exception as e:
+            logger.debug("candle_store: fetch %s falhou: %s", key, e)
+            rows = []
+        self._bump("fetches")
+        covered_from = int(covers) if covers is not None else None
+        if rows and len(rows) >= _API_PAGE and covered_from is not None:
+            # Resposta truncada pela API: só o trecho recebido está coberto.
+            covered_from = None
+        if not self._merge(key, rows, fetched_at=now, covered_from=covered_from):
+            # Erro ou nada novo: serve o que tiver e tenta de novo na próxima chamada.
+            self._bump("errors")
+
+    def _merge(self, key: str, rows: List[Any], fetched_at: Optional[float] = None,
+               covered_from: Optional[int] = None) -> int:
+        """Funde ``rows`` na série (as linhas novas prevalecem) e grava; retorna quantas entraram."""
+        t_new, v_new = _parse_rows(rows)
+        if not len(t_new):
+            return 0
+        self._bump("rows_fetched", len(t_new))
+
+        old = self._series.get(key)
+        if old is not None and len(old.times):
+            keep = ~np.isin(old.times, t_new)
+            times = np.concatenate([old.times[keep], t_new])
+            values = np.concatenate([old.values[keep], v_new])
+            order = np.argsort(times, kind="stable")
+            times, values = times[order], values[order]
+        else:
+            times, values = t_new, v_new
+
+        covered = int(t_new[0]) if covered_from is None else int(covered_from)
+        if old is not None:
+            covered = min(covered, old.covered_from)
+        if self.max_rows > 0 and len(times) > self.max_rows:
+            times, values = times[-self.max_rows:], values[-self.max_rows:]
+            covered = max(covered, int(times[0]))
+        if fetched_at is None:
+            fetched_at = old.fetched_at if old is not None else 0.0
+        s = _Series(times, values, fetched_at=fetched_at, covered_from=covered)
+        self._series[key] = s
+        self._save(key, s)
+        return len(t_new)
+
+    def _save(self, key: str, s: _Series):
+        path = self._path(key)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp, "wb") as f:
+                np.savez(f, time=s.times, ohlcv=s.values,
+                         meta=np.array([s.fetched_at, s.covered_from], dtype=np.float64))
+            os.replace(tmp, path)
+            s.mtime = os.stat(path).st_mtime
+        except OSError as e:
+            logger.debug("candle_store: falha ao gravar %s: %s", path, e)
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+
+
+# ====================== STORE GLOBAL (POR PROCESSO) ======================
+_STORE: Optional[CandleStore] = None
+_STORE_LOCK = threading.Lock()
+
+
+def get_candle_store(fetcher: Callable[[str, str, int, int], List[Any]]) -> CandleStore:
+    global _STORE
+    with _STORE_LOCK:
+        if _STORE is None:
+            try:
+                max_rows = int(os.environ.get("KUCOIN_CANDLE_MAX_ROWS", "0"))
+            except ValueError:
+                max_rows = 0
+            _STORE = CandleStore(
+                fetcher,
+                directory=os.environ.get("KUCOIN_CANDLE_DIR") or None,
+                max_rows=max_rows,
+            )
+        return _STORE
@@ -0,0 +1,223 @@
+# clock_sync.py
+# Offset de relógio local x servidor KuCoin mantido em background
+
+"""
+Sincronização de relógio com a KuCoin fora do caminho de assinatura.
+
+Uma thread por processo consulta ``/api/v1/timestamp`` a cada ``interval``
+segundos. Cada rodada faz algumas amostras seguidas; o offset de cada uma é
+``servidor - ponto médio local`` e a estimativa da rodada é a média ponderada
+por ``1/RTT²`` (amostras lentas têm ponto médio mais incerto). As estimativas
+das últimas rodadas alimentam uma regressão linear que mede a deriva do
+relógio local (ppm); entre rodadas o offset é extrapolado por ela, limitado a
+``3 * interval`` de idade.
+
+``now_ms()`` só lê o estado em memória: assinar uma requisição nunca faz
+I/O de rede. Falhas mantêm a última estimativa e a próxima tentativa vem
+mais cedo (backoff até ``interval``).
+
+Métricas via ``stats()``: offset_ms, rtt_ms, drift_ppm, age_s (idade da
+última sincronização), syncs, failures, last_error.
+
+Variáveis de ambiente:
+    KUCOIN_CLOCK_SYNC_INTERVAL   segundos entre rodadas (padrão 60)
+    KUCOIN_CLOCK_SAMPLES         amostras por rodada (padrão 4)
+    KUCOIN_CLOCK_WARMUP          espera máxima pela 1ª sincronização no 1º uso (padrão 2s)
+"""
+
+import os
+import time
+import logging
+import threading
+from collections import deque
+from typing import Any, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# (local_antes_ms, servidor_ms, local_depois_ms)
+Probe = Callable[[], Tuple[float, float, float]]
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.environ.get(name, default))
+    except Exception:
+        return float(default)
+
+
+def _http_probe() -> Tuple[float, float, float]:
+    try:
+        from . import api
+        from .http_session import http_get
+    except ImportError:
+        import api
+        from http_session import http_get
+    api.rate_limit("/api/v1/timestamp")
+    t0 = time.time() * 1000.0
+    r = http_get(f"{api.KUCOIN_BASE}/api/v1/timestamp", timeout=5)
+    t1 = time.time() * 1000.0
+    r.raise_for_status()
+    server = float(r.json().get("data") or 0)
+    if server <= 0:
+        raise RuntimeError(f"timestamp inválido: {r.text[:200]}")
+    return t0, server, t1
+
+
+def estimate(samples) -> Tuple[float, float]:
+    """(offset_ms, melhor RTT) de amostras ``(t0, servidor, t1)`` ponderadas por 1/RTT²."""
+    num = den = 0.0
+    best = float("inf")
+    for t0, server, t1 in samples:
+        rtt = max(1.0, t1 - t0)
+        w = 1.0 / (rtt * rtt)
+        num += w * (server - (t0 + t1) / 2.0)
+        den += w
+        best = min(best, rtt)
+    if den == 0.0:
+        raise ValueError("sem amostras")
+    return num / den, best
+
+
+class ClockSync:
+    """Offset local->servidor estimado em background; leitura sem rede."""
+
+    def __init__(self, probe: Optional[Probe] = None, interval: float = 60.0, samples: int = 4,
+                 history: int = 20):
+        self.probe = probe or _http_probe
+        self.interval = max(1.0, float(interval))
+        self.samples = max(1, int(samples))
+        self._lock = threading.Lock()
+        self._history: deque = deque(maxlen=max(2, int(history)))  # (local_s, offset_ms)
+        self._offset_ms = 0.0
+        self._estimated_at = 0.0
+        self._drift = 0.0  # ms de offset por segundo local
+        self._rtt_ms: Optional[float] = None
+        self._synced = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._stats = {"syncs": 0, "failures": 0, "last_error": None}
+
+    # ---------- leitura (caminho de assinatura) ----------
+
+    def now_ms(self) -> int:
+        """Timestamp do servidor estimado, em ms. Nunca faz I/O."""
+        now = time.time()
+        with self._lock:
+            offset = self._offset_ms
+            if self._estimated_at:
+                age = min(now - self._estimated_at, 3 * self.interval)
+                offset += self._drift * age
+        return int(now * 1000.0 + offset)
+
+    def offset_ms(self) -> float:
+        return float(self.now_ms() - time.time() * 1000.0)
+
+    def is_synced(self) -> bool:
+        return self._synced.is_set()
+
+    def wait_synced(self, timeout: float) -> bool:
+        return self._synced.wait(max(0.0, float(timeout)))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            out = dict(self._stats)
+            out.update({
+                "offset_ms": round(self._offset_ms, 1),
+                "rtt_ms": None if self._rtt_ms is None else round(self._rtt_ms, 1),
+                "drift_ppm": round(self._drift * 1000.0, 2),
+                "age_s": round(time.time() - self._estimated_at, 1) if self._estimated_at else None,
+                "synced": self._synced.is_set(),
+                "samples": len(self._history),
+            })
+        return out
+
+    # ---------- sincronização ----------
+
+    def refresh(self) -> bool:
+        """Uma rodada de amostras; True se a estimativa foi atualizada."""
+        samples = []
+        error = None
+        for _ in range(self.samples):
+            try:
+                samples.append(self.probe())
+            except Exception as e:
+                error = e
+        if not samples:
+            with self._lock:
+                self._stats["failures"] += 1
+                self._stats["last_error"] = str(error)
+            logger.warning(f"⚠️ Clock sync failed: {error}")
+            return False
+
+        offset, rtt = estimate(samples)
+        local_s = time.time()
+        with self._lock:
+            self._history.append((local_s, offset))
+            self._drift = self._fit_drift()
+            self._offset_ms = offset
+            self._estimated_at = local_s
+            self._rtt_ms = rtt
+            self._stats["syncs"] += 1
+            self._stats["last_error"] = None
+        if abs(offset) > 1000:
+            logger.info(f"🕐 Time offset synchronized: {offset:.0f}ms (rtt {rtt:.0f}ms)")
+        self._synced.set()
+        return True
+
+    def _fit_drift(self) -> float:
+        """Inclinação (ms/s) do offset ao longo das rodadas guardadas; 0 com menos de 1 min de histórico."""
+        pts = list(self._history)
+        if len(pts) < 3 or pts[-1][0] - pts[0][0] < 60.0:
+            return 0.0
+        n = float(len(pts))
+        mx = sum(p[0] for p in pts) / n
+        my = sum(p[1] for p in pts) / n
+        sxx = sum((p[0] - mx) ** 2 for p in pts)
+        if sxx <= 0:
+            return 0.0
+        return sum((p[0] - mx) * (p[1] - my) for p in pts) / sxx
+
+    def start(self) -> "ClockSync":
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="kucoin-clock-sync", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout: float = 5.0):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self):
+        delay = 1.0
+        while not self._stop.is_set():
+            if self.refresh():
+                delay = 1.0
+                wait = self.interval
+            else:
+                wait = delay
+                delay = min(self.interval, delay * 2)
+            self._stop.wait(wait)
+
+
+# ====================== RELÓGIO GLOBAL (POR PROCESSO) ======================
+_CLOCK: Optional[ClockSync] = None
+_CLOCK_PID: Optional[int] = None
+_CLOCK_LOCK = threading.Lock()
+
+
+def get_clock() -> ClockSync:
+    """Relógio do processo, com a thread de sincronização já iniciada (recriado após ``fork``)."""
+    global _CLOCK, _CLOCK_PID
+    pid = os.getpid()
+    if _CLOCK is not None and _CLOCK_PID == pid:
+        return _CLOCK
+    with _CLOCK_LOCK:
+        if _CLOCK is None or _CLOCK_PID != pid:
+            _CLOCK = ClockSync(
+                interval=_env_float("KUCOIN_CLOCK_SYNC_INTERVAL", 60.0),
+                samples=int(_env_float("KUCOIN_CLOCK_SAMPLES", 4)),
+            ).start()
+            _CLOCK_PID = pid
+        return _CLOCK
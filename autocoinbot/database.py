@@ -9,8 +9,15 @@ import logging
 from pathlib import Path
 from typing import List, Dict, Any, Optional
 from datetime import datetime
-import psycopg
-from psycopg.rows import dict_row
+
+try:
+    from .db_pool import get_pool
+    from .db_migrations import ensure_schema, reset_schema_cache
+    from . import log_retention
+except ImportError:
+    from db_pool import get_pool
+    from db_migrations import ensure_schema, reset_schema_cache
+    import log_retention
 
 logger = logging.getLogger(__name__)
 
@@ -42,6 +49,33 @@ if load_dotenv:
 
 DB_DSN = os.environ.get("DATABASE_URL") or os.environ.get("TRADES_DB")
 
+_TRADE_COLUMNS = (
+    "id", "timestamp", "symbol", "side", "price", "size", "funds",
+    "profit", "commission", "order_id", "bot_id", "strategy",
+    "dry_run", "metadata",
+)
+_TRADE_COLUMNS_SQL = ", ".join(_TRADE_COLUMNS)
+
+
+def _trade_row(trade_data: Dict[str, Any]) -> tuple:
+    """Converte o dict de trade na tupla na ordem de ``_TRADE_COLUMNS``."""
+    return (
+        trade_data.get('id'),
+        trade_data.get('timestamp', time.time()),
+        trade_data.get('symbol'),
+        trade_data.get('side'),
+        trade_data.get('price'),
+        trade_data.get('size'),
+        trade_data.get('funds'),
+        trade_data.get('profit'),
+        trade_data.get('commission'),
+        trade_data.get('order_id'),
+        trade_data.get('bot_id'),
+        trade_data.get('strategy'),
+        bool(trade_data.get('dry_run', True)),
+        json.dumps(trade_data.get('metadata', {})),
+    )
+
 class DatabaseManager:
     # --- LEARNING (APRENDIZADO) ---
     def get_learning_symbols(self) -> list:
@@ -257,37 +291,25 @@ class DatabaseManager:
         cur = conn.cursor()
         
         try:
-            # Insere no histórico
+            # Histórico + média incremental numa única instrução: o ON CONFLICT
+            # trava a linha, então bots concorrentes não perdem atualizações.
             cur.execute("""
-                INSERT INTO learning_history (symbol, param_name, param_value, reward, timestamp)
-                VALUES (%s, %s, %s, %s, %s)
-            """, (symbol, param_name, param_value, reward, time.time()))
-            
-            # Atualiza ou insere estatísticas
-            cur.execute("""
-                SELECT mean_reward, n FROM learning_stats
-                WHERE symbol = %s AND param_name = %s AND param_value = %s
-            """, (symbol, param_name, param_value))
-            
-            row = cur.fetchone()
-            if row:
-                # Atualiza média incremental
-                old_mean = row['mean_reward']
-                old_n = row['n']
-                new_n = old_n + 1
-                new_mean = ((old_mean * old_n) + reward) / new_n
-                
-                cur.execute("""
-                    UPDATE learning_stats
-                    SET mean_reward = %s, n = %s
-                    WHERE symbol = %s AND param_name = %s AND param_value = %s
-                """, (new_mean, new_n, symbol, param_name, param_value))
-            else:
-                # Insere novo registro
-                cur.execute("""
-                    INSERT INTO learning_stats (symbol, param_name, param_value, mean_reward, n)
-                    VALUES (%s, %s, %s, %s, %s)
-                """, (symbol, param_name, param_value, reward, 1))
+                WITH hist AS (
+                    INSERT INTO learning_history (symbol, param_name, param_value, reward, timestamp)
+                    VALUES (%(symbol)s, %(param_name)s, %(param_value)s, %(reward)s, %(ts)s)
+                )
+                INSERT INTO learning_stats AS ls (symbol, param_name, param_value, mean_reward, n)
+                VALUES (%(symbol)s, %(param_name)s, %(param_value)s, %(reward)s, 1)
+                ON CONFLICT (symbol, param_name, param_value) DO UPDATE
+                SET mean_reward = ls.mean_reward + (EXCLUDED.mean_reward - ls.mean_reward) / (ls.n + 1),
+                    n = ls.n + 1
+            """, {
+                "symbol": symbol,
+                "param_name": param_name,
+                "param_value": param_value,
+                "reward": reward,
+                "ts": time.time(),
+            })
             
             conn.commit()
             logger.info(f"Bandit reward updated: {symbol} {param_name}={param_value} reward={reward}")
@@ -300,6 +322,60 @@ class DatabaseManager:
         finally:
             conn.close()
 
+    def update_bandit_rewards_bulk(self, updates: List[tuple], notify_channel: str | None = None) -> bool:
+        """
+        Aplica várias recompensas de uma vez (uma transação).
+
+        Args:
+            updates: Lista de ``(symbol, param_name, param_value, reward, timestamp)``
+            notify_channel: Se informado, faz ``pg_notify`` com ``symbol\\tparam_name``
+                para cada par alterado (entregue no commit).
+
+        Returns:
+            True se gravado com sucesso
+        """
+        if not updates:
+            return True
+        cols = list(zip(*updates))
+        conn = self.get_connection()
+        cur = conn.cursor()
+
+        try:
+            # Agrega por chave antes do upsert: ON CONFLICT não pode tocar a mesma
+            # linha duas vezes na mesma instrução.
+            cur.execute("""
+                WITH input AS (
+                    SELECT * FROM unnest(%s::text[], %s::text[], %s::float8[], %s::float8[], %s::float8[])
+                        AS u(symbol, param_name, param_value, reward, ts)
+                ),
+                hist AS (
+                    INSERT INTO learning_history (symbol, param_name, param_value, reward, timestamp)
+                    SELECT symbol, param_name, param_value, reward, ts FROM input
+                )
+                INSERT INTO learning_stats AS ls (symbol, param_name, param_value, mean_reward, n)
+                SELECT symbol, param_name, param_value, AVG(reward), COUNT(*)
+                FROM input
+                GROUP BY symbol, param_name, param_value
+                ON CONFLICT (symbol, param_name, param_value) DO UPDATE
+                SET mean_reward = (ls.mean_reward * ls.n + EXCLUDED.mean_reward * EXCLUDED.n) / (ls.n + EXCLUDED.n),
+                    n = ls.n + EXCLUDED.n
+            """, [list(c) for c in cols])
+
+            if notify_channel:
+                keys = sorted({(u[0], u[1]) for u in updates})
+                for symbol, param_name in keys:
+                    cur.execute("SELECT pg_notify(%s, %s)", (notify_channel, f"{symbol}\t{param_name}"))
+
+            conn.commit()
+            return True
+
+        except Exception as e:
+            logger.error(f"Erro ao gravar recompensas em lote: {e}")
+            conn.rollback()
+            return False
+        finally:
+            conn.close()
+
     """Gerencia todas as operações do banco de dados"""
 
     def __init__(self, db_dsn: str | None = DB_DSN, auto_init: bool = True):
@@ -307,158 +383,24 @@ class DatabaseManager:
         if not self.db_dsn:
             raise RuntimeError("DATABASE_URL/TRADES_DB nÇœo configurado para PostgreSQL")
         if auto_init:
-            self.init_database()
+            # Verificado uma vez por processo; depois disso não custa ida ao banco.
+            ensure_schema(self.db_dsn, self.get_connection)
     
     def get_connection(self):
-        """Obtém a conexão com o banco de dados com row factory"""
-        return psycopg.connect(self.db_dsn, row_factory=dict_row)
+        """Obtém uma conexão do pool do processo (row factory dict_row).
+
+        ``conn.close()`` devolve a conexão ao pool em vez de encerrá-la.
+        """
+        return get_pool(self.db_dsn).getconn()
+
+    def get_pool_stats(self) -> Dict[str, Any]:
+        """Estatísticas do pool de conexões usado por este manager."""
+        return get_pool(self.db_dsn).stats()
     
     def init_database(self):
-        """Inicializa o esquema do banco de dados"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        # Tabela Trades
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS trades (
-                id TEXT PRIMARY KEY,
-                timestamp DOUBLE PRECISION NOT NULL,
-                symbol TEXT NOT NULL,
-                side TEXT NOT NULL,
-                price DOUBLE PRECISION NOT NULL,
-                size DOUBLE PRECISION,
-                funds DOUBLE PRECISION,
-                profit DOUBLE PRECISION,
-                commission DOUBLE PRECISION,
-                order_id TEXT,
-                bot_id TEXT,
-                strategy TEXT,
-                dry_run BOOLEAN DEFAULT TRUE,
-                metadata JSONB,
-                created_at TIMESTAMPTZ DEFAULT NOW()
-            )
-        ''')
-        
-        # Tabela Bot sessions
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS bot_sessions (
-                id TEXT PRIMARY KEY,
-                pid INTEGER,
-                symbol TEXT NOT NULL,
-                mode TEXT NOT NULL,
-                entry_price DOUBLE PRECISION NOT NULL,
-                targets TEXT,
-                trailing_stop_pct DOUBLE PRECISION,
-                stop_loss_pct DOUBLE PRECISION,
-                size DOUBLE PRECISION,
-                funds DOUBLE PRECISION,
-                start_ts DOUBLE PRECISION NOT NULL,
-                end_ts DOUBLE PRECISION,
-                status TEXT DEFAULT 'running',
-                executed_parts TEXT,
-                remaining_fraction DOUBLE PRECISION,
-                total_profit DOUBLE PRECISION,
-                dry_run BOOLEAN DEFAULT TRUE,
-                created_at TIMESTAMPTZ DEFAULT NOW()
-            )
-        ''')
-        
-        # Tabela Equity snapshots (AGORA COM average_cost)
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS equity_snapshots (
-                id SERIAL PRIMARY KEY,
-                timestamp DOUBLE PRECISION NOT NULL,
-                balance_usdt DOUBLE PRECISION NOT NULL,
-                bot_id TEXT,
-                btc_price DOUBLE PRECISION,
-                average_cost DOUBLE PRECISION,  -- NOVO: Custo Médio Ponderado da Posição
-                num_positions INTEGER,
-                created_at TIMESTAMPTZ DEFAULT NOW()
-            )
-        ''')
-        
-        # Tabela Eternal Runs - histórico de ciclos do eternal mode
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS eternal_runs (
-                id SERIAL PRIMARY KEY,
-                bot_id TEXT NOT NULL,
-                run_number INTEGER NOT NULL,
-                symbol TEXT NOT NULL,
-                entry_price DOUBLE PRECISION NOT NULL,
-                exit_price DOUBLE PRECISION,
-                profit_pct DOUBLE PRECISION,
-                profit_usdt DOUBLE PRECISION,
-                targets_hit INTEGER DEFAULT 0,
-                total_targets INTEGER DEFAULT 0,
-                start_ts DOUBLE PRECISION NOT NULL,
-                end_ts DOUBLE PRECISION,
-                status TEXT DEFAULT 'running',
-                created_at TIMESTAMPTZ DEFAULT NOW()
-            )
-        ''')
-        
-        # Tabela Bot logs
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS bot_logs (
-                id SERIAL PRIMARY KEY,
-                bot_id TEXT NOT NULL,
-                timestamp DOUBLE PRECISION NOT NULL,
-                level TEXT NOT NULL,
-                message TEXT NOT NULL,
-                data TEXT,
-                created_at TIMESTAMPTZ DEFAULT NOW()
-            )
-        ''')
-        
-        # Tabela Risk metrics
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS risk_metrics (
-                id SERIAL PRIMARY KEY,
-                timestamp DOUBLE PRECISION NOT NULL,
-                metric_name TEXT NOT NULL,
-                metric_value DOUBLE PRECISION NOT NULL,
-                symbol TEXT,
-                created_at TIMESTAMPTZ DEFAULT NOW()
-            )
-        ''')
-        
-        # Tabela Learning stats (estatísticas de aprendizado por parâmetro)
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS learning_stats (
-                symbol TEXT NOT NULL,
-                param_name TEXT NOT NULL,
-                param_value DOUBLE PRECISION NOT NULL,
-                mean_reward DOUBLE PRECISION NOT NULL,
-                n INTEGER NOT NULL,
-                PRIMARY KEY (symbol, param_name, param_value)
-            )
-        ''')
-        
-        # Tabela Learning history (histórico de recompensas)
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS learning_history (
-                id SERIAL PRIMARY KEY,
-                symbol TEXT NOT NULL,
-                param_name TEXT NOT NULL,
-                param_value DOUBLE PRECISION NOT NULL,
-                reward DOUBLE PRECISION NOT NULL,
-                timestamp DOUBLE PRECISION NOT NULL
-            )
-        ''')
-        
-        # Cria índices
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_trades_timestamp ON trades(timestamp)')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_trades_symbol ON trades(symbol)')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_bot_sessions_status ON bot_sessions(status)')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_bot_logs_bot_id ON bot_logs(bot_id)')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_equity_timestamp ON equity_snapshots(timestamp)')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_learning_history_symbol_param ON learning_history(symbol, param_name)')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_learning_history_timestamp ON learning_history(timestamp)')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_learning_stats_symbol_param ON learning_stats(symbol, param_name)')       
-        
-        conn.commit()
-        conn.close()
-        logger.info("Database initialized successfully")
+        """Aplica as migrações pendentes do esquema (ver ``db_migrations``)."""
+        version = ensure_schema(self.db_dsn, self.get_connection, force=True)
+        logger.info(f"Database initialized successfully (schema v{version})")
     
     def get_bot_ids(self):
         """
@@ -488,28 +430,10 @@ class DatabaseManager:
             conn = self.get_connection()
             cursor = conn.cursor()
             
-            cursor.execute('''
-                INSERT INTO trades (
-                    id, timestamp, symbol, side, price, size, funds,
-                    profit, commission, order_id, bot_id, strategy,
-                    dry_run, metadata
-                ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-            ''', (
-                trade_data.get('id'),
-                trade_data.get('timestamp', time.time()),
-                trade_data.get('symbol'),
-                trade_data.get('side'),
-                trade_data.get('price'),
-                trade_data.get('size'),
-                trade_data.get('funds'),
-                trade_data.get('profit'),
-                trade_data.get('commission'),
-                trade_data.get('order_id'),
-                trade_data.get('bot_id'),
-                trade_data.get('strategy'),
-                bool(trade_data.get('dry_run', True)),
-                json.dumps(trade_data.get('metadata', {}))
-            ))
+            cursor.execute(f'''
+                INSERT INTO trades ({_TRADE_COLUMNS_SQL})
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+            ''', _trade_row(trade_data))
             
             conn.commit()
             conn.close()
@@ -518,6 +442,77 @@ class DatabaseManager:
         except Exception as e:
             logger.error(f"Error inserting trade: {e}")
             return False
+
+    def insert_trade_ignore(self, trade_data: Dict[str, Any]) -> bool:
+        """Insere um trade; se o ``id`` já existir, não faz nada (idempotente)."""
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            
+            cursor.execute(f'''
+                INSERT INTO trades ({_TRADE_COLUMNS_SQL})
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+                ON CONFLICT (id) DO NOTHING
+            ''', _trade_row(trade_data))
+            
+            conn.commit()
+            conn.close()
+            return True
+        except Exception as e:
+            logger.error(f"Error inserting trade: {e}")
+            return False
+
+    def insert_trades_bulk(self, trades: List[Dict[str, Any]]) -> Dict[str, int]:
+        """Insere muitos trades de forma idempotente numa única transação.
+
+        Os registros vão via COPY para uma tabela temporária e dali para
+        ``trades`` com ``ON CONFLICT (id) DO NOTHING``. Ids repetidos no próprio
+        lote contam uma vez. Registros sem campos obrigatórios são ignorados.
+
+        Retorna ``{"inserted": n, "skipped": m}`` (m inclui duplicados e inválidos).
+        """
+        rows = []
+        invalid = 0
+        for t in trades or []:
+            row = _trade_row(t) if isinstance(t, dict) else None
+            # id, timestamp, symbol, side, price são NOT NULL
+            if row is None or any(v is None for v in row[:5]):
+                invalid += 1
+                continue
+            rows.append(row)
+
+        total = len(rows) + invalid
+        if not rows:
+            return {"inserted": 0, "skipped": total}
+
+        conn = self.get_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute('''
+                CREATE TEMP TABLE IF NOT EXISTS trades_stage
+                (LIKE trades INCLUDING DEFAULTS) ON COMMIT DELETE ROWS
+            ''')
+            with cursor.copy(f"COPY trades_stage ({_TRADE_COLUMNS_SQL}) FROM STDIN") as copy:
+                for row in rows:
+                    copy.write_row(row)
+            cursor.execute(f'''
+                INSERT INTO trades ({_TRADE_COLUMNS_SQL})
+                SELECT DISTINCT ON (id) {_TRADE_COLUMNS_SQL}
+                FROM trades_stage
+                ORDER BY id
+                ON CONFLICT (id) DO NOTHING
+            ''')
+            inserted = max(0, cursor.rowcount or 0)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+        if invalid:
+            logger.warning(f"insert_trades_bulk: {invalid} registros inválidos ignorados")
+        return {"inserted": inserted, "skipped": total - inserted}
     
     def get_trades(self, bot_id: str = None):
         """
@@ -663,7 +658,7 @@ class DatabaseManager:
         try:
             conn = self.get_connection()
             cursor = conn.cursor()
-            cursor.execute("SELECT * FROM bot_sessions WHERE status = 'running'")
+            cursor.execute("SELECT * FROM bot_sessions WHERE status = 'running' ORDER BY start_ts DESC")
             rows = cursor.fetchall()
             conn.close()
             return [dict(row) for row in rows]
@@ -673,17 +668,47 @@ class DatabaseManager:
     
     # --- EQUITY SNAPSHOTS ---
     
+    # Resoluções mantidas em equity_rollups: nome -> largura do bucket (s)
+    EQUITY_RESOLUTIONS = (('1m', 60), ('1h', 3600), ('1d', 86400))
+
     def add_equity_snapshot(self, balance_usdt: float, btc_price: float = None,
-                           average_cost: float = None, num_positions: int = 0) -> bool:
-        """Adiciona um snapshot de patrimônio (equity)"""
+                           average_cost: float = None, num_positions: int = 0,
+                           bot_id: str = None, balances: Dict = None) -> bool:
+        """Adiciona um snapshot de patrimônio (equity) e atualiza os rollups OHLC"""
         try:
             conn = self.get_connection()
             cursor = conn.cursor()
+            ts = time.time()
             
             cursor.execute('''
-                INSERT INTO equity_snapshots (timestamp, balance_usdt, btc_price, average_cost, num_positions)
-                VALUES (%s, %s, %s, %s, %s)
-            ''', (time.time(), balance_usdt, btc_price, average_cost, num_positions))
+                INSERT INTO equity_snapshots (timestamp, balance_usdt, btc_price, average_cost,
+                                              num_positions, bot_id, balances)
+                VALUES (%s, %s, %s, %s, %s, %s, %s)
+            ''', (ts, balance_usdt, btc_price, average_cost, num_positions, bot_id,
+                  json.dumps(balances) if balances else None))
+
+            # Mesmo commit: os rollups nunca ficam atrás dos snapshots.
+            cursor.execute('''
+                INSERT INTO equity_rollups AS r (resolution, bot_id, bucket_ts, open, high, low,
+                                                 close, samples, first_ts, last_ts)
+                SELECT res, %(bot_id)s, floor(%(ts)s / width) * width,
+                       %(v)s, %(v)s, %(v)s, %(v)s, 1, %(ts)s, %(ts)s
+                FROM unnest(%(res)s::text[], %(widths)s::float8[]) AS t(res, width)
+                ON CONFLICT (resolution, bot_id, bucket_ts) DO UPDATE
+                SET open = CASE WHEN EXCLUDED.first_ts < r.first_ts THEN EXCLUDED.open ELSE r.open END,
+                    close = CASE WHEN EXCLUDED.last_ts >= r.last_ts THEN EXCLUDED.close ELSE r.close END,
+                    high = GREATEST(r.high, EXCLUDED.high),
+                    low = LEAST(r.low, EXCLUDED.low),
+                    samples = r.samples + 1,
+                    first_ts = LEAST(r.first_ts, EXCLUDED.first_ts),
+                    last_ts = GREATEST(r.last_ts, EXCLUDED.last_ts)
+            ''', {
+                "bot_id": bot_id or '',
+                "ts": ts,
+                "v": float(balance_usdt),
+                "res": [r for r, _ in self.EQUITY_RESOLUTIONS],
+                "widths": [w for _, w in self.EQUITY_RESOLUTIONS],
+            })
             
             conn.commit()
             conn.close()
@@ -712,6 +737,41 @@ class DatabaseManager:
         except Exception as e:
             logger.error(f"Error getting equity history: {e}")
             return []
+
+    def get_equity_series(self, days: float = 30, bot_id: str = None,
+                          max_points: int = 500) -> List[Dict]:
+        """Série OHLC de patrimônio com no máximo ~``max_points`` pontos.
+
+        Usa a resolução mais fina de ``EQUITY_RESOLUTIONS`` que cabe no limite
+        para a janela pedida. Cada linha traz ``timestamp`` (início do bucket),
+        ``open/high/low/close``, ``balance_usdt`` (= close), ``samples`` e
+        ``resolution``, compatível com quem já consumia ``get_equity_history``.
+        """
+        span = max(float(days), 0.0) * 86400
+        resolution, width = self.EQUITY_RESOLUTIONS[-1]
+        for res, w in self.EQUITY_RESOLUTIONS:
+            if span / w <= max_points:
+                resolution, width = res, w
+                break
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            
+            start_ts = (time.time() - span) // width * width
+            cursor.execute('''
+                SELECT bucket_ts AS timestamp, open, high, low, close,
+                       close AS balance_usdt, samples, resolution
+                FROM equity_rollups
+                WHERE resolution = %s AND bot_id = %s AND bucket_ts >= %s
+                ORDER BY bucket_ts ASC
+            ''', (resolution, bot_id or '', start_ts))
+            
+            rows = cursor.fetchall()
+            conn.close()
+            return [dict(row) for row in rows]
+        except Exception as e:
+            logger.error(f"Error getting equity series: {e}")
+            return []
     
     # --- BOT LOGS ---
     
@@ -734,7 +794,31 @@ class DatabaseManager:
         except Exception as e:
             logger.error(f"Error adding bot log: {e}")
             return False
-    
+
+    def add_bot_logs_bulk(self, records: List[tuple]) -> int:
+        """Grava vários logs de uma vez via COPY (uma conexão, um commit).
+
+        Cada registro é ``(bot_id, timestamp, level, message, data)``, com
+        ``data`` já serializado em JSON (ou None). Retorna quantos foram gravados.
+        """
+        if not records:
+            return 0
+        conn = self.get_connection()
+        try:
+            cursor = conn.cursor()
+            with cursor.copy(
+                "COPY bot_logs (bot_id, timestamp, level, message, data) FROM STDIN"
+            ) as copy:
+                for rec in records:
+                    copy.write_row(rec)
+            conn.commit()
+            return len(records)
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
 
     def get_bot_logs(self, bot_id: str, limit: int = 30) -> List[Dict]:
         """Obtém os últimos N logs do bot em ordem decrescente (mais recentes primeiro)"""
@@ -743,21 +827,75 @@ class DatabaseManager:
             conn = self.get_connection()
             cursor = conn.cursor()
             
-            # ORDER BY timestamp DESC para retornar os mais recentes primeiro
+            # Uma ida ao banco: o índice (bot_id, timestamp) de cada partição
+            # entrega as linhas já ordenadas e o LIMIT encerra a varredura cedo.
             cursor.execute('''
                 SELECT * FROM bot_logs 
-                WHERE bot_id = %s 
+                WHERE bot_id = %s
                 ORDER BY timestamp DESC
                 LIMIT %s
             ''', (bot_id, limit))
-            
             rows = cursor.fetchall()
             conn.close()
             return [dict(row) for row in rows]
         except Exception as e:
             logger.error(f"Error getting bot logs: {e}")
             return []
+
+    def ensure_bot_logs_partitions(self, days_ahead: int = 3) -> int:
+        """Cria as partições diárias de bot_logs de hoje até ``days_ahead`` dias à frente."""
+        conn = self.get_connection()
+        try:
+            created = log_retention.ensure_partitions(conn.cursor(), days_ahead=days_ahead)
+            conn.commit()
+            return created
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
     
+    # --- SYNC WATERMARKS ---
+
+    def get_sync_watermark(self, source: str, account: str, scope: str = "") -> int | None:
+        """Última posição (ms) sincronizada para ``source``/``account``/``scope``."""
+        conn = self.get_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute(
+                "SELECT watermark_ms FROM sync_watermarks WHERE source = %s AND account = %s AND scope = %s",
+                (source, account, scope or ""),
+            )
+            row = cursor.fetchone()
+            return int(row["watermark_ms"]) if row else None
+        finally:
+            conn.close()
+
+    def set_sync_watermark(self, source: str, account: str, watermark_ms: int, scope: str = "") -> int:
+        """Avança a marca d'água (nunca retrocede); retorna o valor gravado."""
+        conn = self.get_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute(
+                '''
+                INSERT INTO sync_watermarks (source, account, scope, watermark_ms, updated_at)
+                VALUES (%s, %s, %s, %s, %s)
+                ON CONFLICT (source, account, scope) DO UPDATE
+                SET watermark_ms = GREATEST(sync_watermarks.watermark_ms, EXCLUDED.watermark_ms),
+                    updated_at = EXCLUDED.updated_at
+                RETURNING watermark_ms
+                ''',
+                (source, account, scope or "", int(watermark_ms), time.time()),
+            )
+            value = int(cursor.fetchone()["watermark_ms"])
+            conn.commit()
+            return value
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
     # --- ETERNAL RUNS ---
     
     def add_eternal_run(self, bot_id: str, run_number: int, symbol: str,
@@ -877,62 +1015,94 @@ class DatabaseManager:
     
     # --- ANALYTICS ---
     
-    def get_trade_statistics(self, symbol: str = None, days: int = 30) -> Dict:
-        """Calcula estatísticas de trade"""
+    # Expressões de agrupamento aceitas por get_trade_statistics
+    _STATS_GROUP_BY = {
+        'symbol': 'symbol',
+        'bot_id': 'bot_id',
+        'day': "to_char(to_timestamp(timestamp) AT TIME ZONE 'UTC', 'YYYY-MM-DD')",
+    }
+
+    def get_trade_statistics(self, symbol: str = None, days: int = 30,
+                             group_by: str = None, bot_id: str = None) -> Dict:
+        """Calcula estatísticas de trade (agregadas no PostgreSQL).
+
+        Args:
+            symbol: Filtrar por símbolo
+            days: Janela em dias
+            group_by: None, 'symbol', 'bot_id' ou 'day' (UTC, 'YYYY-MM-DD')
+            bot_id: Filtrar por bot
+
+        Returns:
+            Sem ``group_by``: dict de estatísticas ({} se não houver trades).
+            Com ``group_by``: {valor_do_grupo: dict de estatísticas}.
+        """
+        if group_by is not None and group_by not in self._STATS_GROUP_BY:
+            raise ValueError(f"group_by inválido: {group_by!r} (use symbol, bot_id ou day)")
         try:
             conn = self.get_connection()
             cursor = conn.cursor()
             
-            start_ts = time.time() - (days * 86400)
-            query = "SELECT * FROM trades WHERE timestamp >= %s"
-            params = [start_ts]
+            group_expr = self._STATS_GROUP_BY.get(group_by)
+            select_group = f"{group_expr} AS grp," if group_expr else ""
+            query = f"""
+                SELECT {select_group}
+                    COUNT(*) AS total_trades,
+                    COUNT(*) FILTER (WHERE profit > 0) AS winning_trades,
+                    COUNT(*) FILTER (WHERE profit < 0) AS losing_trades,
+                    COALESCE(SUM(profit), 0) AS total_profit,
+                    COALESCE(SUM(commission), 0) AS total_commission,
+                    COALESCE(SUM(profit) FILTER (WHERE profit > 0), 0) AS gross_win,
+                    COALESCE(SUM(profit) FILTER (WHERE profit < 0), 0) AS gross_loss
+                FROM trades
+                WHERE timestamp >= %s
+            """
+            params = [time.time() - (days * 86400)]
             
             if symbol:
                 query += " AND symbol = %s"
                 params.append(symbol)
+            if bot_id:
+                query += " AND bot_id = %s"
+                params.append(bot_id)
+            if group_expr:
+                query += " GROUP BY 1 ORDER BY 1"
             
             cursor.execute(query, params)
-            trades = [dict(row) for row in cursor.fetchall()]
+            rows = cursor.fetchall()
             conn.close()
             
-            if not trades:
+            if group_expr:
+                return {row['grp']: self._trade_stats_from_row(row) for row in rows}
+            if not rows or not rows[0]['total_trades']:
                 return {}
-            
-            total_trades = len(trades)
-            profitable = [t for t in trades if t.get('profit', 0) > 0]
-            losing = [t for t in trades if t.get('profit', 0) < 0]
-            
-            total_profit = sum(t.get('profit', 0) for t in trades)
-            total_commission = sum(t.get('commission', 0) for t in trades)
-            
-            win_rate = len(profitable) / total_trades if total_trades > 0 else 0
-            
-            avg_win = (sum(t['profit'] for t in profitable) / len(profitable) 
-                      if profitable else 0)
-            avg_loss = (sum(t['profit'] for t in losing) / len(losing) 
-                       if losing else 0)
-            
-            profit_factor = (sum(t['profit'] for t in profitable) / 
-                           abs(sum(t['profit'] for t in losing)) 
-                           if losing and sum(t['profit'] for t in losing) != 0 
-                           else 0)
-            
-            return {
-                'total_trades': total_trades,
-                'winning_trades': len(profitable),
-                'losing_trades': len(losing),
-                'win_rate': win_rate,
-                'total_profit': total_profit,
-                'total_commission': total_commission,
-                'net_profit': total_profit - total_commission,
-                'avg_win': avg_win,
-                'avg_loss': avg_loss,
-                'profit_factor': profit_factor
-            }
+            return self._trade_stats_from_row(rows[0])
         except Exception as e:
             logger.error(f"Error calculating statistics: {e}")
             return {}
 
+    @staticmethod
+    def _trade_stats_from_row(row: Dict) -> Dict:
+        """Deriva win rate, médias e profit factor dos agregados."""
+        total_trades = int(row['total_trades'] or 0)
+        wins = int(row['winning_trades'] or 0)
+        losses = int(row['losing_trades'] or 0)
+        total_profit = float(row['total_profit'] or 0)
+        total_commission = float(row['total_commission'] or 0)
+        gross_win = float(row['gross_win'] or 0)
+        gross_loss = float(row['gross_loss'] or 0)
+        return {
+            'total_trades': total_trades,
+            'winning_trades': wins,
+            'losing_trades': losses,
+            'win_rate': wins / total_trades if total_trades > 0 else 0,
+            'total_profit': total_profit,
+            'total_commission': total_commission,
+            'net_profit': total_profit - total_commission,
+            'avg_win': gross_win / wins if wins else 0,
+            'avg_loss': gross_loss / losses if losses else 0,
+            'profit_factor': gross_win / abs(gross_loss) if gross_loss != 0 else 0
+        }
+
 # Instância Global - criada sob demanda para evitar erros em imports
 db = None
 
@@ -959,7 +1129,21 @@ def _drop_and_create_tables():
     cur.execute("DROP TABLE IF EXISTS trades")
     cur.execute("DROP TABLE IF EXISTS equity_snapshots")
     cur.execute("DROP TABLE IF EXISTS bot_sessions")
-    cur.execute("DROP TABLE IF EXISTS bot_logs")
+    # Partições diárias de bot_logs, anexadas ou soltas (ex.: DETACH sem DROP)
+    cur.execute(
+        "SELECT tablename FROM pg_tables WHERE schemaname = current_schema() AND tablename LIKE %s",
+        (log_retention.PARTITION_PREFIX + "%",),
+    )
+    for row in cur.fetchall():
+        cur.execute(f'DROP TABLE IF EXISTS "{row["tablename"]}" CASCADE')
+    cur.execute(f"DROP TABLE IF EXISTS {log_retention.DEFAULT_PARTITION} CASCADE")
+    cur.execute("DROP TABLE IF EXISTS bot_logs CASCADE")
+    # Tabelas criadas pelas migrações 3-5 (senão a migração 3 falha ao renomear bot_logs)
+    cur.execute("DROP TABLE IF EXISTS bot_logs_legacy CASCADE")
+    cur.execute("DROP TABLE IF EXISTS bot_logs_hourly CASCADE")
+    cur.execute("DROP TABLE IF EXISTS equity_rollups CASCADE")
+    cur.execute("DROP TABLE IF EXISTS sync_watermarks CASCADE")
+    cur.execute("DROP TABLE IF EXISTS schema_version")
 
     # ==========================
     # CREATE TABLES
@@ -1062,6 +1246,8 @@ def _drop_and_create_tables():
 
     conn.commit()
     conn.close()
+    # Força a próxima verificação a reaplicar as migrações
+    reset_schema_cache()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,392 @@
+# db_migrations.py
+# Migrações versionadas do esquema PostgreSQL
+
+"""
+Migrações versionadas do esquema do banco.
+
+Cada migração é registrada em ``schema_version`` quando aplicada. A verificação
+é feita uma única vez por processo e por DSN: depois disso, criar um
+``DatabaseManager`` não faz nenhuma ida ao banco.
+
+Para alterar o esquema, acrescente uma nova ``Migration`` ao final de
+``MIGRATIONS`` com a próxima versão; nunca edite migrações já publicadas.
+"""
+
+import os
+import time
+import logging
+import threading
+from typing import Callable, Dict, NamedTuple, Sequence, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+# Chave fixa do pg_advisory_xact_lock: serializa migrações entre processos.
+_ADVISORY_LOCK_KEY = 0x4143_424D  # "ACBM"
+
+
+class Migration(NamedTuple):
+    version: int
+    description: str
+    # SQLs executados em ordem, ou função que recebe o cursor
+    statements: Union[Sequence[str], Callable]
+
+
+_BASELINE = (
+    '''
+    CREATE TABLE IF NOT EXISTS trades (
+        id TEXT PRIMARY KEY,
+        timestamp DOUBLE PRECISION NOT NULL,
+        symbol TEXT NOT NULL,
+        side TEXT NOT NULL,
+        price DOUBLE PRECISION NOT NULL,
+        size DOUBLE PRECISION,
+        funds DOUBLE PRECISION,
+        profit DOUBLE PRECISION,
+        commission DOUBLE PRECISION,
+        order_id TEXT,
+        bot_id TEXT,
+        strategy TEXT,
+        dry_run BOOLEAN DEFAULT TRUE,
+        metadata JSONB,
+        created_at TIMESTAMPTZ DEFAULT NOW()
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS bot_sessions (
+        id TEXT PRIMARY KEY,
+        pid INTEGER,
+        symbol TEXT NOT NULL,
+        mode TEXT NOT NULL,
+        entry_price DOUBLE PRECISION NOT NULL,
+        targets TEXT,
+        trailing_stop_pct DOUBLE PRECISION,
+        stop_loss_pct DOUBLE PRECISION,
+        size DOUBLE PRECISION,
+        funds DOUBLE PRECISION,
+        start_ts DOUBLE PRECISION NOT NULL,
+        end_ts DOUBLE PRECISION,
+        status TEXT DEFAULT 'running',
+        executed_parts TEXT,
+        remaining_fraction DOUBLE PRECISION,
+        total_profit DOUBLE PRECISION,
+        dry_run BOOLEAN DEFAULT TRUE,
+        created_at TIMESTAMPTZ DEFAULT NOW()
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS equity_snapshots (
+        id SERIAL PRIMARY KEY,
+        timestamp DOUBLE PRECISION NOT NULL,
+        balance_usdt DOUBLE PRECISION NOT NULL,
+        bot_id TEXT,
+        btc_price DOUBLE PRECISION,
+        average_cost DOUBLE PRECISION,  -- Custo Médio Ponderado da Posição
+        num_positions INTEGER,
+        created_at TIMESTAMPTZ DEFAULT NOW()
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS eternal_runs (
+        id SERIAL PRIMARY KEY,
+        bot_id TEXT NOT NULL,
+        run_number INTEGER NOT NULL,
+        symbol TEXT NOT NULL,
+        entry_price DOUBLE PRECISION NOT NULL,
+        exit_price DOUBLE PRECISION,
+        profit_pct DOUBLE PRECISION,
+        profit_usdt DOUBLE PRECISION,
+        targets_hit INTEGER DEFAULT 0,
+        total_targets INTEGER DEFAULT 0,
+        start_ts DOUBLE PRECISION NOT NULL,
+        end_ts DOUBLE PRECISION,
+        status TEXT DEFAULT 'running',
+        created_at TIMESTAMPTZ DEFAULT NOW()
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS bot_logs (
+        id SERIAL PRIMARY KEY,
+        bot_id TEXT NOT NULL,
+        timestamp DOUBLE PRECISION NOT NULL,
+        level TEXT NOT NULL,
+        message TEXT NOT NULL,
+        data TEXT,
+        created_at TIMESTAMPTZ DEFAULT NOW()
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS risk_metrics (
+        id SERIAL PRIMARY KEY,
+        timestamp DOUBLE PRECISION NOT NULL,
+        metric_name TEXT NOT NULL,
+        metric_value DOUBLE PRECISION NOT NULL,
+        symbol TEXT,
+        created_at TIMESTAMPTZ DEFAULT NOW()
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS learning_stats (
+        symbol TEXT NOT NULL,
+        param_name TEXT NOT NULL,
+        param_value DOUBLE PRECISION NOT NULL,
+        mean_reward DOUBLE PRECISION NOT NULL,
+        n INTEGER NOT NULL,
+        PRIMARY KEY (symbol, param_name, param_value)
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS learning_history (
+        id SERIAL PRIMARY KEY,
+        symbol TEXT NOT NULL,
+        param_name TEXT NOT NULL,
+        param_value DOUBLE PRECISION NOT NULL,
+        reward DOUBLE PRECISION NOT NULL,
+        timestamp DOUBLE PRECISION NOT NULL
+    )
+    ''',
+    'CREATE INDEX IF NOT EXISTS idx_trades_timestamp ON trades(timestamp)',
+    'CREATE INDEX IF NOT EXISTS idx_trades_symbol ON trades(symbol)',
+    'CREATE INDEX IF NOT EXISTS idx_bot_sessions_status ON bot_sessions(status)',
+    'CREATE INDEX IF NOT EXISTS idx_bot_logs_bot_id ON bot_logs(bot_id)',
+    'CREATE INDEX IF NOT EXISTS idx_equity_timestamp ON equity_snapshots(timestamp)',
+    'CREATE INDEX IF NOT EXISTS idx_learning_history_symbol_param ON learning_history(symbol, param_name)',
+    'CREATE INDEX IF NOT EXISTS idx_learning_history_timestamp ON learning_history(timestamp)',
+    'CREATE INDEX IF NOT EXISTS idx_learning_stats_symbol_param ON learning_stats(symbol, param_name)',
+)
+
+
+def _partition_bot_logs(cur):
+    """Converte ``bot_logs`` em tabela particionada por dia (RANGE em timestamp).
+
+    A tabela antiga vira ``bot_logs_legacy``; só a janela de retenção é copiada
+    agora. O restante é resumido e removido pelo ``log_retention.run_retention``.
+    """
+    try:
+        from . import log_retention
+    except ImportError:
+        import log_retention
+
+    if log_retention.is_partitioned(cur):
+        return
+
+    cur.execute("SELECT to_regclass('bot_logs') AS reg")
+    row = cur.fetchone()
+    had_table = (row["reg"] if isinstance(row, dict) else row[0]) is not None
+    if had_table:
+        cur.execute("ALTER TABLE bot_logs RENAME TO bot_logs_legacy")
+        cur.execute("ALTER TABLE bot_logs_legacy RENAME CONSTRAINT bot_logs_pkey TO bot_logs_legacy_pkey")
+        cur.execute("ALTER INDEX IF EXISTS idx_bot_logs_bot_ts RENAME TO idx_bot_logs_legacy_bot_ts")
+        cur.execute("ALTER INDEX IF EXISTS idx_bot_logs_bot_id RENAME TO idx_bot_logs_legacy_bot_id")
+        # A sequência continua gerando os ids da tabela nova.
+        cur.execute("ALTER SEQUENCE IF EXISTS bot_logs_id_seq OWNED BY NONE")
+    cur.execute("CREATE SEQUENCE IF NOT EXISTS bot_logs_id_seq")
+
+    cur.execute('''
+        CREATE TABLE bot_logs (
+            id BIGINT NOT NULL DEFAULT nextval('bot_logs_id_seq'),
+            bot_id TEXT NOT NULL,
+            timestamp DOUBLE PRECISION NOT NULL,
+            level TEXT NOT NULL,
+            message TEXT NOT NULL,
+            data TEXT,
+            created_at TIMESTAMPTZ DEFAULT NOW(),
+            PRIMARY KEY (id, timestamp)
+        ) PARTITION BY RANGE (timestamp)
+    ''')
+    cur.execute("ALTER SEQUENCE bot_logs_id_seq OWNED BY bot_logs.id")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_bot_logs_bot_ts ON bot_logs(bot_id, timestamp DESC)")
+    cur.execute(f"CREATE TABLE {log_retention.DEFAULT_PARTITION} PARTITION OF bot_logs DEFAULT")
+
+    keep_days = log_retention.retention_days()
+    log_retention.ensure_partitions(cur, days_ahead=3, days_back=keep_days)
+
+    cur.execute('''
+        CREATE TABLE IF NOT EXISTS bot_logs_hourly (
+            bot_id TEXT NOT NULL,
+            hour_ts DOUBLE PRECISION NOT NULL,
+            event TEXT NOT NULL,
+            n INTEGER NOT NULL,
+            errors INTEGER NOT NULL DEFAULT 0,
+            last_ts DOUBLE PRECISION,
+            last_price DOUBLE PRECISION,
+            PRIMARY KEY (bot_id, hour_ts, event)
+        )
+    ''')
+
+    if had_table:
+        cutoff = time.time() - keep_days * 86400
+        cur.execute('''
+            WITH moved AS (
+                DELETE FROM bot_logs_legacy WHERE timestamp >= %s
+                RETURNING id, bot_id, timestamp, level, message, data, created_at
+            )
+            INSERT INTO bot_logs (id, bot_id, timestamp, level, message, data, created_at)
+            SELECT * FROM moved
+        ''', (cutoff,))
+
+
+# Lista ordenada de migrações. A versão 1 é o esquema original (IF NOT EXISTS),
+# então bancos criados antes deste módulo são adotados sem alteração.
+MIGRATIONS: Tuple[Migration, ...] = (
+    Migration(1, "esquema base", _BASELINE),
+    Migration(2, "índices compostos para as consultas quentes", (
+        # get_bot_logs: WHERE bot_id ORDER BY timestamp DESC LIMIT n
+        'CREATE INDEX IF NOT EXISTS idx_bot_logs_bot_ts ON bot_logs(bot_id, timestamp DESC)',
+        'DROP INDEX IF EXISTS idx_bot_logs_bot_id',
+        # get_trade_history_grouped: DISTINCT ON (order_id) ORDER BY order_id, timestamp DESC
+        'CREATE INDEX IF NOT EXISTS idx_trades_order_ts ON trades(order_id, timestamp DESC)',
+        # get_trades(bot_id): cobre SELECT timestamp, profit sem ir à tabela
+        'CREATE INDEX IF NOT EXISTS idx_trades_bot_ts ON trades(bot_id, timestamp) INCLUDE (profit)',
+        # get_active_bots / monitor: WHERE status ORDER BY start_ts DESC
+        'CREATE INDEX IF NOT EXISTS idx_bot_sessions_status_start ON bot_sessions(status, start_ts DESC)',
+        'DROP INDEX IF EXISTS idx_bot_sessions_status',
+    )),
+    Migration(3, "bot_logs particionada por dia + bot_logs_hourly", _partition_bot_logs),
+    Migration(4, "rollups OHLC de equity (1m/1h/1d) por bot", (
+        'ALTER TABLE equity_snapshots ADD COLUMN IF NOT EXISTS balances JSONB',
+        '''
+        CREATE TABLE IF NOT EXISTS equity_rollups (
+            resolution TEXT NOT NULL,
+            bot_id TEXT NOT NULL DEFAULT '',  -- '' = patrimônio global
+            bucket_ts DOUBLE PRECISION NOT NULL,
+            open DOUBLE PRECISION NOT NULL,
+            high DOUBLE PRECISION NOT NULL,
+            low DOUBLE PRECISION NOT NULL,
+            close DOUBLE PRECISION NOT NULL,
+            samples INTEGER NOT NULL,
+            first_ts DOUBLE PRECISION NOT NULL,
+            last_ts DOUBLE PRECISION NOT NULL,
+            PRIMARY KEY (resolution, bot_id, bucket_ts)
+        )
+        ''',
+        # Carga inicial a partir dos snapshots existentes
+        '''
+        INSERT INTO equity_rollups (resolution, bot_id, bucket_ts, open, high, low, close,
+                                    samples, first_ts, last_ts)
+        SELECT r.resolution, COALESCE(s.bot_id, ''), floor(s.timestamp / r.width) * r.width,
+               (array_agg(s.balance_usdt ORDER BY s.timestamp))[1],
+               MAX(s.balance_usdt), MIN(s.balance_usdt),
+               (array_agg(s.balance_usdt ORDER BY s.timestamp DESC))[1],
+               COUNT(*), MIN(s.timestamp), MAX(s.timestamp)
+        FROM equity_snapshots s
+        CROSS JOIN (VALUES ('1m', 60), ('1h', 3600), ('1d', 86400)) AS r(resolution, width)
+        GROUP BY 1, 2, 3
+        ON CONFLICT DO NOTHING
+        ''',
+    )),
+    Migration(5, "marcas d'água de sincronização incremental", (
+        '''
+        CREATE TABLE IF NOT EXISTS sync_watermarks (
+            source TEXT NOT NULL,            -- ex.: 'kucoin_fills'
+            account TEXT NOT NULL,           -- impressão digital da API key
+            scope TEXT NOT NULL DEFAULT '',  -- símbolo ('' = todos)
+            watermark_ms BIGINT NOT NULL,
+            updated_at DOUBLE PRECISION NOT NULL,
+            PRIMARY KEY (source, account, scope)
+        )
+        ''',
+    )),
+)
+
+
+def latest_version() -> int:
+    return MIGRATIONS[-1].version if MIGRATIONS else 0
+
+
+# ====================== CACHE POR PROCESSO ======================
+# dsn -> (pid, versão confirmada)
+_CHECKED: Dict[str, Tuple[int, int]] = {}
+_CHECK_LOCK = threading.Lock()
+
+
+def _read_version(cur) -> int:
+    cur.execute("SELECT to_regclass('schema_version') AS reg")
+    row = cur.fetchone()
+    reg = row["reg"] if isinstance(row, dict) else row[0]
+    if reg is None:
+        return 0
+    cur.execute("SELECT COALESCE(MAX(version), 0) AS v FROM schema_version")
+    row = cur.fetchone()
+    return int(row["v"] if isinstance(row, dict) else row[0])
+
+
+def apply_migrations(conn) -> int:
+    """Aplica as migrações pendentes usando ``conn``. Retorna a versão final.
+
+    Tudo roda numa única transação sob ``pg_advisory_xact_lock``: vários
+    processos subindo ao mesmo tempo esperam o primeiro terminar.
+    """
+    target = latest_version()
+    cur = conn.cursor()
+    try:
+        current = _read_version(cur)
+        if current >= target:
+            conn.rollback()
+            return current
+
+        cur.execute("SELECT pg_advisory_xact_lock(%s)", (_ADVISORY_LOCK_KEY,))
+        cur.execute('''
+            CREATE TABLE IF NOT EXISTS schema_version (
+                version INTEGER PRIMARY KEY,
+                description TEXT,
+                applied_at TIMESTAMPTZ DEFAULT NOW()
+            )
+        ''')
+        # Relê com o lock: outro processo pode ter migrado enquanto esperávamos.
+        current = _read_version(cur)
+        for mig in MIGRATIONS:
+            if mig.version <= current:
+                continue
+            t0 = time.time()
+            if callable(mig.statements):
+                mig.statements(cur)
+            else:
+                for sql in mig.statements:
+                    cur.execute(sql)
+            cur.execute(
+                "INSERT INTO schema_version (version, description) VALUES (%s, %s)",
+                (mig.version, mig.description),
+            )
+            logger.info(f"Migração {mig.version} aplicada ({mig.description}) em {time.time() - t0:.2f}s")
+            current = mig.version
+        conn.commit()
+        return current
+    except Exception:
+        try:
+            conn.rollback()
+        except Exception:
+            pass
+        raise
+
+
+def ensure_schema(dsn: str, get_connection: Callable, force: bool = False) -> int:
+    """Garante o esquema atualizado para ``dsn``, uma vez por processo.
+
+    Chamadas seguintes retornam do cache sem tocar no banco. ``force=True``
+    ignora o cache (usado por ``DatabaseManager.init_database``).
+    """
+    pid = os.getpid()
+    target = latest_version()
+    if not force:
+        cached = _CHECKED.get(dsn)
+        if cached and cached[0] == pid and cached[1] >= target:
+            return cached[1]
+
+    with _CHECK_LOCK:
+        if not force:
+            cached = _CHECKED.get(dsn)
+            if cached and cached[0] == pid and cached[1] >= target:
+                return cached[1]
+        conn = get_connection()
+        try:
+            version = apply_migrations(conn)
+        finally:
+            conn.close()
+        _CHECKED[dsn] = (pid, version)
+        return version
+
+
+def reset_schema_cache():
+    """Esquece as verificações feitas (ex.: após recriar as tabelas)."""
+    with _CHECK_LOCK:
+        _CHECKED.clear()
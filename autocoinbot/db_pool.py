@@ -0,0 +1,378 @@
+# db_pool.py
+# Pool de conexões PostgreSQL compartilhado por processo
+
+"""
+Pool de conexões PostgreSQL limitado, compartilhado por todo o processo.
+
+Todas as instâncias de ``DatabaseManager`` (UI, API local, bots) pegam conexões
+daqui em vez de abrir um ``psycopg.connect`` novo por consulta. A conexão
+devolvida é um proxy: ``conn.close()`` devolve ao pool em vez de encerrar o
+socket, então o código existente continua funcionando sem mudanças.
+
+Configuração via variáveis de ambiente:
+    DB_POOL_MIN_SIZE        conexões mantidas abertas (padrão 1)
+    DB_POOL_MAX_SIZE        limite de conexões simultâneas (padrão 10)
+    DB_POOL_MAX_IDLE        segundos ociosos antes de fechar o excedente (padrão 300)
+    DB_POOL_TIMEOUT         segundos aguardando conexão livre (padrão 30)
+    DB_POOL_CHECK_INTERVAL  ociosidade mínima para validar com SELECT 1 (padrão 30)
+"""
+
+import os
+import time
+import atexit
+import logging
+import threading
+from collections import deque
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.environ.get(name, default))
+    except Exception:
+        return float(default)
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.environ.get(name, default))
+    except Exception:
+        return int(default)
+
+
+class PoolTimeout(RuntimeError):
+    """Nenhuma conexão ficou livre dentro do timeout configurado."""
+
+
+class PooledConnection:
+    """Proxy de conexão emprestada do pool.
+
+    Delega tudo para a conexão psycopg real; ``close()`` devolve ao pool.
+    Usado como context manager, faz commit/rollback como o psycopg e devolve.
+    """
+
+    __slots__ = ("_pool", "_conn", "__weakref__")
+
+    def __init__(self, pool: "ConnectionPool", conn: Any):
+        self._pool = pool
+        self._conn = conn
+
+    def __getattr__(self, name):
+        conn = self._conn
+        if conn is None:
+            raise RuntimeError("Conexão já devolvida ao pool")
+        return getattr(conn, name)
+
+    @property
+    def closed(self) -> bool:
+        return self._conn is None or bool(getattr(self._conn, "closed", False))
+
+    def close(self):
+        conn, self._conn = self._conn, None
+        if conn is not None:
+            self._pool._putconn(conn)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        conn = self._conn
+        if conn is not None:
+            try:
+                if exc_type is None:
+                    conn.commit()
+                else:
+                    conn.rollback()
+            except Exception:
+                pass
+        self.close()
+
+    def __del__(self):
+        # Conexão esquecida sem close(): devolve para não vazar capacidade do pool.
+        try:
+            self.close()
+        except Exception:
+            pass
+
+
+class ConnectionPool:
+    """Pool limitado (min/max) com descarte por ociosidade e health check."""
+
+    def __init__(
+        self,
+        dsn: str,
+        min_size: int = 1,
+        max_size: int = 10,
+        max_idle: float = 300.0,
+        timeout: float = 30.0,
+        check_interval: float = 30.0,
+        connect: Optional[Callable[[str], Any]] = None,
+    ):
+        self.dsn = dsn
+        self.min_size = max(0, int(min_size))
+        self.max_size = max(1, int(max_size), self.min_size)
+        self.max_idle = float(max_idle)
+        self.timeout = float(timeout)
+        self.check_interval = float(check_interval)
+        self._connect_fn = connect or _default_connect
+        # RLock: o __del__ do proxy pode rodar (GC) dentro de uma seção crítica da mesma thread.
+        self._cond = threading.Condition(threading.RLock())
+        # (conn, devolvida_em) — LIFO para manter conexões "quentes" e deixar o excedente ocioso
+        self._idle: deque = deque()
+        self._open = 0
+        self._checked_out = 0
+        self._waiting = 0
+        self._closed = False
+        self._stats = {
+            "connections_created": 0,
+            "connections_closed": 0,
+            "connections_discarded": 0,
+            "requests": 0,
+            "requests_waited": 0,
+            "requests_timeout": 0,
+            "wait_time_total_s": 0.0,
+        }
+        self._pid = os.getpid()
+
+    # ---------- API pública ----------
+
+    def getconn(self, timeout: Optional[float] = None) -> PooledConnection:
+        """Empresta uma conexão (bloqueia até ``timeout`` se o pool estiver cheio)."""
+        deadline = time.monotonic() + (self.timeout if timeout is None else float(timeout))
+        t0 = time.monotonic()
+        waited = False
+        with self._cond:
+            self._stats["requests"] += 1
+        while True:
+            conn = None
+            must_create = False
+            with self._cond:
+                if self._closed:
+                    raise RuntimeError("Pool de conexões encerrado")
+                self._reap_idle_locked()
+                if self._idle:
+                    conn, returned_at = self._idle.pop()
+                    self._checked_out += 1
+                elif self._open < self.max_size:
+                    self._open += 1
+                    self._checked_out += 1
+                    must_create = True
+                else:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._stats["requests_timeout"] += 1
+                        raise PoolTimeout(
+                            f"Timeout aguardando conexão do pool (max_size={self.max_size})"
+                        )
+                    if not waited:
+                        self._stats["requests_waited"] += 1
+                        waited = True
+                    self._waiting += 1
+                    try:
+                        self._cond.wait(remaining)
+                    finally:
+                        self._waiting -= 1
+                    continue
+
+            if waited:
+                with self._cond:
+                    self._stats["wait_time_total_s"] += time.monotonic() - t0
+                waited = False
+
+            if must_create:
+                try:
+                    conn = self._connect_fn(self.dsn)
+                except Exception:
+                    with self._cond:
+                        self._open -= 1
+                        self._checked_out -= 1
+                        self._cond.notify()
+                    raise
+                with self._cond:
+                    self._stats["connections_created"] += 1
+                return PooledConnection(self, conn)
+
+            # Conexão reaproveitada: valida se está ociosa há tempo suficiente.
+            if self._is_healthy(conn, time.time() - returned_at):
+                return PooledConnection(self, conn)
+            self._discard(conn, checked_out=True)
+            # tenta de novo (vai criar outra ou pegar a próxima ociosa)
+
+    def connection(self, timeout: Optional[float] = None) -> PooledConnection:
+        """Atalho para ``with pool.connection() as conn:``."""
+        return self.getconn(timeout=timeout)
+
+    def stats(self) -> Dict[str, Any]:
+        """Métricas para dimensionar o pool."""
+        with self._cond:
+            out = dict(self._stats)
+            out.update({
+                "pool_min": self.min_size,
+                "pool_max": self.max_size,
+                "pool_size": self._open,
+                "pool_available": len(self._idle),
+                "checked_out": self._checked_out,
+                "waiting": self._waiting,
+                "pid": self._pid,
+            })
+        return out
+
+    def close(self):
+        """Fecha todas as conexões ociosas e recusa novos empréstimos."""
+        with self._cond:
+            self._closed = True
+            idle = list(self._idle)
+            self._idle.clear()
+            self._open -= len(idle)
+            self._cond.notify_all()
+        for conn, _ in idle:
+            self._close_quietly(conn)
+
+    # ---------- internos ----------
+
+    def _putconn(self, conn: Any):
+        reusable = not getattr(conn, "closed", False)
+        if reusable:
+            try:
+                # Nunca devolver conexão com transação aberta/abortada.
+                status = conn.info.transaction_status
+                if status != _TX_IDLE:
+                    conn.rollback()
+            except Exception:
+                reusable = False
+        with self._cond:
+            self._checked_out -= 1
+            if reusable and not self._closed and os.getpid() == self._pid:
+                self._idle.append((conn, time.time()))
+                self._cond.notify()
+                return
+            self._open -= 1
+            self._stats["connections_discarded"] += 1
+            self._cond.notify()
+        self._close_quietly(conn)
+
+    def _discard(self, conn: Any, checked_out: bool):
+        with self._cond:
+            self._open -= 1
+            if checked_out:
+                self._checked_out -= 1
+            self._stats["connections_discarded"] += 1
+            self._cond.notify()
+        self._close_quietly(conn)
+
+    def _reap_idle_locked(self):
+        """Fecha conexões ociosas além de ``min_size`` há mais de ``max_idle``."""
+        if self.max_idle <= 0:
+            return
+        now = time.time()
+        while self._idle and self._open > self.min_size:
+            conn, returned_at = self._idle[0]
+            if now - returned_at < self.max_idle:
+                break
+            self._idle.popleft()
+            self._open -= 1
+            self._stats["connections_closed"] += 1
+            self._close_quietly(conn)
+
+    def _is_healthy(self, conn: Any, idle_for: float) -> bool:
+        if getattr(conn, "closed", False):
+            return False
+        try:
+            if getattr(conn, "broken", False):
+                return False
+        except Exception:
+            pass
+        if idle_for < self.check_interval:
+            return True
+        try:
+            conn.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except Exception as e:
+            logger.warning(f"Conexão do pool descartada no health check: {e}")
+            return False
+
+    @staticmethod
+    def _close_quietly(conn: Any):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+
+try:
+    from psycopg.pq import TransactionStatus as _TransactionStatus
+    _TX_IDLE = _TransactionStatus.IDLE
+except Exception:
+    _TX_IDLE = 0
+
+
+def _default_connect(dsn: str):
+    import psycopg
+    from psycopg.rows import dict_row
+    return psycopg.connect(dsn, row_factory=dict_row)
+
+
+# ====================== POOL GLOBAL (POR PROCESSO) ======================
+_POOLS: Dict[str, ConnectionPool] = {}
+_POOLS_LOCK = threading.Lock()
+
+
+def get_pool(dsn: str) -> ConnectionPool:
+    """Retorna o pool do processo para ``dsn`` (cria sob demanda).
+
+    Após ``fork`` o pool herdado é descartado: sockets não podem ser compartilhados
+    entre processos.
+    """
+    pid = os.getpid()
+    with _POOLS_LOCK:
+        pool = _POOLS.get(dsn)
+        if pool is not None and pool._pid == pid:
+            return pool
+        pool = ConnectionPool(
+            dsn,
+            min_size=_env_int("DB_POOL_MIN_SIZE", 1),
+            max_size=_env_int("DB_POOL_MAX_SIZE", 10),
+            max_idle=_env_float("DB_POOL_MAX_IDLE", 300.0),
+            timeout=_env_float("DB_POOL_TIMEOUT", 30.0),
+            check_interval=_env_float("DB_POOL_CHECK_INTERVAL", 30.0),
+        )
+        _POOLS[dsn] = pool
+        return pool
+
+
+def get_pool_stats() -> Dict[str, Dict[str, Any]]:
+    """Estatísticas de todos os pools do processo (chave = host/db sem senha)."""
+    with _POOLS_LOCK:
+        pools = list(_POOLS.items())
+    return {_safe_dsn(dsn): pool.stats() for dsn, pool in pools}
+
+
+def close_all_pools():
+    with _POOLS_LOCK:
+        pools = list(_POOLS.values())
+        _POOLS.clear()
+    for pool in pools:
+        try:
+            if pool._pid == os.getpid():
+                pool.close()
+        except Exception:
+            pass
+
+
+def _safe_dsn(dsn: str) -> str:
+    """Mascara a senha do DSN para exibir em métricas."""
+    try:
+        if "@" in dsn and "://" in dsn:
+            proto, rest = dsn.split("://", 1)
+            creds, host = rest.rsplit("@", 1)
+            user = creds.split(":", 1)[0]
+            return f"{proto}://{user}@{host}"
+    except Exception:
+        pass
+    return "dsn"
+
+
+atexit.register(close_all_pools)
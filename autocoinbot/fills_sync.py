@@ -0,0 +1,248 @@
+# fills_sync.py
+# Sincronização incremental de fills da KuCoin para a tabela trades
+
+"""
+Sincronização incremental dos fills da conta.
+
+A KuCoin aceita no máximo 7 dias por consulta em ``/api/v1/fills``. Em vez de
+pedir "os últimos N dias" a cada sessão (que o ``get_fills`` padrão reduz a
+7 dias e baixa de novo), ``sync_fills``:
+
+1. lê a marca d'água de ``sync_watermarks`` para (conta, símbolo); sem ela,
+   começa ``lookback_days`` atrás;
+2. divide o intervalo até agora em janelas de 7 dias e busca as janelas em
+   paralelo (cada uma paginada, via ``api.get_fills(clamp_to_recent=False)``,
+   sob o rate limiter compartilhado);
+3. grava cada página assim que chega com ``insert_trades_bulk`` (idempotente
+   por ``trade id``), sem acumular o histórico em memória;
+4. avança a marca d'água até o fim do maior prefixo contínuo de janelas
+   concluídas. Uma janela que falhar é refeita na próxima sincronização.
+
+Cada nova sincronização recomeça ``overlap`` antes da marca d'água para
+pegar fills publicados com atraso; os repetidos são descartados no insert.
+
+Uso:
+    python -m autocoinbot.fills_sync --days 90
+    python -m autocoinbot.fills_sync --symbol BTC-USDT
+"""
+
+import json
+import time
+import queue
+import hashlib
+import logging
+import argparse
+import threading
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+SOURCE = "kucoin_fills"
+WINDOW_MS = 7 * 24 * 3600 * 1000
+PAGE_SIZE = 500   # máximo aceito pela KuCoin
+MAX_PAGES = 100   # por janela (50 mil fills por semana)
+
+PageFetcher = Callable[[Optional[str], int, int, int, int], Dict[str, Any]]
+
+
+def _api():
+    try:
+        from . import api
+    except ImportError:
+        import api
+    return api
+
+
+def account_id() -> str:
+    """Impressão digital curta da API key (nunca grava a chave)."""
+    key = str(_api().API_KEY or "")
+    return hashlib.sha256(key.encode()).hexdigest()[:12] if key else "anonymous"
+
+
+def _rest_page(symbol: Optional[str], start_ms: int, end_ms: int, page_size: int, page: int) -> Dict[str, Any]:
+    return _api().get_fills(symbol=symbol, start_at=start_ms, end_at=end_ms, page_size=page_size,
+                            current_page=page, clamp_to_recent=False)
+
+
+def fill_to_trade(f: dict) -> dict:
+    """Converte um fill da KuCoin no dict aceito por ``DatabaseManager.insert_trade*``."""
+    trade_id = f.get("tradeId") or f.get("id")
+    order_id = f.get("orderId")
+    created_at = f.get("createdAt")  # ms
+
+    # fallback de id estável
+    if not trade_id:
+        trade_id = f"kucoin_{order_id or 'no_order'}_{created_at or int(time.time()*1000)}"
+
+    # timestamp (segundos)
+    ts_s = None
+    try:
+        if created_at is not None:
+            ca = float(created_at)
+            ts_s = ca / 1000.0 if ca > 1e12 else ca
+    except Exception:
+        ts_s = None
+
+    def _num(key):
+        try:
+            return float(f.get(key)) if f.get(key) is not None else None
+        except Exception:
+            return None
+
+    return {
+        "id": str(trade_id),
+        "timestamp": ts_s or time.time(),
+        "symbol": f.get("symbol") or "",
+        "side": (f.get("side") or "").lower(),
+        "price": _num("price") or 0.0,
+        "size": _num("size"),
+        "funds": _num("funds"),
+        "profit": None,
+        "commission": _num("fee"),
+        "order_id": str(order_id) if order_id is not None else None,
+        "bot_id": "KUCOIN",
+        "strategy": "kucoin_fill",
+        "dry_run": False,
+        "metadata": {"source": "kucoin", "fill": f},
+    }
+
+
+class WindowTruncated(RuntimeError):
+    """Janela com mais de ``MAX_PAGES`` páginas: buscada só em parte."""
+
+
+def plan_windows(start_ms: int, end_ms: int, width_ms: int = WINDOW_MS) -> List[Tuple[int, int]]:
+    """Janelas ``[ini, fim]`` consecutivas (sem sobreposição) de até ``width_ms``."""
+    windows = []
+    ws = int(start_ms)
+    while ws < end_ms:
+        we = min(ws + width_ms - 1, int(end_ms))
+        windows.append((ws, we))
+        ws = we + 1
+    return windows
+
+
+def _window_pages(fetch_page: PageFetcher, symbol: Optional[str], window: Tuple[int, int],
+                  page_size: int, retries: int, backoff: float) -> Iterator[List[Dict[str, Any]]]:
+    for page in range(1, MAX_PAGES + 1):
+        for attempt in range(retries + 1):
+            try:
+                j = fetch_page(symbol, window[0], window[1], page_size, page)
+                break
+            except Exception:
+                if attempt >= retries:
+                    raise
+                time.sleep(backoff * (2 ** attempt))
+        data = (j or {}).get("data") or {}
+        items = [it for it in (data.get("items") or []) if isinstance(it, dict)]
+        yield items
+        total_pages = int(data.get("totalPage") or 0)
+        if len(items) < page_size or (total_pages and page >= total_pages):
+            return
+    # Há mais páginas: a janela não pode contar como concluída (a marca d'água pararia depois dela).
+    raise WindowTruncated(f"janela {window} atingiu {MAX_PAGES} páginas; restante fica para a próxima")
+
+
+def sync_fills(
+    db,
+    symbol: Optional[str] = None,
+    lookback_days: float = 90,
+    workers: int = 4,
+    page_size: int = PAGE_SIZE,
+    overlap_ms: int = 5 * 60 * 1000,
+    fetch_page: Optional[PageFetcher] = None,
+    account: Optional[str] = None,
+    now_ms: Optional[int] = None,
+    retries: int = 2,
+    backoff: float = 1.0,
+) -> Dict[str, Any]:
+    """Busca os fills novos desde a marca d'água e grava em ``trades``; retorna um relatório."""
+    fetch_page = fetch_page or _rest_page
+    account = account or account_id()
+    scope = (symbol or "").upper()
+    now_ms = int(now_ms if now_ms is not None else time.time() * 1000)
+
+    mark = db.get_sync_watermark(SOURCE, account, scope)
+    if mark is None:
+        start_ms = now_ms - int(float(lookback_days) * 86400 * 1000)
+    else:
+        start_ms = max(0, int(mark) - int(overlap_ms))
+    windows = plan_windows(start_ms, now_ms)
+
+    report = {"account": account, "scope": scope, "start_ms": start_ms, "end_ms": now_ms,
+              "windows": len(windows), "pages": 0, "fills": 0, "inserted": 0, "failed": 0,
+              "watermark": mark}
+    if not windows:
+        return report
+
+    # Produtores (uma thread por janela, até ``workers`` simultâneas) -> fila -> insert no chamador.
+    pages: "queue.Queue" = queue.Queue(maxsize=max(2, int(workers) * 2))
+    slots = threading.Semaphore(max(1, int(workers)))
+
+    def _producer(idx: int, window: Tuple[int, int]):
+        with slots:
+            try:
+                for items in _window_pages(fetch_page, scope or None, window, page_size, retries, backoff):
+                    pages.put(("page", idx, items))
+                pages.put(("done", idx, None))
+            except Exception as e:
+                pages.put(("error", idx, e))
+
+    threads = [threading.Thread(target=_producer, args=(i, w), name=f"fills-sync-{i}", daemon=True)
+               for i, w in enumerate(windows)]
+    for t in threads:
+        t.start()
+
+    status: Dict[int, bool] = {}
+    while len(status) < len(windows):
+        kind, idx, payload = pages.get()
+        if kind == "page":
+            if idx in status or not payload:
+                continue
+            report["pages"] += 1
+            report["fills"] += len(payload)
+            try:
+                result = db.insert_trades_bulk([fill_to_trade(f) for f in payload])
+                report["inserted"] += int(result.get("inserted", 0))
+            except Exception as e:
+                logger.warning("fills_sync: falha ao gravar página da janela %s: %s", windows[idx], e)
+                status[idx] = False
+        elif kind == "done":
+            status.setdefault(idx, True)
+        else:
+            logger.warning("fills_sync: janela %s falhou: %s", windows[idx], payload)
+            status[idx] = False
+    for t in threads:
+        t.join(1.0)
+
+    report["failed"] = sum(1 for ok in status.values() if not ok)
+    # Só avança sobre janelas contínuas a partir do início.
+    new_mark = None
+    for idx, (_, we) in enumerate(windows):
+        if not status.get(idx):
+            break
+        new_mark = we
+    if new_mark is not None:
+        report["watermark"] = db.set_sync_watermark(SOURCE, account, new_mark, scope)
+    return report
+
+
+def main():
+    p = argparse.ArgumentParser(description="Sincroniza fills da KuCoin para a tabela trades")
+    p.add_argument("--symbol", default=None, help="padrão: todos os símbolos")
+    p.add_argument("--days", type=float, default=90, help="histórico na primeira sincronização")
+    p.add_argument("--workers", type=int, default=4)
+    args = p.parse_args()
+
+    try:
+        from .database import DatabaseManager
+    except ImportError:
+        from database import DatabaseManager
+
+    logging.basicConfig(level=logging.INFO)
+    report = sync_fills(DatabaseManager(), symbol=args.symbol, lookback_days=args.days, workers=args.workers)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+# http_session.py
+# Sessão HTTP compartilhada (keep-alive + pool de conexões) para a KuCoin
+
+"""
+Camada HTTP compartilhada do cliente KuCoin.
+
+Todas as chamadas REST (api.py, bot.py, public_flow_intel.py) passam por aqui
+em vez de ``requests.get/post`` soltos. Um único ``HTTPAdapter`` (pool urllib3)
+é compartilhado pelo processo, então conexões TCP/TLS com api.kucoin.com são
+reaproveitadas (keep-alive) entre chamadas e entre threads. Cada thread usa o
+seu próprio ``requests.Session`` montado sobre esse adapter, evitando disputa
+pelo estado da sessão (cookies) sem perder o pool.
+
+Configuração via variáveis de ambiente:
+    KUCOIN_HTTP_POOL_CONNECTIONS  hosts distintos mantidos no pool (padrão 4)
+    KUCOIN_HTTP_POOL_MAXSIZE      conexões por host (padrão 32; ~1 por thread/bot)
+    KUCOIN_HTTP_POOL_BLOCK        1 = espera conexão livre em vez de abrir extra
+    KUCOIN_HTTP_TIMEOUT           timeout padrão de leitura em segundos (padrão 10)
+    KUCOIN_HTTP_CONNECT_TIMEOUT   timeout de conexão em segundos (padrão 3.05)
+
+Cada requisição é registrada em ``api_metrics`` (latência, status, bytes) e
+um HTTP 429 esvazia o pool correspondente do ``rate_limiter``.
+"""
+
+import os
+import time
+import threading
+from typing import Any, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    from .api_metrics import get_api_metrics, metrics_enabled
+    from .rate_limiter import penalize_for
+except ImportError:
+    from api_metrics import get_api_metrics, metrics_enabled
+    from rate_limiter import penalize_for
+
+USER_AGENT = "kucoin_app/1.0"
+_METRICS = metrics_enabled()
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.environ.get(name, default))
+    except Exception:
+        return float(default)
+
+
+def _env_flag(name: str, default: str = "0") -> bool:
+    return str(os.environ.get(name, default)).strip().lower() in ("1", "true", "yes", "on")
+
+
+_lock = threading.Lock()
+_adapter: Optional[HTTPAdapter] = None
+_adapter_pid: Optional[int] = None
+_local = threading.local()
+
+
+def _get_adapter() -> HTTPAdapter:
+    """Adapter (pool urllib3) do processo; recriado após ``fork``."""
+    global _adapter, _adapter_pid
+    pid = os.getpid()
+    if _adapter is not None and _adapter_pid == pid:
+        return _adapter
+    with _lock:
+        if _adapter is None or _adapter_pid != pid:
+            _adapter = HTTPAdapter(
+                pool_connections=int(_env_float("KUCOIN_HTTP_POOL_CONNECTIONS", 4)),
+                pool_maxsize=int(_env_float("KUCOIN_HTTP_POOL_MAXSIZE", 32)),
+                pool_block=_env_flag("KUCOIN_HTTP_POOL_BLOCK"),
+                max_retries=0,  # retry fica a cargo de retry_on_failure em api.py
+            )
+            _adapter_pid = pid
+        return _adapter
+
+
+def get_session() -> requests.Session:
+    """Sessão da thread atual, montada sobre o pool compartilhado do processo."""
+    adapter = _get_adapter()
+    session = getattr(_local, "session", None)
+    if session is None or getattr(_local, "adapter", None) is not adapter:
+        session = requests.Session()
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        session.headers.update({"User-Agent": USER_AGENT})
+        _local.session = session
+        _local.adapter = adapter
+    return session
+
+
+def default_timeout() -> Any:
+    """``(connect, read)`` padrão quando o chamador não informa timeout."""
+    return (
+        _env_float("KUCOIN_HTTP_CONNECT_TIMEOUT", 3.05),
+        _env_float("KUCOIN_HTTP_TIMEOUT", 10.0),
+    )
+
+
+def request(method: str, url: str, **kwargs) -> requests.Response:
+    """Equivalente a ``requests.request`` usando a sessão com keep-alive."""
+    if kwargs.get("timeout") is None:
+        kwargs["timeout"] = default_timeout()
+    started = time.perf_counter()
+    try:
+        r = get_session().request(method, url, **kwargs)
+    except Exception as e:
+        if _METRICS:
+            get_api_metrics().record(method, url, time.perf_counter() - started, error=type(e).__name__)
+        raise
+    if _METRICS:
+        get_api_metrics().record_response(method, url, r, time.perf_counter() - started)
+    if r.status_code == 429:
+        # Throttled: o balde compartilhado recua até o reset, para todos os processos.
+        penalize_for(url, method, r.headers)
+    return r
+
+
+def http_get(url: str, **kwargs) -> requests.Response:
+    return request("GET", url, **kwargs)
+
+
+def http_post(url: str, **kwargs) -> requests.Response:
+    return request("POST", url, **kwargs)
+
+
+def close():
+    """Fecha as conexões ociosas do pool (ex.: antes de encerrar o processo)."""
+    global _adapter
+    with _lock:
+        adapter, _adapter = _adapter, None
+    if adapter is not None:
+        adapter.close()
@@ -0,0 +1,304 @@
+# learning_cache.py
+# Cache em processo das estatísticas do bandit (learning_stats) com write-behind
+
+"""
+Cache por processo de ``learning_stats`` com gravação atrasada (write-behind).
+
+- Leitura: estatísticas por ``(symbol, param_name)`` ficam em memória e são
+  recarregadas após ``ttl`` segundos ou quando outro processo avisa via
+  ``LISTEN/NOTIFY`` (canal ``learning_stats_changed``).
+- Escrita: recompensas atualizam a média local na hora (a próxima escolha já
+  enxerga o resultado) e são gravadas em lote por uma thread de fundo com
+  ``DatabaseManager.update_bandit_rewards_bulk``.
+
+Configuração via variáveis de ambiente:
+    LEARNING_CACHE_TTL        segundos até recarregar do banco (padrão 60)
+    LEARNING_FLUSH_INTERVAL   segundos entre gravações em lote (padrão 5)
+    LEARNING_FLUSH_BATCH      recompensas pendentes que forçam gravação (padrão 50)
+    LEARNING_MAX_PENDING      teto de pendentes durante queda do banco; as mais
+                              antigas são descartadas (padrão 10000)
+    LEARNING_LISTEN           0 desliga o LISTEN/NOTIFY (fica só o TTL)
+"""
+
+import os
+import time
+import random
+import atexit
+import select
+import logging
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+NOTIFY_CHANNEL = "learning_stats_changed"
+
+Key = Tuple[str, str]
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.environ.get(name, default))
+    except Exception:
+        return float(default)
+
+
+class LearningStatsCache:
+    """Estatísticas do bandit em memória, com recarga por TTL/NOTIFY e gravação em lote."""
+
+    def __init__(
+        self,
+        db_factory: Callable,
+        ttl: float = 60.0,
+        flush_interval: float = 5.0,
+        flush_batch: int = 50,
+        listen: bool = True,
+        max_pending: int = 10000,
+    ):
+        self._db_factory = db_factory
+        self._db = None
+        self.ttl = float(ttl)
+        self.flush_interval = max(0.1, float(flush_interval))
+        self.flush_batch = max(1, int(flush_batch))
+        self.max_pending = max(self.flush_batch, int(max_pending))
+        self._lock = threading.RLock()
+        # (symbol, param_name) -> (carregado_em, {param_value: [mean, n]})
+        self._stats: Dict[Key, Tuple[float, Dict[float, List[float]]]] = {}
+        # recompensas ainda não gravadas: (symbol, param_name, param_value, reward, ts)
+        self._pending: List[tuple] = []
+        self._outage = False  # gravação falhando desde a última que deu certo
+        self._wake = threading.Event()
+        self._closed = False
+        self._pid = os.getpid()
+        self._counters = {"hits": 0, "loads": 0, "invalidations": 0, "flushed": 0, "flush_errors": 0,
+                          "dropped": 0}
+        self._flusher = threading.Thread(target=self._flush_loop, name="learning-flush", daemon=True)
+        self._flusher.start()
+        self._listener: Optional[threading.Thread] = None
+        if listen:
+            self._listener = threading.Thread(target=self._listen_loop, name="learning-listen", daemon=True)
+            self._listener.start()
+
+    # ---------- leitura ----------
+
+    def get_stats(self, symbol: str, param_name: str) -> Dict[float, Tuple[float, int]]:
+        """``{param_value: (mean_reward, n)}`` do cache (recarrega se expirado)."""
+        key = (symbol, param_name)
+        with self._lock:
+            entry = self._stats.get(key)
+            if entry is not None and time.monotonic() - entry[0] < self.ttl:
+                self._counters["hits"] += 1
+                return {v: (m, int(n)) for v, (m, n) in entry[1].items()}
+        values = self._load(symbol, param_name)
+        with self._lock:
+            return {v: (m, int(n)) for v, (m, n) in values.items()}
+
+    def choose_param(self, symbol: str, param_name: str, candidates: list, epsilon: float = 0.1) -> float:
+        """Epsilon-greedy idêntico a ``DatabaseManager.choose_bandit_param``, sem ir ao banco."""
+        try:
+            stats = self.get_stats(symbol, param_name)
+        except Exception as e:
+            logger.error(f"Erro ao ler cache de aprendizado: {e}")
+            return random.choice(candidates)
+        if random.random() < epsilon:
+            return random.choice(candidates)
+        return max(candidates, key=lambda c: stats.get(float(c), (0.0, 0))[0])
+
+    # ---------- escrita ----------
+
+    def record_reward(self, symbol: str, param_name: str, param_value: float, reward: float):
+        """Aplica a recompensa localmente e agenda a gravação no banco."""
+        value = float(param_value)
+        reward = float(reward)
+        with self._lock:
+            self._pending.append((symbol, param_name, value, reward, time.time()))
+            self._trim_pending()
+            entry = self._stats.get((symbol, param_name))
+            if entry is not None:
+                self._apply(entry[1], value, reward)
+            if len(self._pending) >= self.flush_batch:
+                self._wake.set()
+
+    def flush(self) -> bool:
+        """Grava as recompensas pendentes agora."""
+        with self._lock:
+            batch, self._pending = self._pending, []
+        if not batch:
+            return True
+        error = None
+        try:
+            ok = self._get_db().update_bandit_rewards_bulk(batch, notify_channel=NOTIFY_CHANNEL)
+        except Exception as e:
+            error, ok = e, False
+        with self._lock:
+            if ok:
+                self._counters["flushed"] += len(batch)
+                if self._outage:
+                    self._outage = False
+                    logger.info(f"Gravação de recompensas do bandit normalizada "
+                                f"({self._counters['dropped']} descartadas no total)")
+                return True
+            # Devolve para a próxima tentativa, mantendo a ordem (com teto).
+            self._counters["flush_errors"] += 1
+            self._pending[:0] = batch
+            self._trim_pending()
+            first = not self._outage
+            self._outage = True
+        if first:
+            # Uma linha por queda; as tentativas seguintes ficam em debug.
+            logger.error(f"Erro ao gravar recompensas do bandit: {error or 'falha no lote'}; "
+                         f"mantendo até {self.max_pending} pendentes")
+        else:
+            logger.debug("Gravação de recompensas do bandit ainda falhando: %s", error)
+        return False
+
+    def invalidate(self, symbol: Optional[str] = None, param_name: Optional[str] = None):
+        """Descarta entradas do cache (todas, por símbolo ou por par)."""
+        with self._lock:
+            self._counters["invalidations"] += 1
+            if symbol is None:
+                self._stats.clear()
+            elif param_name is None:
+                for key in [k for k in self._stats if k[0] == symbol]:
+                    del self._stats[key]
+            else:
+                self._stats.pop((symbol, param_name), None)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            out = dict(self._counters)
+            out["pending"] = len(self._pending)
+            out["keys"] = len(self._stats)
+        return out
+
+    def close(self):
+        self._closed = True
+        self._wake.set()
+        self.flush()
+
+    # ---------- internos ----------
+
+    def _trim_pending(self):
+        """Descarta as recompensas pendentes mais antigas acima de ``max_pending`` (com lock)."""
+        excess = len(self._pending) - self.max_pending
+        if excess > 0:
+            del self._pending[:excess]
+            self._counters["dropped"] += excess
+
+    @staticmethod
+    def _apply(values: Dict[float, List[float]], value: float, reward: float):
+        cur = values.setdefault(value, [0.0, 0])
+        cur[1] += 1
+        cur[0] += (reward - cur[0]) / cur[1]
+
+    def _get_db(self):
+        if self._db is None:
+            self._db = self._db_factory()
+        return self._db
+
+    def _load(self, symbol: str, param_name: str) -> Dict[float, List[float]]:
+        rows = self._get_db().get_learning_stats(symbol, param_name)
+        values = {float(r["param_value"]): [float(r["mean_reward"]), int(r["n"])] for r in rows}
+        with self._lock:
+            # Recompensas locais ainda não gravadas continuam valendo sobre o snapshot.
+            for s, p, v, reward, _ts in self._pending:
+                if s == symbol and p == param_name:
+                    self._apply(values, v, reward)
+            self._stats[(symbol, param_name)] = (time.monotonic(), values)
+            self._counters["loads"] += 1
+        return values
+
+    def _flush_loop(self):
+        while not self._closed:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            if os.getpid() != self._pid:
+                return
+            self.flush()
+
+    def _poll_notifies(self, conn, timeout: float) -> int:
+        """Espera avisos no socket da conexão e invalida as chaves; retorna quantos chegaram.
+
+        Usa a API libpq (``pgconn.consume_input``/``notifies``) com ``select``, que
+        funciona em qualquer psycopg 3 (``conn.notifies(timeout=...)`` só existe no 3.2+).
+        """
+        ready, _, _ = select.select([conn.fileno()], [], [], timeout)
+        if not ready:
+            return 0
+        pgconn = conn.pgconn
+        pgconn.consume_input()
+        count = 0
+        while True:
+            note = pgconn.notifies()
+            if note is None:
+                return count
+            count += 1
+            payload = note.extra.decode("utf-8", "replace") if note.extra else ""
+            symbol, _, param_name = payload.partition("\t")
+            if symbol and param_name:
+                self.invalidate(symbol, param_name)
+            else:
+                self.invalidate()
+
+    def _listen_loop(self):
+        """Invalida o cache quando outro processo grava recompensas."""
+        try:
+            import psycopg
+        except Exception:
+            return
+        backoff = 1.0
+        while not self._closed:
+            try:
+                dsn = self._get_db().db_dsn
+                with psycopg.connect(dsn, autocommit=True) as conn:
+                    conn.execute(f"LISTEN {NOTIFY_CHANNEL}")
+                    # Perdemos avisos enquanto desconectados: começa do zero.
+                    self.invalidate()
+                    backoff = 1.0
+                    while not self._closed:
+                        self._poll_notifies(conn, timeout=5.0)
+            except Exception as e:
+                logger.warning(f"LISTEN {NOTIFY_CHANNEL} falhou: {e}; tentando de novo em {backoff:.0f}s")
+                time.sleep(backoff)
+                backoff = min(backoff * 2, 60.0)
+
+
+# ====================== CACHE GLOBAL (POR PROCESSO) ======================
+_CACHE: Optional[LearningStatsCache] = None
+_CACHE_LOCK = threading.Lock()
+
+
+def _default_db_factory():
+    try:
+        from .database import DatabaseManager
+    except ImportError:
+        from database import DatabaseManager
+    return DatabaseManager()
+
+
+def get_learning_cache(db_factory: Optional[Callable] = None) -> LearningStatsCache:
+    """Cache compartilhado pelo processo (sobrevive aos ciclos do eternal mode)."""
+    global _CACHE
+    with _CACHE_LOCK:
+        if _CACHE is None or _CACHE._pid != os.getpid() or _CACHE._closed:
+            listen = str(os.environ.get("LEARNING_LISTEN", "1")).strip().lower() not in ("0", "false", "no", "off")
+            _CACHE = LearningStatsCache(
+                db_factory or _default_db_factory,
+                ttl=_env_float("LEARNING_CACHE_TTL", 60.0),
+                flush_interval=_env_float("LEARNING_FLUSH_INTERVAL", 5.0),
+                flush_batch=int(_env_float("LEARNING_FLUSH_BATCH", 50)),
+                listen=listen,
+                max_pending=int(_env_float("LEARNING_MAX_PENDING", 10000)),
+            )
+        return _CACHE
+
+
+def flush_learning_cache():
+    """Grava recompensas pendentes; registrado em ``atexit``."""
+    with _CACHE_LOCK:
+        cache = _CACHE
+    if cache is not None and cache._pid == os.getpid():
+        cache.close()
+
+
+atexit.register(flush_learning_cache)
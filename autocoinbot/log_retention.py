@@ -0,0 +1,248 @@
+# log_retention.py
+# Partições diárias de bot_logs, retenção e rollup horário
+
+"""
+Partições diárias de ``bot_logs`` (RANGE em ``timestamp``, epoch UTC),
+retenção e rollup.
+
+- ``ensure_partitions`` cria as partições de hoje e dos próximos dias. Linhas
+  fora de qualquer partição caem em ``bot_logs_default`` e são movidas quando
+  a partição do dia é criada.
+- ``run_retention`` resume em ``bot_logs_hourly`` (contagem por evento/hora e
+  último preço) e remove as partições mais antigas que ``keep_days``, além do
+  que sobrou da tabela anterior à migração (``bot_logs_legacy``).
+
+Rodar de hora em hora (cron/systemd timer), por exemplo:
+    python -m autocoinbot.log_retention --keep-days 14
+
+Variáveis de ambiente:
+    BOT_LOG_RETENTION_DAYS   dias mantidos em bot_logs (padrão 14)
+    BOT_LOG_ROLLUP           0 desliga o rollup horário antes de apagar
+"""
+
+import os
+import re
+import time
+import logging
+import argparse
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DAY = 86400
+PARTITION_PREFIX = "bot_logs_p"
+DEFAULT_PARTITION = "bot_logs_default"
+LEGACY_TABLE = "bot_logs_legacy"
+_PARTITION_LOCK_KEY = 0x4143_424C  # "ACBL"
+_PARTITION_RE = re.compile(r"^bot_logs_p(\d{8})$")
+
+# Extraídos das mensagens JSON gravadas por EnhancedTradeBot._log
+_EVENT_SQL = "COALESCE(substring(message from '\"event\":\\s*\"([^\"]+)\"'), level)"
+_PRICE_SQL = "substring(message from '\"price\":\\s*([0-9]+(\\.[0-9]+)?([eE][-+]?[0-9]+)?)')::float8"
+
+
+def retention_days() -> int:
+    try:
+        return max(1, int(os.environ.get("BOT_LOG_RETENTION_DAYS", 14)))
+    except Exception:
+        return 14
+
+
+def _day_start(ts: float) -> int:
+    return int(ts // DAY * DAY)
+
+
+def partition_name(day_ts: float) -> str:
+    return PARTITION_PREFIX + datetime.fromtimestamp(_day_start(day_ts), tz=timezone.utc).strftime("%Y%m%d")
+
+
+def _partition_day(name: str) -> Optional[int]:
+    m = _PARTITION_RE.match(name)
+    if not m:
+        return None
+    d = datetime.strptime(m.group(1), "%Y%m%d").replace(tzinfo=timezone.utc)
+    return int(d.timestamp())
+
+
+def _value(row, key):
+    return row[key] if isinstance(row, dict) else row[0]
+
+
+def is_partitioned(cur) -> bool:
+    cur.execute("SELECT relkind FROM pg_class WHERE oid = to_regclass('bot_logs')")
+    row = cur.fetchone()
+    return bool(row) and _value(row, "relkind") == "p"
+
+
+def list_partitions(cur) -> List[str]:
+    cur.execute(
+        """
+        SELECT c.relname AS name
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = to_regclass('bot_logs')
+        ORDER BY c.relname
+        """
+    )
+    return [_value(r, "name") for r in cur.fetchall()]
+
+
+def create_partition(cur, day_ts: float, existing: Optional[List[str]] = None) -> bool:
+    """Cria e anexa a partição do dia de ``day_ts``. Retorna False se já existia."""
+    name = partition_name(day_ts)
+    if existing is None:
+        existing = list_partitions(cur)
+    if name in existing:
+        return False
+    lo = _day_start(day_ts)
+    hi = lo + DAY
+    cur.execute(f"CREATE TABLE IF NOT EXISTS {name} (LIKE bot_logs INCLUDING DEFAULTS)")
+    # Linhas que caíram no default para este dia precisam sair antes do ATTACH.
+    if DEFAULT_PARTITION in existing:
+        cur.execute(
+            f"""
+            WITH moved AS (
+                DELETE FROM {DEFAULT_PARTITION}
+                WHERE timestamp >= %s AND timestamp < %s
+                RETURNING *
+            )
+            INSERT INTO {name} SELECT * FROM moved
+            """,
+            (lo, hi),
+        )
+    cur.execute(f"ALTER TABLE bot_logs ATTACH PARTITION {name} FOR VALUES FROM ({lo}) TO ({hi})")
+    existing.append(name)
+    return True
+
+
+def ensure_partitions(cur, days_ahead: int = 3, days_back: int = 0, now: Optional[float] = None) -> int:
+    """Garante partições de ``now - days_back`` até ``now + days_ahead``. Retorna quantas criou."""
+    if not is_partitioned(cur):
+        return 0
+    # Vários bots virando o dia ao mesmo tempo: um cria, os outros esperam.
+    cur.execute("SELECT pg_advisory_xact_lock(%s)", (_PARTITION_LOCK_KEY,))
+    now = time.time() if now is None else now
+    existing = list_partitions(cur)
+    created = 0
+    for offset in range(-int(days_back), int(days_ahead) + 1):
+        if create_partition(cur, now + offset * DAY, existing):
+            created += 1
+    return created
+
+
+def rollup_rows(cur, source: str, where: str = "TRUE", params: Tuple = ()) -> int:
+    """Acumula em ``bot_logs_hourly`` as linhas de ``source`` que batem com ``where``."""
+    cur.execute(
+        f"""
+        INSERT INTO bot_logs_hourly AS h (bot_id, hour_ts, event, n, errors, last_ts, last_price)
+        SELECT bot_id,
+               floor(timestamp / 3600) * 3600 AS hour_ts,
+               event,
+               COUNT(*),
+               COUNT(*) FILTER (WHERE level = 'ERROR'),
+               MAX(timestamp),
+               (array_agg(price ORDER BY timestamp DESC) FILTER (WHERE price IS NOT NULL))[1]
+        FROM (
+            SELECT bot_id, timestamp, level,
+                   {_EVENT_SQL} AS event,
+                   {_PRICE_SQL} AS price
+            FROM {source}
+            WHERE {where}
+        ) src
+        GROUP BY 1, 2, 3
+        ON CONFLICT (bot_id, hour_ts, event) DO UPDATE
+        SET n = h.n + EXCLUDED.n,
+            errors = h.errors + EXCLUDED.errors,
+            last_price = CASE WHEN EXCLUDED.last_ts >= h.last_ts AND EXCLUDED.last_price IS NOT NULL
+                              THEN EXCLUDED.last_price ELSE h.last_price END,
+            last_ts = GREATEST(h.last_ts, EXCLUDED.last_ts)
+        """,
+        params,
+    )
+    return max(0, cur.rowcount or 0)
+
+
+def run_retention(db, keep_days: Optional[int] = None, rollup: Optional[bool] = None,
+                  dry_run: bool = False, now: Optional[float] = None) -> Dict[str, object]:
+    """Aplica a retenção de ``bot_logs``. Cada partição é tratada na sua própria transação."""
+    keep_days = retention_days() if keep_days is None else max(1, int(keep_days))
+    if rollup is None:
+        rollup = str(os.environ.get("BOT_LOG_ROLLUP", "1")).strip().lower() not in ("0", "false", "no", "off")
+    now = time.time() if now is None else now
+    cutoff = _day_start(now) - keep_days * DAY
+    report: Dict[str, object] = {"cutoff": cutoff, "dropped": [], "rolled_up": 0, "created": 0}
+
+    conn = db.get_connection()
+    try:
+        cur = conn.cursor()
+        if not is_partitioned(cur):
+            conn.rollback()
+            report["skipped"] = "bot_logs não é particionada (aplique as migrações)"
+            return report
+
+        report["created"] = ensure_partitions(cur, now=now)
+        conn.commit()
+
+        expired = [
+            name for name in list_partitions(cur)
+            if (_partition_day(name) is not None and _partition_day(name) + DAY <= cutoff)
+        ]
+        for name in expired:
+            if dry_run:
+                report["dropped"].append(name)
+                continue
+            if rollup:
+                report["rolled_up"] += rollup_rows(cur, name)
+            cur.execute(f"ALTER TABLE bot_logs DETACH PARTITION {name}")
+            cur.execute(f"DROP TABLE {name}")
+            conn.commit()
+            report["dropped"].append(name)
+            logger.info(f"Partição {name} removida")
+
+        if not dry_run:
+            if rollup:
+                report["rolled_up"] += rollup_rows(cur, DEFAULT_PARTITION, "timestamp < %s", (cutoff,))
+            cur.execute(f"DELETE FROM {DEFAULT_PARTITION} WHERE timestamp < %s", (cutoff,))
+            conn.commit()
+
+            cur.execute("SELECT to_regclass(%s) AS reg", (LEGACY_TABLE,))
+            if _value(cur.fetchone(), "reg") is not None:
+                if rollup:
+                    report["rolled_up"] += rollup_rows(cur, LEGACY_TABLE)
+                cur.execute(f"DROP TABLE {LEGACY_TABLE}")
+                conn.commit()
+                report["dropped"].append(LEGACY_TABLE)
+                logger.info(f"Tabela {LEGACY_TABLE} resumida e removida")
+        return report
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+
+def main():
+    p = argparse.ArgumentParser(description="Retenção e rollup de bot_logs")
+    p.add_argument("--keep-days", type=int, default=None, help="padrão: BOT_LOG_RETENTION_DAYS ou 14")
+    p.add_argument("--no-rollup", action="store_true", help="apaga sem resumir em bot_logs_hourly")
+    p.add_argument("--dry-run", action="store_true", help="só lista o que seria removido")
+    args = p.parse_args()
+
+    try:
+        from .database import DatabaseManager
+    except ImportError:
+        from database import DatabaseManager
+
+    logging.basicConfig(level=logging.INFO)
+    report = run_retention(
+        DatabaseManager(),
+        keep_days=args.keep_days,
+        rollup=False if args.no_rollup else None,
+        dry_run=args.dry_run,
+    )
+    print(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,242 @@
+# log_writer.py
+# Gravação assíncrona e em lote dos logs do bot (bot_logs)
+
+"""
+Escritor de logs em lote para ``bot_logs``.
+
+Em vez de uma conexão + INSERT + commit por linha de log, os registros vão para
+uma fila limitada e uma thread de fundo grava tudo via COPY a cada
+``flush_interval_ms`` ou a cada ``batch_size`` registros, o que vier primeiro.
+
+Fila cheia:
+    - DEBUG é descartado (contabilizado em ``dropped``);
+    - demais níveis esperam até ``block_timeout`` (backpressure) e, se a fila
+      continuar cheia, são gravados de forma síncrona para não se perderem.
+
+Configuração via variáveis de ambiente:
+    BOT_LOG_FLUSH_MS     intervalo máximo entre flushes (padrão 500)
+    BOT_LOG_BATCH_SIZE   registros por flush (padrão 500)
+    BOT_LOG_QUEUE_SIZE   capacidade da fila (padrão 10000)
+"""
+
+import os
+import sys
+import json
+import time
+import queue
+import atexit
+import threading
+from typing import Any, Dict, List, Optional
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.environ.get(name, default))
+    except Exception:
+        return int(default)
+
+
+class _FlushRequest:
+    __slots__ = ("done",)
+
+    def __init__(self):
+        self.done = threading.Event()
+
+
+_STOP = object()
+
+
+class BatchedLogWriter:
+    """Fila limitada + thread de fundo que grava logs com ``add_bot_logs_bulk``."""
+
+    def __init__(
+        self,
+        db_manager,
+        flush_interval_ms: int = 500,
+        batch_size: int = 500,
+        max_queue: int = 10000,
+        block_timeout: float = 0.5,
+    ):
+        self.db = db_manager
+        self.flush_interval = max(0.01, flush_interval_ms / 1000.0)
+        self.batch_size = max(1, int(batch_size))
+        self.block_timeout = float(block_timeout)
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max(1, int(max_queue)))
+        self._lock = threading.Lock()
+        self._stats = {
+            "enqueued": 0,
+            "written": 0,
+            "flushes": 0,
+            "dropped": 0,
+            "sync_writes": 0,
+            "failed": 0,
+        }
+        self._closed = False
+        self._pid = os.getpid()
+        self._partitions_day = None
+        self._thread = threading.Thread(target=self._run, name="bot-log-writer", daemon=True)
+        self._thread.start()
+
+    # ---------- API pública ----------
+
+    def write(self, bot_id: str, level: str, message: str, data: Optional[Dict] = None) -> bool:
+        """Enfileira um log. O timestamp é o do momento da chamada, não do flush."""
+        record = (
+            bot_id,
+            time.time(),
+            level,
+            message,
+            json.dumps(data) if data else None,
+        )
+        if self._closed:
+            return self._write_sync(record)
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            if level == "DEBUG":
+                self._bump("dropped")
+                return False
+            try:
+                self._queue.put(record, timeout=self.block_timeout)
+            except queue.Full:
+                return self._write_sync(record)
+        self._bump("enqueued")
+        return True
+
+    def flush(self, timeout: float = 10.0) -> bool:
+        """Bloqueia até tudo que foi enfileirado antes da chamada estar gravado."""
+        if self._closed or not self._thread.is_alive():
+            return True
+        req = _FlushRequest()
+        try:
+            self._queue.put(req, timeout=timeout)
+        except queue.Full:
+            return False
+        return req.done.wait(timeout)
+
+    def close(self, timeout: float = 10.0):
+        """Grava o que estiver pendente e encerra a thread."""
+        if self._closed:
+            return
+        self._closed = True
+        if self._thread.is_alive():
+            try:
+                self._queue.put(_STOP, timeout=timeout)
+            except queue.Full:
+                pass
+            self._thread.join(timeout)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            out = dict(self._stats)
+        out["queued"] = self._queue.qsize()
+        return out
+
+    # ---------- internos ----------
+
+    def _bump(self, key: str, n: int = 1):
+        with self._lock:
+            self._stats[key] += n
+
+    def _write_sync(self, record: tuple) -> bool:
+        self._bump("sync_writes")
+        bot_id, _ts, level, message, _data = record
+        try:
+            return bool(self.db.add_bot_logs_bulk([record]))
+        except Exception as e:
+            self._bump("failed")
+            print(f"[LOG ERROR] {level} {bot_id}: {message} ({e})", file=sys.stderr)
+            return False
+
+    def _ensure_partitions(self):
+        """Uma vez por dia (UTC): cria as partições de bot_logs à frente."""
+        day = int(time.time() // 86400)
+        if day == self._partitions_day:
+            return
+        self._partitions_day = day
+        try:
+            self.db.ensure_bot_logs_partitions()
+        except Exception as e:
+            # Sem a partição as linhas vão para bot_logs_default; nada se perde.
+            print(f"[LOG ERROR] falha ao criar partições de bot_logs: {e}", file=sys.stderr)
+
+    def _write_batch(self, batch: List[tuple]):
+        if not batch:
+            return
+        self._ensure_partitions()
+        try:
+            self.db.add_bot_logs_bulk(batch)
+            with self._lock:
+                self._stats["written"] += len(batch)
+                self._stats["flushes"] += 1
+        except Exception as e:
+            self._bump("failed", len(batch))
+            print(f"[LOG ERROR] falha ao gravar {len(batch)} logs: {e}", file=sys.stderr)
+
+    def _run(self):
+        batch: List[tuple] = []
+        deadline = time.monotonic() + self.flush_interval
+        while True:
+            try:
+                item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                item = None
+
+            if item is _STOP:
+                self._drain_into(batch)
+                self._write_batch(batch)
+                return
+            if isinstance(item, _FlushRequest):
+                self._write_batch(batch)
+                batch = []
+                deadline = time.monotonic() + self.flush_interval
+                item.done.set()
+                continue
+            if item is not None:
+                batch.append(item)
+
+            if len(batch) >= self.batch_size or time.monotonic() >= deadline:
+                self._write_batch(batch)
+                batch = []
+                deadline = time.monotonic() + self.flush_interval
+
+    def _drain_into(self, batch: List[tuple]):
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            if isinstance(item, _FlushRequest):
+                item.done.set()
+            elif item is not _STOP:
+                batch.append(item)
+
+
+# ====================== ESCRITOR GLOBAL (POR PROCESSO) ======================
+_WRITER: Optional[BatchedLogWriter] = None
+_WRITER_LOCK = threading.Lock()
+
+
+def get_log_writer(db_manager) -> BatchedLogWriter:
+    """Escritor compartilhado pelo processo (recriado após ``fork``)."""
+    global _WRITER
+    with _WRITER_LOCK:
+        if _WRITER is None or _WRITER._pid != os.getpid() or _WRITER._closed:
+            _WRITER = BatchedLogWriter(
+                db_manager,
+                flush_interval_ms=_env_int("BOT_LOG_FLUSH_MS", 500),
+                batch_size=_env_int("BOT_LOG_BATCH_SIZE", 500),
+                max_queue=_env_int("BOT_LOG_QUEUE_SIZE", 10000),
+            )
+        return _WRITER
+
+
+def close_log_writer():
+    """Grava os logs pendentes; registrado em ``atexit``."""
+    with _WRITER_LOCK:
+        writer = _WRITER
+    if writer is not None and writer._pid == os.getpid():
+        writer.close()
+
+
+atexit.register(close_log_writer)
@@ -5,10 +5,24 @@ try:
 except Exception:
     # Fallback when running as a loose script/module
     import api  # type: ignore
+try:
+    from .candle_store import get_candle_store, store_enabled
+except Exception:
+    from candle_store import get_candle_store, store_enabled  # type: ignore
 import pandas as pd
 import time
 
 
+def _fetch_candles(symbol: str, ktype: str, start_s: int, end_s: int) -> list:
+    """Candles newest-first, served from the incremental local store when enabled."""
+    if not store_enabled():
+        return api.get_candles_fast(symbol, ktype=ktype, startAt=start_s, endAt=end_s, timeout=2.5)
+    store = get_candle_store(
+        lambda sym, kt, s, e: api.get_candles_fast(sym, ktype=kt, startAt=s, endAt=e, timeout=2.5)
+    )
+    return store.get(symbol, ktype, start_s, end_s)
+
+
 def _rsi(series: pd.Series, period: int = 14) -> pd.Series:
     delta = series.diff()
     up = delta.clip(lower=0)
@@ -39,7 +53,7 @@ def analyze_market_regime_5m(
     start_s = now_s - int(max(1, lookback_hours) * 3600)
 
     try:
-        candles = api.get_candles_fast(symbol, ktype=ktype, startAt=start_s, endAt=now_s, timeout=2.5)
+        candles = _fetch_candles(symbol, ktype, start_s, now_s)
     except Exception as e:
         return {
             "symbol": symbol,
@@ -221,7 +235,7 @@ def compute_signal_from_candles(symbol: str, rel_gap=0.00025, slope_window=3, mi
     end = int(time.time())
     start = end - 150 * 3600
     try:
-        candles = api.get_candles_fast(symbol, ktype='1hour', startAt=start, endAt=end, timeout=2.5)
+        candles = _fetch_candles(symbol, '1hour', start, end)
     except Exception as e:
         return price_now or 0.0, None, None, "ERRO API", "#ff0000", None, None, "ERROR"
 
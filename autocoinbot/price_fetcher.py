@@ -0,0 +1,188 @@
+# price_fetcher.py
+# Busca de cotação com prazo por tick, requisição "hedged" e fallback marcado como stale
+
+"""
+Busca do level1 com latência limitada para o loop de ticks.
+
+``get_orderbook_price`` tem retry com backoff e timeout de 5s: uma resposta
+lenta segura o tick por 10s ou mais, com o stop-loss esperando. Aqui cada
+busca tem um orçamento (``budget``) fixo:
+
+1. dispara a requisição (sem retry, timeout = orçamento);
+2. se não responder até o p95 das latências recentes, dispara uma segunda
+   igual (hedge) e fica com a que chegar primeiro;
+3. estourado o prazo, devolve a última cotação boa do símbolo com
+   ``stale=True`` e ``age_s``, ou None se ela for mais velha que ``max_stale``.
+
+Todo retorno é o dict do level1 acrescido de ``stale`` e ``age_s``. Respostas
+que chegam depois do prazo ainda atualizam o cache e o histórico de latência.
+
+Variáveis de ambiente:
+    KUCOIN_PRICE_BUDGET      prazo por busca em segundos (padrão 2.0)
+    KUCOIN_PRICE_HEDGE_MIN   atraso mínimo do hedge em segundos (padrão 0.05)
+    KUCOIN_PRICE_MAX_STALE   idade máxima da cotação de fallback (padrão 60)
+"""
+
+import os
+import time
+import logging
+import threading
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Deque, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_HISTORY = 200  # latências guardadas para o p95
+_MIN_SAMPLES = 10  # abaixo disso o hedge sai na metade do orçamento
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+
+class HedgedPriceFetcher:
+    """Level1 com prazo, hedge no p95 e última cotação boa como fallback."""
+
+    def __init__(
+        self,
+        fetcher: Callable[[str, float], Optional[Dict[str, Any]]],
+        budget: float = 2.0,
+        hedge_min: float = 0.05,
+        max_stale: float = 60.0,
+        quantile: float = 0.95,
+        max_workers: int = 8,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.fetcher = fetcher
+        self.budget = float(budget)
+        self.hedge_min = float(hedge_min)
+        self.max_stale = float(max_stale)
+        self.quantile = float(quantile)
+        self.clock = clock
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="price-fetch")
+        self._lock = threading.Lock()
+        self._latencies: Deque[float] = deque(maxlen=_HISTORY)
+        self._last: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+        self._stats = {"fetches": 0, "hedged": 0, "hedge_wins": 0, "stale": 0, "misses": 0}
+
+    def fetch(self, symbol: str, budget: Optional[float] = None,
+              allow_stale: bool = True) -> Optional[Dict[str, Any]]:
+        """Cotação de ``symbol`` em no máximo ``budget`` segundos (None se não houver nenhuma)."""
+        budget = self.budget if budget is None else float(budget)
+        started = self.clock()
+        deadline = started + budget
+        self._bump("fetches")
+
+        pending = {self._submit(symbol, budget, started, hedge=False)}
+        hedged = False
+        hedge_at = started + self.hedge_delay(budget)
+        while pending:
+            now = self.clock()
+            if now >= deadline:
+                break
+            limit = deadline if hedged else min(hedge_at, deadline)
+            done, pending = wait(pending, timeout=max(0.0, limit - now), return_when=FIRST_COMPLETED)
+            for fut in done:
+                data, is_hedge = fut.result()
+                if data is not None:
+                    if is_hedge:
+                        self._bump("hedge_wins")
+                    return dict(data, stale=False, age_s=0.0)
+            # Falhou ou passou do p95: uma segunda tentativa, se ainda houver prazo.
+            if not hedged and (done or self.clock() >= hedge_at):
+                hedged = True
+                remaining = deadline - self.clock()
+                if remaining > 0:
+                    self._bump("hedged")
+                    pending.add(self._submit(symbol, remaining, self.clock(), hedge=True))
+
+        if not allow_stale:
+            self._bump("misses")
+            return None
+        return self.last(symbol)
+
+    def last(self, symbol: str) -> Optional[Dict[str, Any]]:
+        """Última cotação boa de ``symbol`` marcada como stale (None se velha demais)."""
+        with self._lock:
+            cached = self._last.get(symbol)
+            if cached is None or self.clock() - cached[0] > self.max_stale:
+                self._stats["misses"] += 1
+                return None
+            self._stats["stale"] += 1
+        age = self.clock() - cached[0]
+        return dict(cached[1], stale=True, age_s=round(age, 3))
+
+    def hedge_delay(self, budget: Optional[float] = None) -> float:
+        """Atraso do hedge: p95 das latências recentes, limitado ao orçamento."""
+        budget = self.budget if budget is None else float(budget)
+        with self._lock:
+            samples = sorted(self._latencies)
+        if len(samples) < _MIN_SAMPLES:
+            return budget / 2
+        p = samples[min(len(samples) - 1, int(self.quantile * len(samples)))]
+        return min(max(p, self.hedge_min), budget * 0.8)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            out = dict(self._stats)
+            n = len(self._latencies)
+        out["hedge_delay_s"] = round(self.hedge_delay(), 4)
+        out["samples"] = n
+        return out
+
+    def close(self):
+        self._pool.shutdown(wait=False)
+
+    # ---------- internos ----------
+
+    def _submit(self, symbol: str, timeout: float, started: float, hedge: bool):
+        return self._pool.submit(self._call, symbol, timeout, started, hedge)
+
+    def _call(self, symbol: str, timeout: float, started: float, hedge: bool):
+        try:
+            data = self.fetcher(symbol, timeout)
+        except Exception as e:
+            logger.debug("price_fetcher: %s falhou: %s", symbol, e)
+            data = None
+        if isinstance(data, dict) and data.get("mid_price"):
+            now = self.clock()
+            with self._lock:
+                self._latencies.append(now - started)
+                prev = self._last.get(symbol)
+                if prev is None or prev[0] <= now:
+                    self._last[symbol] = (now, data)
+        else:
+            data = None
+        return data, hedge
+
+    def _bump(self, key: str):
+        with self._lock:
+            self._stats[key] += 1
+
+
+# ====================== FETCHER GLOBAL (POR PROCESSO) ======================
+_FETCHER: Optional[HedgedPriceFetcher] = None
+_FETCHER_PID: Optional[int] = None
+_FETCHER_LOCK = threading.Lock()
+
+
+def get_price_fetcher(fetcher: Callable[[str, float], Optional[Dict[str, Any]]]) -> HedgedPriceFetcher:
+    """Fetcher do processo (recriado após ``fork``, já que o pool de threads não sobrevive)."""
+    global _FETCHER, _FETCHER_PID
+    pid = os.getpid()
+    if _FETCHER is not None and _FETCHER_PID == pid:
+        return _FETCHER
+    with _FETCHER_LOCK:
+        if _FETCHER is None or _FETCHER_PID != pid:
+            _FETCHER = HedgedPriceFetcher(
+                fetcher,
+                budget=_env_float("KUCOIN_PRICE_BUDGET", 2.0),
+                hedge_min=_env_float("KUCOIN_PRICE_HEDGE_MIN", 0.05),
+                max_stale=_env_float("KUCOIN_PRICE_MAX_STALE", 60.0),
+            )
+            _FETCHER_PID = pid
+        return _FETCHER
@@ -14,7 +14,13 @@ from dataclasses import dataclass
 from typing import Any, Dict, List, Optional, Tuple
 
 import time
-import requests
+
+try:
+    from .http_session import http_get as _http_get
+    from .rate_limiter import acquire_for as _rl_acquire
+except ImportError:
+    from http_session import http_get as _http_get
+    from rate_limiter import acquire_for as _rl_acquire
 
 
 def _kucoin_base() -> str:
@@ -56,7 +62,10 @@ class FlowSignal:
 
 def _public_get_json(url: str, timeout: float) -> Optional[dict]:
     try:
-        r = requests.get(url, timeout=float(timeout), headers={"User-Agent": "kucoin_app/1.0"})
+        # Fail-fast: if the shared budget needs a longer wait than our timeout, skip.
+        if not _rl_acquire(url, timeout=float(timeout)):
+            return None
+        r = _http_get(url, timeout=float(timeout))
         r.raise_for_status()
         j = r.json()
         if not isinstance(j, dict):
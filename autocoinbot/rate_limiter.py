@@ -0,0 +1,326 @@
+# rate_limiter.py
+# Token bucket compartilhado entre threads e processos, por pool de recursos da KuCoin
+
+"""
+Limitador de taxa (token bucket) para a API KuCoin.
+
+A KuCoin limita por *resource pool* (janela de 30s): ``public`` (por IP),
+``spot`` e ``management`` (por conta/chave). Cada endpoint consome um peso do
+seu pool. Os baldes ficam num arquivo de estado protegido por ``flock``, então
+a UI, o servidor local e todos os subprocessos de bot do host dividem o mesmo
+orçamento; dentro do processo um ``threading.Lock`` serializa as threads.
+
+``acquire`` reserva os tokens e dorme só o necessário para o saldo voltar a
+zero (o saldo pode ficar negativo: quem chega depois espera na fila, sem
+stampede). ``snapshot()`` expõe o nível atual de cada balde. Um HTTP 429
+(``penalize_for``, chamado pela camada HTTP) esvazia o balde do pool até o
+reset informado pela KuCoin, e todos os processos recuam juntos.
+
+Configuração via variáveis de ambiente:
+    KUCOIN_RL_PUBLIC / KUCOIN_RL_SPOT / KUCOIN_RL_MANAGEMENT
+                            quota por janela (padrões 2000 / 4000 / 2000)
+    KUCOIN_RL_WINDOW        janela em segundos (padrão 30)
+    KUCOIN_RL_SAFETY        fração da quota usada (padrão 0.8)
+    KUCOIN_RL_STATE         arquivo de estado (padrão <tmp>/autocoinbot_ratelimit.bin)
+    KUCOIN_RL_DISABLED      1 desliga o limitador
+"""
+
+import os
+import re
+import time
+import struct
+import logging
+import tempfile
+import threading
+from typing import Any, Dict, Mapping, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: só coordena dentro do processo
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+POOLS = ("public", "spot", "management")
+_DEFAULT_QUOTA = {"public": 2000, "spot": 4000, "management": 2000}
+
+# (método, regex do path sem query, pool, peso) — primeira regra que casar vence.
+# Pesos conforme a documentação de rate limit da KuCoin (v1/v2 spot).
+ENDPOINT_WEIGHTS = (
+    ("GET", r"^/api/v1/timestamp$", "public", 3),
+    ("GET", r"^/api/v1/market/orderbook/level1$", "public", 2),
+    ("GET", r"^/api/v1/market/orderbook/level2_20$", "public", 2),
+    ("GET", r"^/api/v1/market/orderbook/level2_100$", "public", 4),
+    ("GET", r"^/api/v1/market/histories$", "public", 3),
+    ("GET", r"^/api/v1/market/candles$", "public", 3),
+    ("GET", r"^/api/v1/market/allTickers$", "public", 15),
+    ("GET", r"^/api/v1/market/stats$", "public", 15),
+    ("GET", r"^/api/v(1|2)/symbols", "public", 4),
+    ("POST", r"^/api/v1/bullet-public$", "public", 10),
+    ("POST", r"^/api/v1/bullet-private$", "spot", 10),
+    ("GET", r"^/api/v1/accounts/ledgers$", "management", 2),
+    ("GET", r"^/api/v1/accounts", "management", 5),
+    ("POST", r"^/api/v1/orders$", "spot", 2),
+    ("GET", r"^/api/v1/orders/", "spot", 2),
+    ("GET", r"^/api/v1/orders$", "spot", 2),
+    ("GET", r"^/api/v1/fills$", "spot", 10),
+    ("GET", r"^/api/v1/limit/fills$", "spot", 20),
+)
+_COMPILED = tuple((m, re.compile(p), pool, w) for m, p, pool, w in ENDPOINT_WEIGHTS)
+
+_RECORD = struct.Struct("<dd")  # tokens, atualizado_em (epoch)
+
+
+def endpoint_cost(endpoint: Optional[str], method: str = "GET") -> Tuple[str, int]:
+    """``(pool, peso)`` de um endpoint. Sem regra: público com peso 1 (privado se /accounts|/orders)."""
+    if not endpoint:
+        return "public", 1
+    path = endpoint.split("?", 1)[0]
+    if "://" in path:
+        path = "/" + path.split("://", 1)[1].split("/", 1)[-1]
+    method = (method or "GET").upper()
+    for m, rx, pool, weight in _COMPILED:
+        if m == method and rx.search(path):
+            return pool, weight
+    if "/market/" in path or path.endswith("/symbols"):
+        return "public", 1
+    return "spot", 1
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.environ.get(name, default))
+    except Exception:
+        return float(default)
+
+
+class TokenBucketLimiter:
+    """Baldes por pool com estado em arquivo (``flock``) e lock de thread."""
+
+    def __init__(
+        self,
+        state_path: Optional[str] = None,
+        quotas: Optional[Dict[str, float]] = None,
+        window: float = 30.0,
+        safety: float = 0.8,
+    ):
+        self.window = float(window)
+        quotas = dict(_DEFAULT_QUOTA if quotas is None else quotas)
+        self.capacity = {p: max(1.0, float(quotas.get(p, _DEFAULT_QUOTA[p])) * float(safety)) for p in POOLS}
+        self.rate = {p: self.capacity[p] / self.window for p in POOLS}
+        self.state_path = state_path or os.path.join(tempfile.gettempdir(), "autocoinbot_ratelimit.bin")
+        self._lock = threading.Lock()
+        self._fd: Optional[int] = None
+        self._fd_pid: Optional[int] = None
+        self._memory: Dict[str, Tuple[float, float]] = {}
+        self._stats = {"acquired": 0, "waited": 0, "wait_time_s": 0.0, "rejected": 0}
+
+    # ---------- API pública ----------
+
+    def acquire(self, pool: str, weight: float = 1, block: bool = True,
+                timeout: Optional[float] = None) -> bool:
+        """Consome ``weight`` tokens do ``pool``.
+
+        ``block=False`` só consome se houver saldo. Com ``timeout``, desiste
+        (sem consumir) se a espera necessária for maior que ele.
+        """
+        max_wait = None if block else 0.0
+        if block and timeout is not None:
+            max_wait = float(timeout)
+        wait = self.reserve(pool, weight, max_wait)
+        if wait is None:
+            return False
+        if wait > 0:
+            time.sleep(wait)
+        return True
+
+    def reserve(self, pool: str, weight: float = 1,
+                max_wait: Optional[float] = None) -> Optional[float]:
+        """Reserva ``weight`` tokens sem dormir; retorna quantos segundos esperar.
+
+        ``None`` se a espera passaria de ``max_wait`` (nada é consumido). Usado
+        pelo cliente asyncio, que espera com ``asyncio.sleep``.
+        """
+        wait = self._reserve(pool, float(weight), max_wait)
+        with self._lock:
+            if wait is None:
+                self._stats["rejected"] += 1
+                return None
+            self._stats["acquired"] += 1
+            if wait > 0:
+                self._stats["waited"] += 1
+                self._stats["wait_time_s"] += wait
+        return wait
+
+    def penalize(self, pool: str, seconds: float):
+        """Esvazia o balde por ``seconds`` (ex.: após HTTP 429 / Retry-After)."""
+        with self._locked_state() as state:
+            tokens, _ts = self._refill(pool, state)
+            state[pool] = (min(tokens, 0.0) - self.rate[pool] * float(seconds), time.time())
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        """Nível atual de cada balde + contadores deste processo."""
+        out: Dict[str, Dict[str, float]] = {}
+        with self._locked_state(write=False) as state:
+            for pool in POOLS:
+                tokens, _ts = self._refill(pool, state)
+                out[pool] = {
+                    "tokens": round(tokens, 3),
+                    "capacity": self.capacity[pool],
+                    "refill_per_s": round(self.rate[pool], 3),
+                    "fill_pct": round(100.0 * max(tokens, 0.0) / self.capacity[pool], 1),
+                }
+        with self._lock:
+            out["process"] = dict(self._stats, pid=os.getpid(), shared=fcntl is not None)
+        return out
+
+    # ---------- internos ----------
+
+    def _refill(self, pool: str, state: Dict[str, Tuple[float, float]]) -> Tuple[float, float]:
+        now = time.time()
+        tokens, ts = state.get(pool, (self.capacity[pool], now))
+        elapsed = max(0.0, now - ts)
+        return min(self.capacity[pool], tokens + elapsed * self.rate[pool]), now
+
+    def _reserve(self, pool: str, weight: float, max_wait: Optional[float]) -> Optional[float]:
+        with self._locked_state() as state:
+            tokens, now = self._refill(pool, state)
+            remaining = tokens - weight
+            wait = 0.0 if remaining >= 0 else -remaining / self.rate[pool]
+            if max_wait is not None and wait > max_wait:
+                state[pool] = (tokens, now)
+                return None
+            state[pool] = (remaining, now)
+            return wait
+
+    def _open(self) -> Optional[int]:
+        if fcntl is None:
+            return None
+        pid = os.getpid()
+        if self._fd is None or self._fd_pid != pid:
+            try:
+                self._fd = os.open(self.state_path, os.O_RDWR | os.O_CREAT, 0o666)
+                self._fd_pid = pid
+            except OSError as e:
+                logger.warning(f"Rate limiter sem arquivo compartilhado ({self.state_path}): {e}")
+                self._fd = None
+        return self._fd
+
+    def _locked_state(self, write: bool = True):
+        return _StateLock(self, write)
+
+
+class _StateLock:
+    """Context manager: lock de thread + ``flock`` e leitura/escrita dos baldes."""
+
+    def __init__(self, limiter: TokenBucketLimiter, write: bool):
+        self.limiter = limiter
+        self.write = write
+        self.fd: Optional[int] = None
+        self.state: Dict[str, Tuple[float, float]] = {}
+
+    def __enter__(self) -> Dict[str, Tuple[float, float]]:
+        lim = self.limiter
+        lim._lock.acquire()
+        try:
+            self.fd = lim._open()
+            if self.fd is None:
+                self.state = lim._memory
+                return self.state
+            fcntl.flock(self.fd, fcntl.LOCK_EX if self.write else fcntl.LOCK_SH)
+            raw = os.pread(self.fd, _RECORD.size * len(POOLS), 0)
+            for i, pool in enumerate(POOLS):
+                chunk = raw[i * _RECORD.size:(i + 1) * _RECORD.size]
+                if len(chunk) == _RECORD.size:
+                    tokens, ts = _RECORD.unpack(chunk)
+                    if ts > 0:
+                        self.state[pool] = (tokens, ts)
+            return self.state
+        except Exception:
+            self._release()
+            raise
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            if self.fd is not None and self.write and exc_type is None:
+                now = time.time()
+                buf = b"".join(
+                    _RECORD.pack(*self.state.get(pool, (self.limiter.capacity[pool], now)))
+                    for pool in POOLS
+                )
+                os.pwrite(self.fd, buf, 0)
+        finally:
+            self._release()
+
+    def _release(self):
+        try:
+            if self.fd is not None:
+                fcntl.flock(self.fd, fcntl.LOCK_UN)
+        finally:
+            self.limiter._lock.release()
+
+
+# ====================== LIMITADOR GLOBAL ======================
+_LIMITER: Optional[TokenBucketLimiter] = None
+_LIMITER_LOCK = threading.Lock()
+
+
+def get_limiter() -> TokenBucketLimiter:
+    global _LIMITER
+    with _LIMITER_LOCK:
+        if _LIMITER is None:
+            _LIMITER = TokenBucketLimiter(
+                state_path=os.environ.get("KUCOIN_RL_STATE") or None,
+                quotas={p: _env_float(f"KUCOIN_RL_{p.upper()}", _DEFAULT_QUOTA[p]) for p in POOLS},
+                window=_env_float("KUCOIN_RL_WINDOW", 30.0),
+                safety=_env_float("KUCOIN_RL_SAFETY", 0.8),
+            )
+        return _LIMITER
+
+
+def limiter_disabled() -> bool:
+    return str(os.environ.get("KUCOIN_RL_DISABLED", "0")).strip().lower() in ("1", "true", "yes", "on")
+
+
+def acquire_for(endpoint: Optional[str], method: str = "GET", block: bool = True,
+                timeout: Optional[float] = None) -> bool:
+    """Atalho: calcula pool/peso do endpoint e consome do limitador global."""
+    if limiter_disabled():
+        return True
+    pool, weight = endpoint_cost(endpoint, method)
+    return get_limiter().acquire(pool, weight, block=block, timeout=timeout)
+
+
+def reserve_for(endpoint: Optional[str], method: str = "GET",
+                max_wait: Optional[float] = None) -> Optional[float]:
+    """Como ``acquire_for``, mas devolve a espera em vez de dormir."""
+    if limiter_disabled():
+        return 0.0
+    pool, weight = endpoint_cost(endpoint, method)
+    return get_limiter().reserve(pool, weight, max_wait=max_wait)
+
+
+def _penalty_seconds(headers: Optional[Mapping[str, Any]]) -> float:
+    """Espera até o reset do pool: ``gw-ratelimit-reset`` (ms), ``Retry-After`` (s) ou 1s."""
+    headers = headers or {}
+    for name, scale in (("gw-ratelimit-reset", 0.001), ("Retry-After", 1.0)):
+        value = headers.get(name)
+        if value is None:
+            continue
+        try:
+            return min(30.0, max(0.0, float(value) * scale))
+        except (TypeError, ValueError):
+            continue
+    return 1.0
+
+
+def penalize_for(endpoint: Optional[str], method: str = "GET",
+                 headers: Optional[Mapping[str, Any]] = None) -> float:
+    """Após um HTTP 429: esvazia o pool do endpoint até o reset; retorna os segundos aplicados."""
+    if limiter_disabled():
+        return 0.0
+    pool, _weight = endpoint_cost(endpoint, method)
+    seconds = _penalty_seconds(headers)
+    get_limiter().penalize(pool, seconds)
+    logger.warning(f"⚠️ HTTP 429 em {pool}: pool em espera por {seconds:.1f}s")
+    return seconds
@@ -0,0 +1,231 @@
+# symbol_rules.py
+# Regras de negociação por símbolo (mínimos e incrementos) em cache diário
+
+"""
+Cache das regras de negociação da KuCoin por símbolo.
+
+Monta, a partir de ``api.get_all_symbols``, o mínimo e o incremento de cada
+par (``baseMinSize``, ``baseIncrement``, ``quoteMinSize``, ``minFunds``,
+``priceIncrement``) e guarda em disco como JSON. O arquivo vale por
+``KUCOIN_SYMBOL_RULES_TTL`` (um dia); vencido, as regras antigas continuam
+sendo servidas enquanto uma thread busca as novas, então o loop do bot nunca
+espera por isso. Só a primeira carga, sem arquivo nenhum, é síncrona.
+
+Com as regras o bot arredonda o tamanho da ordem para o incremento e recusa
+localmente ordens abaixo do mínimo, com a mesma mensagem ("below the
+minimum") que a KuCoin devolveria depois de uma ida e volta.
+
+Variáveis de ambiente:
+    KUCOIN_SYMBOL_RULES_PATH   arquivo de cache (padrão <tmp>/autocoinbot_symbol_rules.json)
+    KUCOIN_SYMBOL_RULES_TTL    validade em segundos (padrão 86400)
+"""
+
+import os
+import json
+import time
+import logging
+import tempfile
+import threading
+from decimal import Decimal, ROUND_DOWN
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_RETRY_S = 600.0  # espera entre tentativas após uma atualização que falhou
+
+
+def _dec(v: Any) -> Optional[Decimal]:
+    try:
+        d = Decimal(str(v))
+    except Exception:
+        return None
+    return d if d > 0 else None
+
+
+class SymbolRule(NamedTuple):
+    symbol: str
+    base_min_size: Optional[Decimal]
+    base_increment: Optional[Decimal]
+    quote_min_size: Optional[Decimal]
+    min_funds: Optional[Decimal]
+    price_increment: Optional[Decimal]
+    enabled: bool = True
+
+    @classmethod
+    def from_api(cls, s: Dict[str, Any]) -> "SymbolRule":
+        return cls(
+            symbol=str(s.get("symbol") or "").upper(),
+            base_min_size=_dec(s.get("baseMinSize")),
+            base_increment=_dec(s.get("baseIncrement")),
+            quote_min_size=_dec(s.get("quoteMinSize")),
+            min_funds=_dec(s.get("minFunds")),
+            price_increment=_dec(s.get("priceIncrement")),
+            enabled=bool(s.get("enableTrading", True)),
+        )
+
+    def to_json(self) -> Dict[str, Any]:
+        return {k: (str(v) if isinstance(v, Decimal) else v) for k, v in self._asdict().items()}
+
+    @classmethod
+    def from_json(cls, d: Dict[str, Any]) -> "SymbolRule":
+        return cls(
+            symbol=d["symbol"],
+            base_min_size=_dec(d.get("base_min_size")),
+            base_increment=_dec(d.get("base_increment")),
+            quote_min_size=_dec(d.get("quote_min_size")),
+            min_funds=_dec(d.get("min_funds")),
+            price_increment=_dec(d.get("price_increment")),
+            enabled=bool(d.get("enabled", True)),
+        )
+
+    def round_size(self, size: float) -> float:
+        """Arredonda para baixo no ``baseIncrement``."""
+        if self.base_increment is None:
+            return float(size)
+        d = Decimal(str(size))
+        return float((d / self.base_increment).to_integral_value(ROUND_DOWN) * self.base_increment)
+
+    def round_price(self, price: float) -> float:
+        if self.price_increment is None:
+            return float(price)
+        d = Decimal(str(price))
+        return float((d / self.price_increment).to_integral_value(ROUND_DOWN) * self.price_increment)
+
+    def prepare_size(self, size: float, price: Optional[float] = None) -> Tuple[float, Optional[str]]:
+        """(tamanho arredondado, motivo da recusa ou None) para uma ordem a mercado por ``size``.
+
+        Só recusa por mínimo; ``enabled`` fica a cargo do chamador (o cache pode
+        estar até um dia atrasado em relação à exchange).
+        """
+        rounded = self.round_size(size)
+        if self.base_min_size is not None and Decimal(str(rounded)) < self.base_min_size:
+            return rounded, (f"Order size {rounded} below the minimum requirement "
+                             f"(baseMinSize {self.base_min_size}) [local check]")
+        if price:
+            notional = Decimal(str(rounded)) * Decimal(str(price))
+            floor = max((v for v in (self.quote_min_size, self.min_funds) if v is not None), default=None)
+            if floor is not None and notional < floor:
+                return rounded, (f"Order funds {notional:.8f} below the minimum requirement "
+                                 f"(min {floor}) [local check]")
+        return rounded, None
+
+
+def _default_path() -> str:
+    return os.path.join(tempfile.gettempdir(), "autocoinbot_symbol_rules.json")
+
+
+class SymbolRulesCache:
+    """Regras por símbolo com persistência em disco e atualização diária em background."""
+
+    def __init__(self, fetcher: Callable[[], List[Dict[str, Any]]], path: Optional[str] = None,
+                 ttl: float = 86400.0):
+        self.fetcher = fetcher
+        self.path = path or _default_path()
+        self.ttl = float(ttl)
+        self._lock = threading.Lock()
+        self._rules: Dict[str, SymbolRule] = {}
+        self._fetched_at = 0.0
+        self._refreshing = False
+        self._loaded = False
+        self._failed_at = 0.0  # última carga síncrona que falhou (cache negativo)
+
+    def get(self, symbol: str) -> Optional[SymbolRule]:
+        """Regra do símbolo (None se desconhecido ou se nunca houve carga)."""
+        self._ensure_fresh()
+        with self._lock:
+            return self._rules.get(symbol.upper())
+
+    def age(self) -> Optional[float]:
+        return time.time() - self._fetched_at if self._fetched_at else None
+
+    def refresh(self) -> bool:
+        """Busca as regras na API e regrava o arquivo; mantém as atuais se falhar."""
+        try:
+            raw = self.fetcher() or []
+        except Exception as e:
+            logger.warning(f"⚠️ symbol rules refresh failed: {e}")
+            raw = []
+        rules = {}
+        for s in raw:
+            if isinstance(s, dict) and s.get("symbol"):
+                rule = SymbolRule.from_api(s)
+                rules[rule.symbol] = rule
+        if not rules:
+            return False
+        now = time.time()
+        with self._lock:
+            self._rules, self._fetched_at = rules, now
+        self._save(rules, now)
+        return True
+
+    # ---------- internos ----------
+
+    def _ensure_fresh(self):
+        if not self._loaded:
+            with self._lock:
+                if not self._loaded:
+                    self._load()
+                    self._loaded = True
+        if self._fetched_at and time.time() - self._fetched_at < self.ttl:
+            return
+        if not self._rules:
+            # Primeira carga: não há nada para servir. Se falhou há pouco, não tenta
+            # de novo a cada ordem; get() devolve None e a validação local é pulada.
+            with self._lock:
+                if time.time() - self._failed_at < _RETRY_S:
+                    return
+            if not self.refresh():
+                with self._lock:
+                    self._failed_at = time.time()
+            return
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+
+        def _bg():
+            try:
+                self.refresh()
+            finally:
+                with self._lock:
+                    self._refreshing = False
+                    # Falhou: adia a próxima tentativa em vez de disparar a cada chamada.
+                    if time.time() - self._fetched_at >= self.ttl:
+                        self._fetched_at = time.time() - self.ttl + min(self.ttl, _RETRY_S)
+
+        threading.Thread(target=_bg, name="symbol-rules-refresh", daemon=True).start()
+
+    def _load(self):
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+            self._rules = {d["symbol"]: SymbolRule.from_json(d) for d in data.get("symbols", [])}
+            self._fetched_at = float(data.get("fetched_at") or 0.0)
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+
+    def _save(self, rules: Dict[str, SymbolRule], fetched_at: float):
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp, "w") as f:
+                json.dump({"fetched_at": fetched_at, "symbols": [r.to_json() for r in rules.values()]}, f)
+            os.replace(tmp, self.path)
+        except OSError as e:
+            logger.debug("symbol_rules: falha ao gravar %s: %s", self.path, e)
+
+
+# ====================== CACHE GLOBAL (POR PROCESSO) ======================
+_CACHE: Optional[SymbolRulesCache] = None
+_CACHE_LOCK = threading.Lock()
+
+
+def get_symbol_rules(fetcher: Callable[[], List[Dict[str, Any]]]) -> SymbolRulesCache:
+    global _CACHE
+    with _CACHE_LOCK:
+        if _CACHE is None:
+            try:
+                ttl = float(os.environ.get("KUCOIN_SYMBOL_RULES_TTL", "86400"))
+            except ValueError:
+                ttl = 86400.0
+            _CACHE = SymbolRulesCache(fetcher, path=os.environ.get("KUCOIN_SYMBOL_RULES_PATH") or None, ttl=ttl)
+        return _CACHE
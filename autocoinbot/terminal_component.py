@@ -268,6 +268,9 @@ def start_api_server(preferred_port: int = 8765) -> Optional[int]:
 
     Exposes GET /api/logs?bot=<bot_id>&limit=<n>
     Returns JSON array of log objects.
+
+    GET /metrics serves per-endpoint KuCoin API metrics (Prometheus text
+    format); GET /api/metrics returns the same data as JSON.
     """
     global _LOG_SERVER
 
@@ -673,10 +676,15 @@ def start_api_server(preferred_port: int = 8765) -> Optional[int]:
                 return
 
             if parsed.path == '/api/equity/history':
-                # Returns equity history for the chart
+                # Returns equity history for the chart (OHLC rollups, bounded size)
+                params = urllib.parse.parse_qs(parsed.query)
                 try:
+                    days = float(params.get('days', ['30'])[0])
+                    max_points = int(params.get('max_points', ['500'])[0])
+                    bot_id = params.get('bot_id', [None])[0]
                     db = DatabaseManager()
-                    rows = db.get_equity_history(days=30)
+                    rows = db.get_equity_series(days=days, bot_id=bot_id,
+                                                max_points=max(10, min(max_points, 5000)))
                     self.send_response(200)
                     self.send_header('Content-Type', 'application/json; charset=utf-8')
                     self.send_header('Cache-Control', 'no-store')
@@ -772,11 +780,11 @@ def start_api_server(preferred_port: int = 8765) -> Optional[int]:
                     # Get the most recent active bot
                     conn = db.get_connection()
                     cur = conn.cursor()
-                    cur.execute('SELECT id FROM bot_sessions WHERE status = "running" ORDER BY start_ts DESC LIMIT 1', ())
+                    cur.execute("SELECT id FROM bot_sessions WHERE status = 'running' ORDER BY start_ts DESC LIMIT 1")
                     row = cur.fetchone()
                     conn.close()
                     if row:
-                        bot_id = row[0]
+                        bot_id = row['id']
                         self.send_response(200)
                         self.send_header('Content-Type', 'application/json; charset=utf-8')
                         self.end_headers()
@@ -793,6 +801,45 @@ def start_api_server(preferred_port: int = 8765) -> Optional[int]:
                     self.wfile.write(json.dumps({'error': 'server_error', 'message': str(e)}).encode('utf-8'))
                 return
 
+            if parsed.path in ('/metrics', '/api/metrics'):
+                # KuCoin REST call metrics from every live process on this host
+                try:
+                    try:
+                        from .api_metrics import collect, render_prometheus
+                        from .rate_limiter import get_limiter
+                    except ImportError:
+                        from api_metrics import collect, render_prometheus
+                        from rate_limiter import get_limiter
+                    snapshots = collect()
+                    try:
+                        rate_limits = get_limiter().snapshot()
+                    except Exception:
+                        rate_limits = None
+                    if parsed.path == '/api/metrics':
+                        self._send_json(200, {'processes': snapshots, 'rate_limits': rate_limits})
+                        return
+                    body = render_prometheus(snapshots, rate_limits).encode('utf-8')
+                    self.send_response(200)
+                    self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                    self.send_header('Cache-Control', 'no-store')
+                    self.end_headers()
+                    self.wfile.write(body)
+                except Exception as e:
+                    self._send_json(500, {'error': 'server_error', 'message': str(e)})
+                return
+
+            if parsed.path == '/api/db/pool':
+                # Pool de conexões deste processo (para dimensionar DB_POOL_*)
+                try:
+                    try:
+                        from .db_pool import get_pool_stats
+                    except ImportError:
+                        from db_pool import get_pool_stats
+                    self._send_json(200, {'pools': get_pool_stats()})
+                except Exception as e:
+                    self._send_json(500, {'error': 'server_error', 'message': str(e)})
+                return
+
             if parsed.path == '/api/debug/database_url':
                 # TEMPORARY DIAGNOSTIC ENDPOINT - Remove after debugging
                 try:
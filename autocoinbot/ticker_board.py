@@ -0,0 +1,227 @@
+# ticker_board.py
+# Quadro de cotações (level1) compartilhado entre os processos de bot do host
+
+"""
+Cache de cotações por símbolo compartilhado entre processos.
+
+Cada símbolo tem um arquivo JSON pequeno em ``/dev/shm`` (ou no diretório
+temporário). Quem lê e encontra a cotação mais velha que o ``max_age`` pedido
+tenta pegar o ``flock`` não bloqueante do símbolo: quem consegue vira o
+fetcher daquela rodada, busca o level1 e publica; os demais esperam a
+publicação em vez de repetir a requisição. Assim o símbolo é atualizado no
+intervalo do bot mais exigente e a carga na API cresce com o número de
+símbolos distintos, não com o número de bots.
+
+Se a busca falhar, a última cotação ainda é aceita enquanto a idade não
+passar de ``max_stale``; depois disso ``get`` retorna None. Toda cotação
+devolvida por ``get`` traz ``stale`` (True quando veio desse fallback) e
+``age_s``, calculados na leitura.
+
+Configuração via variáveis de ambiente:
+    KUCOIN_TICKER_BOARD       0 desliga (cada bot consulta a API direto)
+    KUCOIN_TICKER_DIR         diretório dos arquivos (padrão /dev/shm/autocoinbot_ticker)
+    KUCOIN_TICKER_MAX_STALE   idade máxima aceita em caso de falha (padrão 30s)
+    KUCOIN_TICKER_WAIT        espera máxima pela publicação de outro processo (padrão 2s)
+"""
+
+import os
+import json
+import time
+import logging
+import tempfile
+import threading
+from typing import Any, Callable, Dict, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: só coordena dentro do processo
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+_POLL_S = 0.05
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.environ.get(name, default))
+    except Exception:
+        return float(default)
+
+
+def _default_dir() -> str:
+    base = "/dev/shm" if os.path.isdir("/dev/shm") and os.access("/dev/shm", os.W_OK) else tempfile.gettempdir()
+    return os.path.join(base, "autocoinbot_ticker")
+
+
+def board_enabled() -> bool:
+    return str(os.environ.get("KUCOIN_TICKER_BOARD", "1")).strip().lower() not in ("0", "false", "no", "off")
+
+
+class TickerBoard:
+    """Cotações level1 por símbolo em arquivos compartilhados, com um fetcher eleito por ``flock``."""
+
+    def __init__(
+        self,
+        fetcher: Callable[[str], Optional[Dict[str, Any]]],
+        directory: Optional[str] = None,
+        max_stale: float = 30.0,
+        wait_timeout: float = 2.0,
+    ):
+        self.fetcher = fetcher
+        self.directory = directory or _default_dir()
+        self.max_stale = float(max_stale)
+        self.wait_timeout = float(wait_timeout)
+        os.makedirs(self.directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._thread_locks: Dict[str, threading.Lock] = {}
+        self._stats = {"hits": 0, "fetches": 0, "waits": 0, "stale": 0, "misses": 0, "errors": 0}
+
+    # ---------- API pública ----------
+
+    def get(self, symbol: str, max_age: float) -> Optional[Dict[str, Any]]:
+        """Cotação com no máximo ``max_age`` segundos (ou até ``max_stale`` se a busca falhar)."""
+        entry = self.read(symbol)
+        if entry is not None and self._age(entry) <= max_age:
+            self._bump("hits")
+            return self._annotate(entry, stale=False)
+
+        fresh = self._refresh(symbol, max_age)
+        if fresh is not None:
+            return self._annotate(fresh, stale=False)
+
+        entry = self.read(symbol) or entry
+        if entry is not None and self._age(entry) <= self.max_stale:
+            self._bump("stale")
+            return self._annotate(entry, stale=True)
+        self._bump("misses")
+        return None
+
+    def read(self, symbol: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self._path(symbol), "r") as f:
+                entry = json.load(f)
+            return entry if isinstance(entry, dict) and "fetched_at" in entry else None
+        except (OSError, ValueError):
+            return None
+
+    def publish(self, symbol: str, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Grava a cotação de forma atômica (arquivo temporário + ``os.replace``)."""
+        entry = dict(data, symbol=symbol, fetched_at=time.time())
+        # Frescor é calculado na leitura (a partir de fetched_at), nunca gravado.
+        entry.pop("stale", None)
+        entry.pop("age_s", None)
+        tmp = f"{self._path(symbol)}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(entry, f)
+        os.replace(tmp, self._path(symbol))
+        return entry
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._stats)
+
+    # ---------- internos ----------
+
+    @staticmethod
+    def _age(entry: Dict[str, Any]) -> float:
+        return time.time() - float(entry.get("fetched_at") or 0.0)
+
+    @classmethod
+    def _annotate(cls, entry: Dict[str, Any], stale: bool) -> Dict[str, Any]:
+        """``stale``/``age_s`` calculados a partir de ``fetched_at`` no momento da leitura."""
+        return dict(entry, stale=stale, age_s=round(max(0.0, cls._age(entry)), 3))
+
+    def _path(self, symbol: str) -> str:
+        safe = "".join(c if c.isalnum() or c in "-_" else "_" for c in symbol.upper())
+        return os.path.join(self.directory, f"{safe}.json")
+
+    def _bump(self, key: str):
+        with self._lock:
+            self._stats[key] += 1
+
+    def _thread_lock(self, symbol: str) -> threading.Lock:
+        with self._lock:
+            return self._thread_locks.setdefault(symbol, threading.Lock())
+
+    def _refresh(self, symbol: str, max_age: float) -> Optional[Dict[str, Any]]:
+        tlock = self._thread_lock(symbol)
+        if not tlock.acquire(blocking=False):
+            # Outra thread deste processo já está buscando.
+            return self._wait_for_publish(symbol, max_age, tlock)
+        try:
+            fd = self._try_flock(symbol)
+            if fd is False:
+                return self._wait_for_publish(symbol, max_age)
+            try:
+                # Alguém pode ter publicado entre a leitura e o lock.
+                entry = self.read(symbol)
+                if entry is not None and self._age(entry) <= max_age:
+                    self._bump("hits")
+                    return entry
+                return self._fetch_and_publish(symbol)
+            finally:
+                if fd is not None:
+                    fcntl.flock(fd, fcntl.LOCK_UN)
+                    os.close(fd)
+        finally:
+            tlock.release()
+
+    def _try_flock(self, symbol: str):
+        """fd com o lock do símbolo, None sem ``fcntl``, ou False se outro processo o detém."""
+        if fcntl is None:
+            return None
+        fd = os.open(self._path(symbol) + ".lock", os.O_RDWR | os.O_CREAT, 0o666)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return fd
+        except BlockingIOError:
+            os.close(fd)
+            return False
+
+    def _fetch_and_publish(self, symbol: str) -> Optional[Dict[str, Any]]:
+        self._bump("fetches")
+        try:
+            data = self.fetcher(symbol)
+        except Exception as e:
+            self._bump("errors")
+            logger.warning(f"⚠️ Ticker fetch failed for {symbol}: {e}")
+            return None
+        if not data or not isinstance(data, dict):
+            self._bump("errors")
+            return None
+        return self.publish(symbol, data)
+
+    def _wait_for_publish(self, symbol: str, max_age: float,
+                          tlock: Optional[threading.Lock] = None) -> Optional[Dict[str, Any]]:
+        self._bump("waits")
+        deadline = time.monotonic() + self.wait_timeout
+        while time.monotonic() < deadline:
+            entry = self.read(symbol)
+            if entry is not None and self._age(entry) <= max_age:
+                return entry
+            if tlock is not None and not tlock.locked():
+                break  # a outra thread terminou (com ou sem sucesso)
+            time.sleep(_POLL_S)
+        entry = self.read(symbol)
+        if entry is not None and self._age(entry) <= max_age:
+            return entry
+        return None
+
+
+# ====================== QUADRO GLOBAL (POR PROCESSO) ======================
+_BOARD: Optional[TickerBoard] = None
+_BOARD_LOCK = threading.Lock()
+
+
+def get_ticker_board(fetcher: Callable[[str], Optional[Dict[str, Any]]]) -> TickerBoard:
+    global _BOARD
+    with _BOARD_LOCK:
+        if _BOARD is None:
+            _BOARD = TickerBoard(
+                fetcher,
+                directory=os.environ.get("KUCOIN_TICKER_DIR") or None,
+                max_stale=_env_float("KUCOIN_TICKER_MAX_STALE", 30.0),
+                wait_timeout=_env_float("KUCOIN_TICKER_WAIT", 2.0),
+            )
+        return _BOARD
@@ -605,83 +605,12 @@ def _maybe_start_background_kucoin_trade_sync():
             except Exception:
                 return
 
-            now_ms = int(time.time() * 1000)
-            # janela simples (últimos 90 dias) para popular o histórico
-            start_ms = now_ms - (90 * 24 * 3600 * 1000)
-
-            fills = []
+            # Incremental: só o que veio depois da marca d'água (90 dias na primeira vez)
             try:
-                fills = kucoin_api.get_all_fills(start_at=start_ms, end_at=now_ms, page_size=200, max_pages=50)
+                from .fills_sync import sync_fills
             except Exception:
-                # se falhar, não derruba a UI
-                return
-
-            if not fills:
-                return
-
-            db = DatabaseManager()
-            for f in fills:
-                if not isinstance(f, dict):
-                    continue
-
-                trade_id = f.get("tradeId") or f.get("id")
-                order_id = f.get("orderId")
-                created_at = f.get("createdAt")  # ms
-
-                # fallback de id estável
-                if not trade_id:
-                    trade_id = f"kucoin_{order_id or 'no_order'}_{created_at or int(time.time()*1000)}"
-
-                # timestamp (segundos)
-                ts_s = None
-                try:
-                    if created_at is not None:
-                        ca = float(created_at)
-                        ts_s = ca / 1000.0 if ca > 1e12 else ca
-                except Exception:
-                    ts_s = None
-
-                symbol = f.get("symbol")
-                side = f.get("side")
-
-                try:
-                    price = float(f.get("price")) if f.get("price") is not None else None
-                except Exception:
-                    price = None
-
-                try:
-                    size = float(f.get("size")) if f.get("size") is not None else None
-                except Exception:
-                    size = None
-
-                try:
-                    funds = float(f.get("funds")) if f.get("funds") is not None else None
-                except Exception:
-                    funds = None
-
-                try:
-                    fee = float(f.get("fee")) if f.get("fee") is not None else None
-                except Exception:
-                    fee = None
-
-                trade_data = {
-                    "id": str(trade_id),
-                    "timestamp": ts_s or time.time(),
-                    "symbol": symbol or "",
-                    "side": (side or "").lower(),
-                    "price": price or 0.0,
-                    "size": size,
-                    "funds": funds,
-                    "profit": None,
-                    "commission": fee,
-                    "order_id": str(order_id) if order_id is not None else None,
-                    "bot_id": "KUCOIN",
-                    "strategy": "kucoin_fill",
-                    "dry_run": False,
-                    "metadata": {"source": "kucoin", "fill": f},
-                }
-
-                db.insert_trade_ignore(trade_data)
+                from fills_sync import sync_fills  # type: ignore
+            sync_fills(DatabaseManager(), lookback_days=90)
         except Exception:
             return
 
@@ -930,7 +859,7 @@ def render_trade_report_page():
             import pandas as pd
             import plotly.express as px
             db = DatabaseManager()
-            eq_rows = db.get_equity_history(days=30)
+            eq_rows = db.get_equity_series(days=30)
             if eq_rows:
                 df_eq = pd.DataFrame(eq_rows)
                 if not df_eq.empty:
@@ -0,0 +1,464 @@
+# ws_market.py
+# Feed WebSocket de cotações (level1 / ticker) da KuCoin para os bots
+
+"""
+Feed de mercado via WebSocket público da KuCoin.
+
+Fluxo:
+    1. handshake REST ``POST /api/v1/bullet-public`` → token + servidor +
+       ``pingInterval``/``pingTimeout``;
+    2. conecta em ``<endpoint>?token=...&connectId=...`` e espera ``welcome``;
+    3. assina ``/market/ticker:SYM1,SYM2,...`` (até 100 por tópico);
+    4. envia ``ping`` a cada ``pingInterval``; sem nenhuma mensagem por
+       ``pingInterval + pingTimeout`` a conexão é considerada morta;
+    5. ao cair, reconecta com backoff exponencial (com jitter) e novo token.
+
+Cada tick atualiza o último level1 do símbolo e é entregue a callbacks,
+filas e a quem está em ``wait_for_tick``. ``sequence`` fora de ordem (ou
+repetida) é descartada; após reconexão, ou num salto maior que
+``max_seq_gap``, o tick sai com ``gap=True`` e ``on_gap`` é chamado para o
+consumidor ressincronizar (ex.: um GET level1).
+
+``websockets`` é opcional: sem ele ``ws_enabled()`` retorna False e o bot
+fica no polling REST. ``ws_stub_server.py`` simula o servidor para testes.
+
+Variáveis de ambiente:
+    KUCOIN_WS             0 desliga o feed (padrão 1)
+    KUCOIN_WS_MAX_AGE     idade máxima do tick usado como preço (padrão 15s)
+    KUCOIN_WS_MIN_TICK    intervalo mínimo entre iterações acordadas por tick (padrão 0.5s)
+"""
+
+import os
+import json
+import time
+import uuid
+import queue
+import random
+import asyncio
+import logging
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+try:
+    import websockets
+except ImportError:  # dependência opcional
+    websockets = None
+
+logger = logging.getLogger(__name__)
+
+MAX_TOPICS_PER_SUBSCRIBE = 100
+TICKER_TOPIC = "/market/ticker:"
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.environ.get(name, default))
+    except Exception:
+        return float(default)
+
+
+def ws_enabled() -> bool:
+    if websockets is None:
+        return False
+    return str(os.environ.get("KUCOIN_WS", "1")).strip().lower() not in ("0", "false", "no", "off")
+
+
+def public_token() -> Dict[str, Any]:
+    """Handshake ``bullet-public``: ``{"url_base", "token", "ping_interval", "ping_timeout"}`` (segundos)."""
+    try:
+        from . import api
+        from .http_session import http_post
+    except ImportError:
+        import api
+        from http_session import http_post
+
+    endpoint = "/api/v1/bullet-public"
+    api.rate_limit(endpoint, "POST")
+    r = http_post(api._base_url() + endpoint, timeout=10)
+    r.raise_for_status()
+    j = r.json()
+    if not isinstance(j, dict) or j.get("code") != "200000":
+        raise RuntimeError(f"❌ KuCoin bullet-public error: {j}")
+    data = j.get("data") or {}
+    servers = data.get("instanceServers") or []
+    if not servers:
+        raise RuntimeError("❌ KuCoin bullet-public sem instanceServers")
+    srv = servers[0]
+    return {
+        "url_base": srv.get("endpoint"),
+        "token": data.get("token"),
+        "ping_interval": float(srv.get("pingInterval", 18000)) / 1000.0,
+        "ping_timeout": float(srv.get("pingTimeout", 10000)) / 1000.0,
+    }
+
+
+class KucoinWSClient:
+    """Conexão WebSocket KuCoin em thread própria: handshake, heartbeat e reconexão.
+
+    Subclasses definem o que assinar (``_on_open``), como tratar mensagens
+    (``_on_message``) e o que invalidar quando a conexão cai (``_on_close``).
+    """
+
+    thread_name = "kucoin-ws"
+
+    def __init__(self, token_provider: Callable[[], Dict[str, Any]],
+                 reconnect_base: float = 1.0, reconnect_max: float = 60.0):
+        if websockets is None:
+            raise RuntimeError("websockets não instalado (pip install websockets)")
+        self.token_provider = token_provider
+        self.reconnect_base = float(reconnect_base)
+        self.reconnect_max = float(reconnect_max)
+        self._cond = threading.Condition()
+        self._stats: Dict[str, Any] = {"connects": 0, "reconnects": 0, "heartbeat_timeouts": 0, "errors": 0}
+
+        self._thread: Optional[threading.Thread] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._ws = None
+        self._stop: Optional[asyncio.Event] = None
+        self._stopping = False
+        self._welcomed = False
+        self.connected = threading.Event()
+
+    # ---------- ciclo de vida ----------
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stopping = False
+            self._thread = threading.Thread(target=self._thread_main, name=self.thread_name, daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout: float = 5.0):
+        self._stopping = True
+        loop, stop = self._loop, self._stop
+        if loop is not None and stop is not None:
+            try:
+                loop.call_soon_threadsafe(stop.set)
+            except RuntimeError:
+                pass
+        if self._thread is not None:
+            self._thread.join(timeout)
+        with self._cond:
+            self._cond.notify_all()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            out = dict(self._stats)
+        out["connected"] = self.connected.is_set()
+        return out
+
+    # ---------- ganchos ----------
+
+    async def _on_open(self, ws):
+        """Chamado após o ``welcome`` (assinaturas, seed via REST)."""
+
+    def _on_message(self, msg: Dict[str, Any]):
+        """Mensagem ``type == "message"``."""
+
+    def _on_close(self):
+        """Conexão caiu (ou foi encerrada)."""
+
+    # ---------- thread / loop ----------
+
+    def _bump(self, key: str, n: int = 1):
+        with self._cond:
+            self._stats[key] = self._stats.get(key, 0) + n
+
+    def _thread_main(self):
+        try:
+            asyncio.run(self._main())
+        except Exception as e:
+            logger.error(f"❌ {self.thread_name} stopped: {e}")
+
+    async def _main(self):
+        self._loop = asyncio.get_running_loop()
+        self._stop = asyncio.Event()
+        if self._stopping:
+            return
+        attempt = 0
+        while not self._stop.is_set():
+            self._welcomed = False
+            try:
+                info = await asyncio.to_thread(self.token_provider)
+                url = f"{info['url_base']}?token={info['token']}&connectId={uuid.uuid4().hex}"
+                async with websockets.connect(url, ping_interval=None, open_timeout=10,
+                                              close_timeout=2, max_size=2 ** 20) as ws:
+                    await self._session(ws, info)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self._bump("errors")
+                logger.warning(f"⚠️ {self.thread_name} connection lost: {e}")
+            finally:
+                self._ws = None
+                self.connected.clear()
+                self._on_close()
+
+            if self._stop.is_set():
+                break
+            if self._welcomed:
+                attempt = 0  # a conexão chegou a funcionar: backoff recomeça
+            delay = min(self.reconnect_max, self.reconnect_base * (2 ** attempt))
+            delay *= 0.5 + random.random() / 2.0
+            attempt += 1
+            self._bump("reconnects")
+            try:
+                await asyncio.wait_for(self._stop.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _session(self, ws, info: Dict[str, Any]):
+        ping_interval = float(info.get("ping_interval") or 18.0)
+        ping_timeout = float(info.get("ping_timeout") or 10.0)
+
+        welcome = json.loads(await asyncio.wait_for(ws.recv(), timeout=10))
+        if welcome.get("type") != "welcome":
+            raise ConnectionError(f"esperava welcome, veio {welcome}")
+        self._ws = ws
+        self._welcomed = True
+        self._bump("connects")
+        await self._on_open(ws)
+        self.connected.set()
+
+        last_recv = time.monotonic()
+        next_ping = last_recv + ping_interval
+        stop_wait = asyncio.ensure_future(self._stop.wait())
+        try:
+            while True:
+                now = time.monotonic()
+                dead_at = last_recv + ping_interval + ping_timeout
+                if now > dead_at:
+                    self._bump("heartbeat_timeouts")
+                    raise ConnectionError("heartbeat timeout")
+                if now >= next_ping:
+                    await ws.send(json.dumps({"id": str(int(time.time() * 1000)), "type": "ping"}))
+                    next_ping = now + ping_interval
+                # recv() pode ser cancelado sem perder mensagens.
+                recv = asyncio.ensure_future(ws.recv())
+                done, _ = await asyncio.wait(
+                    {recv, stop_wait},
+                    timeout=max(0.05, min(next_ping, dead_at) - now),
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                if stop_wait in done:
+                    recv.cancel()
+                    return
+                if recv not in done:
+                    recv.cancel()
+                    continue
+                raw = recv.result()
+                last_recv = time.monotonic()
+                self._handle(raw)
+        finally:
+            stop_wait.cancel()
+
+    async def _send_subscribe(self, ws, topic: str, private: bool = False):
+        await ws.send(json.dumps({
+            "id": uuid.uuid4().hex,
+            "type": "subscribe",
+            "topic": topic,
+            "privateChannel": bool(private),
+            "response": True,
+        }))
+
+    def _handle(self, raw):
+        try:
+            msg = json.loads(raw)
+        except ValueError:
+            return
+        mtype = msg.get("type")
+        if mtype == "message":
+            self._on_message(msg)
+        elif mtype == "error":
+            self._bump("errors")
+            logger.warning(f"⚠️ {self.thread_name} error message: {msg}")
+
+
+class MarketFeed(KucoinWSClient):
+    """Ticker level1 por símbolo, com detecção de gaps de sequência."""
+
+    thread_name = "kucoin-ws-market"
+
+    def __init__(
+        self,
+        symbols: Iterable[str] = (),
+        token_provider: Optional[Callable[[], Dict[str, Any]]] = None,
+        on_tick: Optional[Callable[[Dict[str, Any]], None]] = None,
+        on_gap: Optional[Callable[[str, str], None]] = None,
+        reconnect_base: float = 1.0,
+        reconnect_max: float = 60.0,
+        max_seq_gap: Optional[int] = None,
+    ):
+        super().__init__(token_provider or public_token, reconnect_base, reconnect_max)
+        self.on_gap = on_gap
+        self.max_seq_gap = max_seq_gap
+
+        self._symbols = {s.upper() for s in symbols}
+        self._subscribed: set = set()
+        self._listeners: List[Callable[[Dict[str, Any]], None]] = [on_tick] if on_tick else []
+        self._queues: List[queue.Queue] = []
+        self._latest: Dict[str, Dict[str, Any]] = {}
+        self._seq: Dict[str, int] = {}
+        self._resync: set = set()
+        self._stats.update({"ticks": 0, "out_of_order": 0, "gaps": 0})
+
+    # ---------- consumo ----------
+
+    def add_symbols(self, symbols: Iterable[str]):
+        """Inclui símbolos; se já conectado, assina na hora."""
+        new = {s.upper() for s in symbols} - self._symbols
+        if not new:
+            return
+        self._symbols |= new
+        loop = self._loop
+        if loop is not None and self._ws is not None:
+            asyncio.run_coroutine_threadsafe(self._subscribe(self._ws, new), loop)
+
+    def add_listener(self, callback: Callable[[Dict[str, Any]], None]):
+        """Callback chamado na thread do feed a cada tick (deve ser rápido)."""
+        self._listeners.append(callback)
+
+    def subscribe_queue(self, maxsize: int = 1000) -> "queue.Queue":
+        """Fila com os ticks; cheia, descarta o mais antigo."""
+        q: "queue.Queue" = queue.Queue(maxsize=maxsize)
+        self._queues.append(q)
+        return q
+
+    def latest(self, symbol: str, max_age: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        with self._cond:
+            tick = self._latest.get(symbol.upper())
+        if tick is None:
+            return None
+        if max_age is not None and time.time() - tick["received_at"] > max_age:
+            return None
+        return tick
+
+    def wait_for_tick(self, symbol: str, after_seq: Optional[int] = None,
+                      timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """Bloqueia até chegar um tick de ``symbol`` com ``sequence > after_seq`` (ou ``timeout``)."""
+        symbol = symbol.upper()
+        deadline = None if timeout is None else time.monotonic() + float(timeout)
+
+        def _newer():
+            tick = self._latest.get(symbol)
+            if tick is not None and (after_seq is None or tick["sequence"] > after_seq):
+                return tick
+            return None
+
+        with self._cond:
+            tick = _newer()
+            while tick is None and not self._stopping:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return None
+                self._cond.wait(remaining)
+                tick = _newer()
+            return tick
+
+    def stats(self) -> Dict[str, Any]:
+        out = super().stats()
+        out["symbols"] = sorted(self._symbols)
+        return out
+
+    # ---------- conexão ----------
+
+    async def _on_open(self, ws):
+        await self._subscribe(ws, set(self._symbols))
+
+    def _on_close(self):
+        self._subscribed.clear()
+        # Ticks perdidos durante a queda: o próximo de cada símbolo sai com gap.
+        self._resync |= set(self._seq)
+
+    async def _subscribe(self, ws, symbols: set):
+        pending = sorted(set(symbols) - self._subscribed)
+        for i in range(0, len(pending), MAX_TOPICS_PER_SUBSCRIBE):
+            chunk = pending[i:i + MAX_TOPICS_PER_SUBSCRIBE]
+            await self._send_subscribe(ws, TICKER_TOPIC + ",".join(chunk))
+            self._subscribed |= set(chunk)
+
+    # ---------- mensagens ----------
+
+    def _on_message(self, msg: Dict[str, Any]):
+        topic = str(msg.get("topic", ""))
+        if topic.startswith(TICKER_TOPIC):
+            self._on_ticker(topic[len(TICKER_TOPIC):], msg.get("data") or {})
+
+    def _on_ticker(self, symbol: str, data: Dict[str, Any]):
+        symbol = symbol.upper()
+        try:
+            seq = int(data.get("sequence") or 0)
+            price = float(data.get("price"))
+        except (TypeError, ValueError):
+            return
+        last = self._seq.get(symbol)
+        if last is not None and seq <= last:
+            self._bump("out_of_order")
+            return
+
+        gap_reason = None
+        if symbol in self._resync:
+            gap_reason = "reconnect"
+        elif last is not None and self.max_seq_gap is not None and seq - last > self.max_seq_gap:
+            gap_reason = f"sequence {last} -> {seq}"
+        self._resync.discard(symbol)
+        self._seq[symbol] = seq
+
+        tick: Dict[str, Any] = {
+            "symbol": symbol,
+            "mid_price": price,
+            "sequence": seq,
+            "timestamp": int(data.get("time") or 0),
+            "received_at": time.time(),
+            "gap": gap_reason is not None,
+        }
+        for src, dst in (("bestAsk", "best_ask"), ("bestBid", "best_bid")):
+            try:
+                tick[dst] = float(data[src])
+            except (KeyError, TypeError, ValueError):
+                pass
+
+        with self._cond:
+            self._latest[symbol] = tick
+            self._stats["ticks"] += 1
+            if gap_reason:
+                self._stats["gaps"] += 1
+            self._cond.notify_all()
+
+        if gap_reason and self.on_gap is not None:
+            try:
+                self.on_gap(symbol, gap_reason)
+            except Exception as e:
+                logger.warning(f"⚠️ on_gap callback failed: {e}")
+        for cb in list(self._listeners):
+            try:
+                cb(tick)
+            except Exception as e:
+                logger.warning(f"⚠️ tick callback failed: {e}")
+        for q in list(self._queues):
+            try:
+                q.put_nowait(tick)
+            except queue.Full:
+                try:
+                    q.get_nowait()
+                    q.put_nowait(tick)
+                except (queue.Empty, queue.Full):
+                    pass
+
+
+# ====================== FEED GLOBAL (POR PROCESSO) ======================
+_FEED: Optional[MarketFeed] = None
+_FEED_LOCK = threading.Lock()
+
+
+def get_market_feed(symbols: Iterable[str] = ()) -> Optional[MarketFeed]:
+    """Feed compartilhado pelo processo (None se desligado/indisponível)."""
+    global _FEED
+    if not ws_enabled():
+        return None
+    with _FEED_LOCK:
+        if _FEED is None:
+            _FEED = MarketFeed(symbols).start()
+        else:
+            _FEED.add_symbols(symbols)
+        return _FEED
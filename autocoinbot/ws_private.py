@@ -0,0 +1,360 @@
+# ws_private.py
+# Canal privado WebSocket da KuCoin: saldos e ordens sempre atualizados no processo
+
+"""
+Stream privado da KuCoin (saldos e ordens spot) com estado em memória.
+
+Assina ``/account/balance`` e ``/spotMarket/tradeOrdersV2`` e mantém, por
+processo, o saldo de cada (tipo de conta, moeda) e o livro de ordens abertas.
+A cada conexão o estado é semeado via REST (``get_accounts_raw_fast`` e
+ordens ativas) *depois* da assinatura, então nenhum evento se perde entre o
+seed e o stream; eventos mais antigos que o seed de uma moeda são ignorados.
+
+Enquanto o socket estiver caído (ou antes do primeiro seed) ``is_live()`` é
+False e as funções de conveniência caem para o REST:
+
+    available_balance("BTC")         -> float (stream ou REST)
+    trade_balances()                 -> lista no formato de api.get_balances
+    wait_for_balance_change(5.0)     -> acorda num evento de saldo ou no timeout
+
+Variáveis de ambiente:
+    KUCOIN_WS_PRIVATE   0 desliga o stream privado (padrão 1; requer credenciais)
+"""
+
+import os
+import time
+import asyncio
+import logging
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+try:
+    from .ws_market import KucoinWSClient, websockets
+except ImportError:
+    from ws_market import KucoinWSClient, websockets
+
+logger = logging.getLogger(__name__)
+
+BALANCE_TOPIC = "/account/balance"
+ORDERS_TOPIC = "/spotMarket/tradeOrdersV2"
+
+
+def _api():
+    try:
+        from . import api
+    except ImportError:
+        import api
+    return api
+
+
+def private_enabled() -> bool:
+    if websockets is None:
+        return False
+    if str(os.environ.get("KUCOIN_WS_PRIVATE", "1")).strip().lower() in ("0", "false", "no", "off"):
+        return False
+    try:
+        return _api()._has_keys()
+    except Exception:
+        return False
+
+
+def private_token() -> Dict[str, Any]:
+    """Handshake assinado ``bullet-private`` (mesmo formato de ``ws_market.public_token``)."""
+    try:
+        from .http_session import http_post
+    except ImportError:
+        from http_session import http_post
+    api = _api()
+    endpoint = "/api/v1/bullet-private"
+    api.rate_limit(endpoint, "POST")
+    headers = api._build_headers("POST", endpoint, "")
+    r = http_post(api._base_url() + endpoint, headers=headers, timeout=10)
+    r.raise_for_status()
+    j = r.json()
+    if not isinstance(j, dict) or j.get("code") != "200000":
+        raise RuntimeError(f"❌ KuCoin bullet-private error: {j}")
+    data = j.get("data") or {}
+    servers = data.get("instanceServers") or []
+    if not servers:
+        raise RuntimeError("❌ KuCoin bullet-private sem instanceServers")
+    srv = servers[0]
+    return {
+        "url_base": srv.get("endpoint"),
+        "token": data.get("token"),
+        "ping_interval": float(srv.get("pingInterval", 18000)) / 1000.0,
+        "ping_timeout": float(srv.get("pingTimeout", 10000)) / 1000.0,
+    }
+
+
+def _rest_accounts() -> List[Dict[str, Any]]:
+    return _api().get_accounts_raw_fast(timeout=4.0)
+
+
+def _rest_open_orders() -> List[Dict[str, Any]]:
+    return _api().get_recent_orders(status="active", limit=500)
+
+
+def _f(v, default: float = 0.0) -> float:
+    try:
+        return float(v)
+    except (TypeError, ValueError):
+        return default
+
+
+class AccountStream(KucoinWSClient):
+    """Saldos e ordens abertas da conta, atualizados pelo canal privado."""
+
+    thread_name = "kucoin-ws-private"
+
+    def __init__(
+        self,
+        token_provider: Optional[Callable[[], Dict[str, Any]]] = None,
+        seed_accounts: Optional[Callable[[], List[Dict[str, Any]]]] = None,
+        seed_orders: Optional[Callable[[], List[Dict[str, Any]]]] = None,
+        reconnect_base: float = 1.0,
+        reconnect_max: float = 60.0,
+    ):
+        super().__init__(token_provider or private_token, reconnect_base, reconnect_max)
+        self.seed_accounts = seed_accounts or _rest_accounts
+        self.seed_orders = seed_orders or _rest_open_orders
+        # (tipo, moeda) -> {"balance", "available", "holds", "ts"}; ts em ms
+        self._balances: Dict[Tuple[str, str], Dict[str, float]] = {}
+        self._orders: Dict[str, Dict[str, Any]] = {}
+        self._balance_version = 0
+        self._seeded = False
+        self._stats.update({"balance_events": 0, "order_events": 0, "stale_events": 0, "seeds": 0})
+
+    # ---------- leitura ----------
+
+    def is_live(self) -> bool:
+        """True com o socket conectado e o estado semeado."""
+        return self.connected.is_set() and self._seeded
+
+    def available(self, currency: str, account_type: str = "trade") -> Optional[float]:
+        """Saldo disponível, ou None se o stream não estiver vivo (use o REST)."""
+        if not self.is_live():
+            return None
+        with self._cond:
+            row = self._balances.get((account_type, currency.upper()))
+        return float(row["available"]) if row else 0.0
+
+    def balances(self, account_type: str = "trade", min_balance: float = 0.0) -> Optional[List[Dict[str, Any]]]:
+        """Mesmo formato de ``api.get_balances`` (None se o stream não estiver vivo)."""
+        if not self.is_live():
+            return None
+        with self._cond:
+            items = [(k, dict(v)) for k, v in self._balances.items() if k[0] == account_type]
+        return [
+            {
+                "currency": cur,
+                "balance": row["balance"],
+                "available": row["available"],
+                "holds": row["holds"],
+                "account_type": typ,
+            }
+            for (typ, cur), row in sorted(items)
+            if row["balance"] >= float(min_balance or 0.0)
+        ]
+
+    def open_orders(self, symbol: Optional[str] = None) -> Optional[List[Dict[str, Any]]]:
+        if not self.is_live():
+            return None
+        with self._cond:
+            orders = [dict(o) for o in self._orders.values()]
+        if symbol:
+            orders = [o for o in orders if o.get("symbol") == symbol.upper()]
+        return orders
+
+    def wait_for_balance_change(self, timeout: float) -> bool:
+        """Bloqueia até o próximo evento de saldo (True) ou ``timeout`` (False)."""
+        deadline = time.monotonic() + float(timeout)
+        with self._cond:
+            start = self._balance_version
+            while self._balance_version == start and not self._stopping:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+            return self._balance_version != start
+
+    def stats(self) -> Dict[str, Any]:
+        out = super().stats()
+        out["live"] = self.is_live()
+        with self._cond:
+            out["open_orders"] = len(self._orders)
+        return out
+
+    # ---------- conexão ----------
+
+    async def _on_open(self, ws):
+        await self._send_subscribe(ws, BALANCE_TOPIC, private=True)
+        await self._send_subscribe(ws, ORDERS_TOPIC, private=True)
+        # Seed depois de assinar: o que mudar durante o REST chega pelo socket.
+        seed_ts = int(time.time() * 1000)
+        accounts, orders = await asyncio.gather(
+            asyncio.to_thread(self.seed_accounts),
+            asyncio.to_thread(self.seed_orders),
+        )
+        self._apply_seed(accounts or [], orders or [], seed_ts)
+
+    def _on_close(self):
+        self._seeded = False
+        with self._cond:
+            self._cond.notify_all()
+
+    def _apply_seed(self, accounts: List[Dict[str, Any]], orders: List[Dict[str, Any]], seed_ts: int):
+        balances: Dict[Tuple[str, str], Dict[str, float]] = {}
+        for a in accounts:
+            cur = str(a.get("currency") or "").upper()
+            if not cur:
+                continue
+            balances[(str(a.get("type") or "trade"), cur)] = {
+                "balance": _f(a.get("balance")),
+                "available": _f(a.get("available")),
+                "holds": _f(a.get("holds")),
+                "ts": seed_ts,
+            }
+        open_orders = {}
+        for o in orders:
+            oid = o.get("id") or o.get("orderId")
+            if not oid or o.get("isActive") is False:
+                continue
+            open_orders[oid] = {
+                "orderId": oid,
+                "clientOid": o.get("clientOid"),
+                "symbol": str(o.get("symbol") or "").upper(),
+                "side": o.get("side"),
+                "type": o.get("type"),
+                "price": _f(o.get("price")),
+                "size": _f(o.get("size")),
+                "filledSize": _f(o.get("dealSize")),
+                "status": "open",
+                "ts": seed_ts,
+            }
+        with self._cond:
+            # Eventos que já chegaram com ts > seed prevalecem sobre o REST.
+            for key, row in self._balances.items():
+                if row["ts"] > seed_ts:
+                    balances[key] = row
+            self._balances = balances
+            self._orders = open_orders
+            self._seeded = True
+            self._balance_version += 1
+            self._stats["seeds"] += 1
+            self._cond.notify_all()
+
+    # ---------- mensagens ----------
+
+    def _on_message(self, msg: Dict[str, Any]):
+        topic = msg.get("topic")
+        data = msg.get("data") or {}
+        if topic == BALANCE_TOPIC:
+            self._on_balance(data)
+        elif topic == ORDERS_TOPIC:
+            self._on_order(data)
+
+    def _on_balance(self, data: Dict[str, Any]):
+        cur = str(data.get("currency") or "").upper()
+        if not cur:
+            return
+        # relationEvent: "trade.hold", "main.deposit", "trade.setted" ... -> tipo da conta
+        account_type = str(data.get("relationEvent") or "trade.").split(".", 1)[0] or "trade"
+        ts = int(_f(data.get("time"), time.time() * 1000))
+        with self._cond:
+            row = self._balances.get((account_type, cur))
+            if row is not None and ts < row["ts"]:
+                self._stats["stale_events"] += 1
+                return
+            self._balances[(account_type, cur)] = {
+                "balance": _f(data.get("total")),
+                "available": _f(data.get("available")),
+                "holds": _f(data.get("hold")),
+                "ts": ts,
+            }
+            self._stats["balance_events"] += 1
+            self._balance_version += 1
+            self._cond.notify_all()
+
+    def _on_order(self, data: Dict[str, Any]):
+        oid = data.get("orderId")
+        if not oid:
+            return
+        # ts do canal de ordens vem em nanossegundos; o resto do estado usa ms
+        ts = int(_f(data.get("ts"), time.time() * 1e9) // 1_000_000)
+        status = data.get("status")
+        with self._cond:
+            self._stats["order_events"] += 1
+            prev = self._orders.get(oid)
+            if prev is not None and ts < prev["ts"]:
+                self._stats["stale_events"] += 1
+                return
+            if status == "done" or data.get("type") in ("filled", "canceled"):
+                self._orders.pop(oid, None)
+            else:
+                self._orders[oid] = {
+                    "orderId": oid,
+                    "clientOid": data.get("clientOid"),
+                    "symbol": str(data.get("symbol") or "").upper(),
+                    "side": data.get("side"),
+                    "type": data.get("orderType"),
+                    "price": _f(data.get("price")),
+                    "size": _f(data.get("size") or data.get("originSize")),
+                    "filledSize": _f(data.get("filledSize")),
+                    "status": status or "open",
+                    "ts": ts,
+                }
+            self._cond.notify_all()
+
+
+# ====================== STREAM GLOBAL (POR PROCESSO) ======================
+_STREAM: Optional[AccountStream] = None
+_STREAM_LOCK = threading.Lock()
+
+
+def get_account_stream() -> Optional[AccountStream]:
+    """Stream privado compartilhado pelo processo (None se desligado/indisponível)."""
+    global _STREAM
+    if not private_enabled():
+        return None
+    with _STREAM_LOCK:
+        if _STREAM is None:
+            _STREAM = AccountStream().start()
+        return _STREAM
+
+
+def available_balance(currency: str, account_type: str = "trade", timeout: float = 3.5) -> float:
+    """Saldo disponível: leitura local se o stream estiver vivo, senão REST (0.0 em falha)."""
+    stream = get_account_stream()
+    if stream is not None:
+        value = stream.available(currency, account_type)
+        if value is not None:
+            return value
+    try:
+        accounts = _api().get_accounts_raw_fast(timeout=timeout)
+    except Exception:
+        return 0.0
+    cur = str(currency or "").upper()
+    best = 0.0
+    for a in accounts or []:
+        if str(a.get("type") or "") == account_type and str(a.get("currency") or "").upper() == cur:
+            best = max(best, _f(a.get("available")))
+    return best
+
+
+def trade_balances() -> List[Dict[str, Any]]:
+    """``api.get_balances(account_type="trade")`` servido pelo stream quando possível."""
+    stream = get_account_stream()
+    if stream is not None:
+        rows = stream.balances("trade")
+        if rows is not None:
+            return rows
+    return _api().get_balances(account_type="trade")
+
+
+def wait_for_balance_change(timeout: float):
+    """Espera um evento de saldo (stream vivo) ou simplesmente ``timeout`` segundos."""
+    stream = get_account_stream()
+    if stream is not None and stream.is_live():
+        stream.wait_for_balance_change(timeout)
+    else:
+        time.sleep(timeout)
@@ -0,0 +1,226 @@
+# ws_stub_server.py
+# Servidor WebSocket local que imita o feed público da KuCoin (testes offline)
+
+"""
+Substituto local do WebSocket público da KuCoin para testes.
+
+Implementa o suficiente do protocolo para exercitar ``ws_market.MarketFeed``
+sem rede: ``welcome`` ao conectar, ``pong`` para ``ping``, ``ack`` para
+``subscribe``/``unsubscribe``, mensagens ``trade.ticker`` periódicas para
+os tópicos ``/market/ticker:...`` assinados (passeio aleatório de preço) e
+``publish()`` para empurrar mensagens de canais privados
+(``/account/balance``, ``/spotMarket/tradeOrdersV2``).
+
+Ganchos para simular falhas:
+    drop_all()            derruba todas as conexões (testa reconexão)
+    skip_sequence(n)      pula ``n`` números de sequência (testa gaps)
+    respond_pings=False   não responde ping nem envia ticks (testa heartbeat)
+
+Uso em testes:
+    stub = StubKucoinWS(tick_interval=0.05).start()
+    feed = MarketFeed(["BTC-USDT"], token_provider=stub.token_info).start()
+
+Standalone:
+    python -m autocoinbot.ws_stub_server --port 8765
+"""
+
+import json
+import time
+import random
+import asyncio
+import argparse
+import threading
+from typing import Any, Dict, Optional, Set
+
+import websockets
+
+
+class StubKucoinWS:
+    """Servidor ``websockets`` numa thread própria."""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, tick_interval: float = 0.1,
+                 ping_interval: float = 18.0, ping_timeout: float = 10.0,
+                 respond_pings: bool = True, start_price: float = 100.0):
+        self.host = host
+        self.port = int(port)
+        self.tick_interval = float(tick_interval)
+        self.ping_interval = float(ping_interval)
+        self.ping_timeout = float(ping_timeout)
+        self.respond_pings = respond_pings
+        self.start_price = float(start_price)
+        self.connections = 0
+        self.pings = 0
+        self._prices: Dict[str, float] = {}
+        self._sequence = 1_000_000
+        self._clients: Dict[Any, Set[str]] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._server = None
+        self._stopped: Optional[asyncio.Event] = None
+        self._ready = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    # ---------- controle (thread do teste) ----------
+
+    def start(self) -> "StubKucoinWS":
+        self._thread = threading.Thread(target=lambda: asyncio.run(self._main()),
+                                        name="kucoin-ws-stub", daemon=True)
+        self._thread.start()
+        if not self._ready.wait(5.0):
+            raise RuntimeError("stub WS não subiu")
+        return self
+
+    def stop(self):
+        if self._loop is not None and self._stopped is not None:
+            self._loop.call_soon_threadsafe(self._stopped.set)
+        if self._thread is not None:
+            self._thread.join(5.0)
+
+    @property
+    def url(self) -> str:
+        return f"ws://{self.host}:{self.port}/endpoint"
+
+    def token_info(self) -> Dict[str, Any]:
+        """Mesmo formato de ``ws_market.public_token`` (usado como ``token_provider``)."""
+        return {
+            "url_base": self.url,
+            "token": "stub-token",
+            "ping_interval": self.ping_interval,
+            "ping_timeout": self.ping_timeout,
+        }
+
+    def set_price(self, symbol: str, price: float):
+        self._prices[symbol.upper()] = float(price)
+
+    def skip_sequence(self, n: int):
+        self._sequence += int(n)
+
+    def publish(self, topic: str, subject: str, data: Dict[str, Any]) -> int:
+        """Envia uma mensagem a quem assinou ``topic``; retorna quantos receberam."""
+        loop = self._loop
+        if loop is None:
+            return 0
+
+        async def _send():
+            sent = 0
+            for ws, topics in list(self._clients.items()):
+                if topic in topics:
+                    await ws.send(json.dumps({"type": "message", "topic": topic,
+                                              "subject": subject, "data": data}))
+                    sent += 1
+            return sent
+
+        return asyncio.run_coroutine_threadsafe(_send(), loop).result(5.0)
+
+    def subscribers(self, topic: str) -> int:
+        return sum(1 for topics in list(self._clients.values()) if topic in topics)
+
+    def drop_all(self):
+        """Fecha todas as conexões abertas (código 1011, como uma queda do servidor)."""
+        loop = self._loop
+        if loop is None:
+            return
+
+        async def _close():
+            for ws in list(self._clients):
+                await ws.close(code=1011, reason="stub drop")
+
+        asyncio.run_coroutine_threadsafe(_close(), loop).result(5.0)
+
+    # ---------- servidor ----------
+
+    async def _main(self):
+        self._loop = asyncio.get_running_loop()
+        self._stopped = asyncio.Event()
+        async with websockets.serve(self._handler, self.host, self.port) as server:
+            self._server = server
+            self.port = server.sockets[0].getsockname()[1]
+            self._ready.set()
+            await self._stopped.wait()
+
+    async def _handler(self, ws):
+        self.connections += 1
+        topics: Set[str] = set()
+        self._clients[ws] = topics
+        await ws.send(json.dumps({"id": f"stub-{self.connections}", "type": "welcome"}))
+        pusher = asyncio.ensure_future(self._push_ticks(ws, topics))
+        try:
+            async for raw in ws:
+                try:
+                    msg = json.loads(raw)
+                except ValueError:
+                    continue
+                mtype = msg.get("type")
+                if mtype == "ping":
+                    self.pings += 1
+                    if self.respond_pings:
+                        await ws.send(json.dumps({"id": msg.get("id"), "type": "pong"}))
+                elif mtype in ("subscribe", "unsubscribe"):
+                    topic = str(msg.get("topic", ""))
+                    prefix, sep, syms = topic.partition(":")
+                    if sep:
+                        names = {f"{prefix}:{s.strip().upper()}" for s in syms.split(",") if s.strip()}
+                    else:
+                        names = {topic}  # tópicos privados: /account/balance, /spotMarket/tradeOrdersV2
+                    if mtype == "subscribe":
+                        topics |= names
+                    else:
+                        topics -= names
+                    if msg.get("response"):
+                        await ws.send(json.dumps({"id": msg.get("id"), "type": "ack"}))
+        except websockets.ConnectionClosed:
+            pass
+        finally:
+            pusher.cancel()
+            self._clients.pop(ws, None)
+
+    async def _push_ticks(self, ws, topics: Set[str]):
+        try:
+            while True:
+                await asyncio.sleep(self.tick_interval)
+                if not self.respond_pings:
+                    continue  # servidor "mudo": nada chega ao cliente
+                for topic in list(topics):
+                    if not topic.startswith("/market/ticker:"):
+                        continue
+                    symbol = topic.split(":", 1)[1]
+                    price = self._prices.get(symbol, self.start_price)
+                    price *= 1.0 + random.uniform(-0.0005, 0.0005)
+                    self._prices[symbol] = price
+                    self._sequence += 1
+                    await ws.send(json.dumps({
+                        "type": "message",
+                        "topic": topic,
+                        "subject": "trade.ticker",
+                        "data": {
+                            "sequence": str(self._sequence),
+                            "price": f"{price:.8f}",
+                            "size": "0.01",
+                            "bestAsk": f"{price * 1.0001:.8f}",
+                            "bestAskSize": "1",
+                            "bestBid": f"{price * 0.9999:.8f}",
+                            "bestBidSize": "1",
+                            "time": int(time.time() * 1000),
+                        },
+                    }))
+        except (asyncio.CancelledError, websockets.ConnectionClosed):
+            pass
+
+
+def main():
+    p = argparse.ArgumentParser(description="Stub local do WebSocket público da KuCoin")
+    p.add_argument("--host", default="127.0.0.1")
+    p.add_argument("--port", type=int, default=8765)
+    p.add_argument("--tick-interval", type=float, default=0.5)
+    args = p.parse_args()
+
+    stub = StubKucoinWS(args.host, args.port, tick_interval=args.tick_interval).start()
+    print(f"stub KuCoin WS em {stub.url} (Ctrl+C para sair)")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        stub.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""EXPLAIN ANALYZE the hot read queries against a seeded PostgreSQL database.
+
+Seeds bench rows (bot_id prefix ``bench_``) into the regular tables, applies
+the schema migrations, then runs each hot query under
+``EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON)`` and reports execution time and
+whether a sequential scan was used.
+
+Run it against a scratch database, never production:
+
+  ./scripts/bench_query_plans.py --dsn postgresql://user:pw@localhost/bench seed --rows 1000000
+  ./scripts/bench_query_plans.py --dsn ... run --save baseline.json
+  ./scripts/bench_query_plans.py --dsn ... run --compare baseline.json --max-slowdown 2.0
+  ./scripts/bench_query_plans.py --dsn ... cleanup
+
+``run --compare`` exits with status 1 if a query got slower than
+``--max-slowdown`` times the baseline or switched to a sequential scan.
+"""
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+HERE = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(HERE))
+
+from database import DatabaseManager
+
+BENCH_BOTS = 200
+HOT_BOT = "bench_bot_7"
+
+# name -> (sql, params): same shapes as DatabaseManager / terminal_component
+QUERIES = {
+    "get_bot_logs": (
+        "SELECT * FROM bot_logs WHERE bot_id = %s ORDER BY timestamp DESC LIMIT 30",
+        (HOT_BOT,),
+    ),
+    "get_trades_bot": (
+        "SELECT timestamp, profit, bot_id FROM trades WHERE bot_id = %s ORDER BY timestamp",
+        (HOT_BOT,),
+    ),
+    "get_trade_history_grouped": (
+        "SELECT DISTINCT ON (order_id) id, timestamp, symbol, side, price, size, funds, profit, "
+        "commission, order_id, bot_id, strategy, dry_run, metadata "
+        "FROM trades WHERE 1=1 ORDER BY order_id, timestamp DESC LIMIT %s",
+        (1000,),
+    ),
+    "get_trade_history_grouped_bot": (
+        "SELECT DISTINCT ON (order_id) id, timestamp, symbol, side, price, size, funds, profit, "
+        "commission, order_id, bot_id, strategy, dry_run, metadata "
+        "FROM trades WHERE 1=1 AND bot_id = %s ORDER BY order_id, timestamp DESC LIMIT %s",
+        (HOT_BOT, 1000),
+    ),
+    "get_active_bots": (
+        "SELECT * FROM bot_sessions WHERE status = 'running' ORDER BY start_ts DESC",
+        (),
+    ),
+    "active_bot_latest": (
+        "SELECT id FROM bot_sessions WHERE status = 'running' ORDER BY start_ts DESC LIMIT 1",
+        (),
+    ),
+}
+
+
+def seed(db: DatabaseManager, rows: int):
+    conn = db.get_connection()
+    cur = conn.cursor()
+    now = time.time()
+    t0 = time.time()
+    print(f"Seeding {rows} bot_logs, {rows} trades, {rows // 10} bot_sessions ...")
+    cur.execute(
+        """
+        INSERT INTO bot_logs (bot_id, timestamp, level, message, data)
+        SELECT 'bench_bot_' || (g %% %s), %s - g * 0.5,
+               (ARRAY['DEBUG','INFO','WARNING','ERROR'])[1 + g %% 4],
+               '{"event": "price_check", "price": ' || (40000 + g %% 1000) || '}', NULL
+        FROM generate_series(1, %s) AS g
+        """,
+        (BENCH_BOTS, now, rows),
+    )
+    cur.execute(
+        """
+        INSERT INTO trades (id, timestamp, symbol, side, price, size, funds, profit,
+                            order_id, bot_id, strategy, dry_run, metadata)
+        SELECT 'bench_' || g, %s - g * 5.0,
+               (ARRAY['BTC-USDT','ETH-USDT','SOL-USDT'])[1 + g %% 3],
+               CASE WHEN g %% 2 = 0 THEN 'buy' ELSE 'sell' END,
+               40000 + (g %% 1000), 0.001, 40.0, (g %% 7) - 3,
+               'bench_order_' || (g / 3), 'bench_bot_' || (g %% %s), 'bench',
+               (g %% 5 = 0), '{}'::jsonb
+        FROM generate_series(1, %s) AS g
+        """,
+        (now, BENCH_BOTS, rows),
+    )
+    cur.execute(
+        """
+        INSERT INTO bot_sessions (id, symbol, mode, entry_price, start_ts, status, dry_run)
+        SELECT 'bench_session_' || g, 'BTC-USDT', 'sell', 40000, %s - g * 60.0,
+               CASE WHEN g %% 500 = 0 THEN 'running' ELSE 'stopped' END, TRUE
+        FROM generate_series(1, %s) AS g
+        """,
+        (now, max(1, rows // 10)),
+    )
+    conn.commit()
+    for table in ("bot_logs", "trades", "bot_sessions"):
+        cur.execute(f"ANALYZE {table}")
+    conn.commit()
+    conn.close()
+    print(f"Seeded in {time.time() - t0:.1f}s")
+
+
+def cleanup(db: DatabaseManager):
+    conn = db.get_connection()
+    cur = conn.cursor()
+    cur.execute("DELETE FROM bot_logs WHERE bot_id LIKE 'bench\\_%%'")
+    cur.execute("DELETE FROM trades WHERE id LIKE 'bench\\_%%'")
+    cur.execute("DELETE FROM bot_sessions WHERE id LIKE 'bench\\_%%'")
+    conn.commit()
+    conn.close()
+    print("Bench rows removed")
+
+
+def _node_types(plan: dict) -> list:
+    out = [plan.get("Node Type")]
+    for child in plan.get("Plans", []) or []:
+        out.extend(_node_types(child))
+    return out
+
+
+def explain(db: DatabaseManager, repeat: int) -> dict:
+    conn = db.get_connection()
+    cur = conn.cursor()
+    results = {}
+    try:
+        for name, (sql, params) in QUERIES.items():
+            best = None
+            for _ in range(max(1, repeat)):
+                cur.execute("EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + sql, params)
+                row = cur.fetchone()
+                doc = list(row.values())[0] if isinstance(row, dict) else row[0]
+                if isinstance(doc, str):
+                    doc = json.loads(doc)
+                top = doc[0]
+                if best is None or top["Execution Time"] < best["Execution Time"]:
+                    best = top
+            nodes = _node_types(best["Plan"])
+            results[name] = {
+                "execution_ms": round(best["Execution Time"], 3),
+                "planning_ms": round(best.get("Planning Time", 0.0), 3),
+                "seq_scan": "Seq Scan" in nodes,
+                "nodes": nodes,
+            }
+        conn.rollback()
+    finally:
+        conn.close()
+    return results
+
+
+def compare(current: dict, baseline: dict, max_slowdown: float) -> list:
+    problems = []
+    for name, cur in current.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        if cur["seq_scan"] and not base["seq_scan"]:
+            problems.append(f"{name}: now uses a sequential scan ({' > '.join(cur['nodes'])})")
+        limit = max(base["execution_ms"] * max_slowdown, 1.0)
+        if cur["execution_ms"] > limit:
+            problems.append(
+                f"{name}: {cur['execution_ms']:.2f}ms vs baseline {base['execution_ms']:.2f}ms"
+            )
+    return problems
+
+
+def cmd_run(db: DatabaseManager, args) -> int:
+    results = explain(db, args.repeat)
+    width = max(len(n) for n in results)
+    for name, r in results.items():
+        scan = "SEQ SCAN" if r["seq_scan"] else "index"
+        print(f"{name.ljust(width)}  {r['execution_ms']:>10.3f} ms  {scan:8}  {' > '.join(r['nodes'])}")
+    if args.save:
+        Path(args.save).write_text(json.dumps(results, indent=2))
+        print(f"Saved to {args.save}")
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text())
+        problems = compare(results, baseline, args.max_slowdown)
+        for p in problems:
+            print(f"REGRESSION {p}")
+        return 1 if problems else 0
+    return 0
+
+
+def main():
+    p = argparse.ArgumentParser(description="EXPLAIN ANALYZE the hot queries on a seeded database")
+    p.add_argument("--dsn", required=True, help="Scratch database (do not point at production)")
+    sub = p.add_subparsers(dest="cmd")
+
+    a = sub.add_parser("seed", help="Insert bench rows and ANALYZE")
+    a.add_argument("--rows", type=int, default=1_000_000)
+
+    a = sub.add_parser("run", help="Run EXPLAIN ANALYZE for every hot query")
+    a.add_argument("--repeat", type=int, default=3, help="Keep the fastest of N runs")
+    a.add_argument("--save", help="Write results as JSON (baseline)")
+    a.add_argument("--compare", help="Baseline JSON to check for regressions")
+    a.add_argument("--max-slowdown", type=float, default=2.0)
+
+    sub.add_parser("cleanup", help="Delete bench rows")
+
+    args = p.parse_args()
+    db = DatabaseManager(db_dsn=args.dsn)
+    if args.cmd == "seed":
+        seed(db, args.rows)
+    elif args.cmd == "run":
+        sys.exit(cmd_run(db, args))
+    elif args.cmd == "cleanup":
+        cleanup(db)
+    else:
+        p.print_help()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""Microbenchmark of KuCoin request signing.
+
+Compares the per-request cost of:
+
+  legacy   the old ``_build_headers`` body: re-encode the secret, recompute the
+           V2 passphrase HMAC and build every header on each call
+  signer   ``signing.Signer.headers`` (HMAC keyed once and copied per request,
+           cached passphrase and static headers)
+  batch    ``signing.Signer.headers_many`` for a batch sharing one timestamp
+
+Uses dummy credentials and never touches the network:
+
+  ./scripts/bench_signing.py
+  ./scripts/bench_signing.py --iterations 200000 --version 1 --batch 50
+"""
+import argparse
+import base64
+import hashlib
+import hmac
+import sys
+import time
+from pathlib import Path
+
+HERE = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(HERE / "autocoinbot"))
+
+from signing import Signer
+
+KEY, SECRET, PASSPHRASE = "bench-key", "bench-secret-0123456789abcdef", "bench-passphrase"
+ENDPOINT = "/api/v1/fills?currentPage=1&pageSize=500&symbol=BTC-USDT"
+
+
+def legacy_headers(method, endpoint, body, ts, version):
+    if not (KEY and SECRET and PASSPHRASE):  # validate_credentials()
+        raise RuntimeError("missing credentials")
+    ts = str(ts)
+    to_sign = ts + method.upper() + endpoint + (body or "")
+    signature = base64.b64encode(hmac.new(SECRET.encode(), to_sign.encode(), hashlib.sha256).digest()).decode()
+    if version == "1":
+        passphrase = PASSPHRASE
+    else:
+        passphrase = base64.b64encode(
+            hmac.new(SECRET.encode(), PASSPHRASE.encode(), hashlib.sha256).digest()
+        ).decode()
+    return {
+        "KC-API-KEY": KEY,
+        "KC-API-SIGN": signature,
+        "KC-API-TIMESTAMP": ts,
+        "KC-API-PASSPHRASE": passphrase,
+        "KC-API-KEY-VERSION": version,
+        "Content-Type": "application/json",
+    }
+
+
+def bench(label, fn, n):
+    fn()  # warm-up
+    t0 = time.perf_counter()
+    fn_n = n
+    while fn_n:
+        fn()
+        fn_n -= 1
+    per = (time.perf_counter() - t0) / n * 1e6
+    print(f"{label:<8} {per:8.2f} us/request")
+    return per
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    p.add_argument("--iterations", type=int, default=100000)
+    p.add_argument("--version", choices=("1", "2"), default="2")
+    p.add_argument("--batch", type=int, default=20, help="requests per headers_many call")
+    args = p.parse_args()
+
+    ts = int(time.time() * 1000)
+    signer = Signer(KEY, SECRET, PASSPHRASE, args.version)
+    assert signer.headers("GET", ENDPOINT, "", ts) == legacy_headers("GET", ENDPOINT, "", ts, args.version)
+
+    n = args.iterations
+    batch = [("GET", ENDPOINT)] * args.batch
+    print(f"key version {args.version}, {n} iterations, batch of {args.batch}")
+    legacy = bench("legacy", lambda: legacy_headers("GET", ENDPOINT, "", ts, args.version), n)
+    single = bench("signer", lambda: signer.headers("GET", ENDPOINT, "", ts), n)
+    t0 = time.perf_counter()
+    for _ in range(max(1, n // args.batch)):
+        signer.headers_many(batch, ts)
+    per_batch = (time.perf_counter() - t0) / (max(1, n // args.batch) * args.batch) * 1e6
+    print(f"{'batch':<8} {per_batch:8.2f} us/request")
+    print(f"speedup  signer {legacy / single:.2f}x, batch {legacy / per_batch:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+
+from autocoinbot import api, api_async
+
+pytestmark = pytest.mark.skipif(not api_async.available(), reason="aiohttp não instalado")
+
+
+class _StubRest(BaseHTTPRequestHandler):
+    """level1 e POST /api/v1/orders no formato da KuCoin."""
+    orders = []
+
+    def _reply(self, data):
+        body = json.dumps({"code": "200000", "data": data}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        symbol = parse_qs(url.query)["symbol"][0]
+        price = {"BTC-USDT": "60000", "ETH-USDT": "3000"}[symbol]
+        self._reply({"price": price, "bestAsk": price, "bestBid": price, "time": 1})
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers["Content-Length"])).decode()
+        self.orders.append((dict(self.headers), body))
+        self._reply({"orderId": "o1"})
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub(monkeypatch):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StubRest)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    monkeypatch.setattr(api, "KUCOIN_BASE", f"http://127.0.0.1:{server.server_port}")
+    _StubRest.orders = []
+    yield _StubRest
+    server.shutdown()
+
+
+def test_orderbook_prices_fetched_concurrently(stub):
+    books = api_async.fetch_orderbook_prices(["BTC-USDT", "ETH-USDT"])
+    assert books["BTC-USDT"]["mid_price"] == 60000.0
+    assert books["ETH-USDT"]["mid_price"] == 3000.0
+
+
+def test_market_order_body_signed_and_posted(stub, monkeypatch):
+    monkeypatch.setattr(api, "API_KEY", "key")
+    monkeypatch.setattr(api, "API_SECRET", "secret")
+    monkeypatch.setattr(api, "API_PASSPHRASE", "pass")
+    monkeypatch.setattr(api, "_server_time", lambda: 1_700_000_000_000)
+    monkeypatch.setattr(api, "_clock_warmed", True)
+
+    result = api_async.run_sync(
+        lambda client: client.place_market_order("BTC-USDT", "buy", funds=25, client_oid="cid"))
+    assert result["data"]["orderId"] == "o1"
+    headers, body = stub.orders[0]
+    assert json.loads(body) == {"clientOid": "cid", "side": "buy", "symbol": "BTC-USDT",
+                                "type": "market", "funds": "25.0"}
+    expected = api.get_signer().headers("POST", "/api/v1/orders", body, 1_700_000_000_000)
+    assert headers["KC-API-SIGN"] == expected["KC-API-SIGN"]
@@ -0,0 +1,27 @@
+from autocoinbot.api_metrics import ApiMetrics, collect, endpoint_of, render_prometheus
+
+
+def test_records_latency_status_codes_and_retries(tmp_path):
+    m = ApiMetrics(directory=str(tmp_path), dump_interval=3600)
+    url = "https://api.kucoin.com/api/v1/orders/5c35c02703aa673ceec2a168?x=1"
+    m.record("GET", url, 0.07, status=200, bytes_in=30, code="200000")
+    m.mark_retry()
+    m.record("GET", url, 3.0, status=429, code="429000")
+    m.record("GET", url, 0.2, error="ReadTimeout")
+    e = m.snapshot()["endpoints"]["GET /api/v1/orders/{id}"]
+    assert e["count"] == 3 and e["retries"] == 1 and e["bytes_in"] == 30
+    assert e["status"] == {"200": 1, "429": 1} and e["kucoin_codes"] == {"429000": 1}
+    assert e["errors"] == {"ReadTimeout": 1}
+    assert e["buckets"][2] == 1 and e["buckets"][7] == 1  # 0.1s e 5s
+
+
+def test_collect_and_prometheus_render(tmp_path):
+    m = ApiMetrics(directory=str(tmp_path), dump_interval=3600, process="bot")
+    m.record("GET", "https://x/api/v1/market/orderbook/level1?symbol=BTC-USDT", 0.01, status=200)
+    (tmp_path / "999999999.json").write_text("{}")  # processo morto: descartado
+    snaps = collect(m)
+    assert len(snaps) == 1 and not (tmp_path / "999999999.json").exists()
+    text = render_prometheus(snaps, {"public": {"tokens": 10.0}})
+    assert 'endpoint="/api/v1/market/orderbook/level1",le="+Inf"} 1' in text
+    assert 'kucoin_ratelimit_tokens{pool="public"} 10.0' in text
+    assert endpoint_of("/api/v1/accounts/123456789/ledgers") == "/api/v1/accounts/{id}/ledgers"
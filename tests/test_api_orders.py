@@ -0,0 +1,49 @@
+import base64
+import hashlib
+import hmac
+import json
+
+import pytest
+
+from autocoinbot import api
+
+TS = 1_700_000_000_123
+
+
+@pytest.fixture
+def creds(monkeypatch):
+    monkeypatch.setattr(api, "API_KEY", "key")
+    monkeypatch.setattr(api, "API_SECRET", "secret")
+    monkeypatch.setattr(api, "API_PASSPHRASE", "pass")
+    monkeypatch.setattr(api, "API_KEY_VERSION", "2")
+    monkeypatch.setattr(api, "_server_time", lambda: TS)
+    monkeypatch.setattr(api, "rate_limit", lambda *a, **k: True)
+
+
+def _sign(msg):
+    return base64.b64encode(hmac.new(b"secret", msg.encode(), hashlib.sha256).digest()).decode()
+
+
+def test_market_order_body_is_built_and_signed(creds, monkeypatch):
+    sent = {}
+
+    class _Resp:
+        status_code = 200
+        text = ""
+
+        def json(self):
+            return {"code": "200000", "data": {"orderId": "o1"}}
+
+    def fake_post(url, headers=None, data=None, timeout=None):
+        sent.update(url=url, headers=headers, data=data)
+        return _Resp()
+
+    monkeypatch.setattr(api, "_http_post", fake_post)
+    result = api.place_market_order("BTC-USDT", "BUY", size=0.001, client_oid="cid")
+
+    assert result["data"]["orderId"] == "o1"
+    assert json.loads(sent["data"]) == {"clientOid": "cid", "side": "buy", "symbol": "BTC-USDT",
+                                        "type": "market", "size": "0.001"}
+    assert sent["headers"]["KC-API-SIGN"] == _sign(f"{TS}POST/api/v1/orders{sent['data']}")
+    with pytest.raises(ValueError):
+        api._market_order_body("BTC-USDT", "buy")
@@ -0,0 +1,47 @@
+import threading
+
+from autocoinbot.candle_backfill import backfill, plan_windows
+from autocoinbot.candle_store import CandleStore
+
+STEP = 3600
+START = 1_600_000_000 - 1_600_000_000 % STEP
+END = START + 10 * 24 * STEP  # 241 candles
+
+
+def _fetcher(calls, fail_on=None):
+    lock = threading.Lock()
+
+    def fetch(symbol, ktype, start, end):
+        with lock:
+            calls.append(start)
+        if fail_on is not None and start == fail_on:
+            raise RuntimeError("boom")
+        return [[str(t), "1", "1", "1", "1", "1", "1"] for t in range(end, start - 1, -STEP)]
+    return fetch
+
+
+def test_windows_overlap_and_cover_range():
+    windows = plan_windows(START, END, STEP, page=50)
+    assert windows[0][0] == START and windows[-1][1] == END
+    assert all(a[1] == b[0] for a, b in zip(windows, windows[1:]))
+    assert all(w[1] - w[0] <= 49 * STEP for w in windows)
+
+
+def test_resume_after_failed_window(tmp_path):
+    store = CandleStore(lambda *a: [], directory=str(tmp_path))
+    windows = plan_windows(START, END, STEP, page=50)
+    calls = []
+
+    first = backfill("BTC-USDT", "1hour", START, END, store=store, page=50, workers=3,
+                     fetcher=_fetcher(calls, fail_on=windows[2][0]), retries=0)
+    assert not first["complete"] and first["failed"] == 1
+    assert store.bounds("BTC-USDT", "1hour")["covered_from"] > START
+
+    calls.clear()
+    second = backfill("BTC-USDT", "1hour", START, store=store, page=50, fetcher=_fetcher(calls))
+    assert calls == [windows[2][0]]
+    assert second["complete"] and second["gaps"] == 0
+
+    rows = store.read("BTC-USDT", "1hour", START, END)
+    assert len(rows) == 241 and len({r[0] for r in rows}) == 241
+    assert store.bounds("BTC-USDT", "1hour")["covered_from"] == START
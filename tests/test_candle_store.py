@@ -0,0 +1,59 @@
+from autocoinbot.candle_store import CandleStore
+
+
+class _Clock:
+    def __init__(self, t):
+        self.t = float(t)
+
+    def __call__(self):
+        return self.t
+
+
+def _fetcher(calls, clock, step=300):
+    def fetch(symbol, ktype, start, end):
+        calls.append((start, end))
+        first = start - start % step
+        last = int(clock()) - int(clock()) % step
+        # Formato da API: strings, mais novo primeiro; o candle corrente varia com o relógio.
+        return [[str(t), "1", str(clock()), "2", "0.5", "10", "10"] for t in range(last, first - 1, -step)][:1500]
+    return fetch
+
+
+def test_fetches_window_once_then_only_new_bars(tmp_path):
+    calls = []
+    clock = _Clock(1_700_000_000 - 1_700_000_000 % 300 + 10)
+    store = CandleStore(_fetcher(calls, clock), directory=str(tmp_path), clock=clock)
+    start = int(clock()) - 24 * 3600
+
+    first = store.get("BTC-USDT", "5min", start)
+    assert len(calls) == 1 and len(first) >= 288
+    assert first[0][0] > first[-1][0]
+
+    clock.t += 60  # mesmo candle de 5 min: nenhuma requisição
+    assert store.get("BTC-USDT", "5min", start + 60) == [r for r in first if r[0] >= start + 60]
+    assert len(calls) == 1
+
+    clock.t += 300  # candle novo: busca só a partir do último guardado
+    last_stored = first[0][0]
+    newer = store.get("BTC-USDT", "5min", start + 360)
+    assert calls[-1][0] == last_stored and len(calls) == 2
+    assert newer[0][0] == last_stored + 300
+    assert newer[1][2] == clock.t  # candle em formação foi reescrito
+
+    # Outro processo (nova instância) reaproveita o arquivo sem buscar nada.
+    other = CandleStore(_fetcher(calls, clock), directory=str(tmp_path), clock=clock)
+    assert other.get("BTC-USDT", "5min", start + 360) == newer
+    assert len(calls) == 2
+
+
+def test_failed_fetch_serves_stored_candles(tmp_path):
+    calls = []
+    clock = _Clock(1_700_000_000)
+    store = CandleStore(_fetcher(calls, clock), directory=str(tmp_path), clock=clock)
+    start = int(clock()) - 3600
+    rows = store.get("ETH-USDT", "5min", start)
+
+    store.fetcher = lambda *a: []
+    clock.t += 600
+    assert store.get("ETH-USDT", "5min", start) == rows
+    assert store.stats()["errors"] == 1
@@ -0,0 +1,31 @@
+import time
+
+from autocoinbot.clock_sync import ClockSync, estimate
+
+
+def test_estimate_prefers_low_rtt_samples():
+    # Amostra rápida diz +100ms; a lenta (RTT 10x maior) puxa pouco.
+    offset, rtt = estimate([(0.0, 105.0, 10.0), (0.0, 400.0, 100.0)])
+    assert rtt == 10.0
+    assert 100.0 < offset < 105.0
+
+
+def test_refresh_and_failure_keep_estimate_without_io():
+    state = {"fail": False}
+
+    def probe():
+        if state["fail"]:
+            raise RuntimeError("down")
+        t0 = time.time() * 1000.0
+        return t0, t0 + 2 + 750.0, t0 + 4
+
+    clock = ClockSync(probe=probe, samples=3)
+    assert clock.refresh() and clock.is_synced()
+    assert abs(clock.offset_ms() - 750.0) < 5
+
+    state["fail"] = True
+    assert not clock.refresh()
+    stats = clock.stats()
+    assert stats["failures"] == 1 and stats["syncs"] == 1 and stats["last_error"] == "down"
+    assert abs(clock.offset_ms() - 750.0) < 5
+    assert stats["rtt_ms"] == 4.0 and stats["age_s"] is not None
@@ -0,0 +1,86 @@
+import threading
+
+from autocoinbot import fills_sync
+
+DAY_MS = 86400 * 1000
+NOW = 1_700_000_000_000
+
+
+class _FakeDB:
+    def __init__(self):
+        self.trades = {}
+        self.marks = {}
+        self.batches = 0
+        self._lock = threading.Lock()
+
+    def get_sync_watermark(self, source, account, scope=""):
+        return self.marks.get((source, account, scope))
+
+    def set_sync_watermark(self, source, account, watermark_ms, scope=""):
+        key = (source, account, scope)
+        self.marks[key] = max(self.marks.get(key, 0), watermark_ms)
+        return self.marks[key]
+
+    def insert_trades_bulk(self, trades):
+        with self._lock:
+            self.batches += 1
+            new = [t for t in trades if t["id"] not in self.trades]
+            self.trades.update((t["id"], t) for t in trades)
+        return {"inserted": len(new), "skipped": len(trades) - len(new)}
+
+
+def _exchange(fills_per_day=30, fail_start=None):
+    """Fills a cada 48 min; paginação no formato de /api/v1/fills."""
+    fills = [{"tradeId": f"t{ts}", "orderId": "o", "symbol": "BTC-USDT", "side": "buy",
+              "price": "1", "size": "1", "createdAt": ts}
+             for ts in range(NOW - 30 * DAY_MS, NOW, DAY_MS // fills_per_day)]
+    calls = []
+
+    def fetch(symbol, start, end, page_size, page):
+        calls.append((start, page))
+        if fail_start is not None and start == fail_start:
+            raise RuntimeError("boom")
+        items = [f for f in fills if start <= f["createdAt"] <= end]
+        total_pages = max(1, -(-len(items) // page_size))
+        return {"data": {"items": items[(page - 1) * page_size: page * page_size], "totalPage": total_pages}}
+    return fetch, calls, fills
+
+
+def test_first_sync_then_incremental():
+    db = _FakeDB()
+    fetch, calls, fills = _exchange()
+
+    first = fills_sync.sync_fills(db, lookback_days=20, fetch_page=fetch, account="acc",
+                                  now_ms=NOW, page_size=50, retries=0)
+    assert first["windows"] == 3 and first["failed"] == 0
+    assert first["watermark"] == NOW
+    assert first["inserted"] == len([f for f in fills if f["createdAt"] >= NOW - 20 * DAY_MS])
+    assert first["pages"] > first["windows"]  # paginou e gravou página a página
+
+    calls.clear()
+    later = NOW + 3600 * 1000
+    second = fills_sync.sync_fills(db, fetch_page=fetch, account="acc", now_ms=later, page_size=50)
+    assert second["windows"] == 1 and second["inserted"] == 0
+    assert calls == [(NOW - 5 * 60 * 1000, 1)]
+
+
+def test_failed_window_holds_watermark():
+    db = _FakeDB()
+    windows = fills_sync.plan_windows(NOW - 20 * DAY_MS, NOW)
+    fetch, _, _ = _exchange(fail_start=windows[1][0])
+
+    report = fills_sync.sync_fills(db, lookback_days=20, fetch_page=fetch, account="acc",
+                                   now_ms=NOW, retries=0)
+    assert report["failed"] == 1
+    assert report["watermark"] == windows[0][1]
+
+
+def test_truncated_window_holds_watermark(monkeypatch):
+    db = _FakeDB()
+    fetch, _, _ = _exchange(fills_per_day=200)
+    monkeypatch.setattr(fills_sync, "MAX_PAGES", 2)
+
+    report = fills_sync.sync_fills(db, lookback_days=20, fetch_page=fetch, account="acc",
+                                   now_ms=NOW, page_size=50, retries=0)
+    assert report["failed"] == 3
+    assert report["watermark"] is None and report["inserted"] > 0
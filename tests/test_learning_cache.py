@@ -0,0 +1,46 @@
+import socket
+from types import SimpleNamespace
+
+from autocoinbot.learning_cache import LearningStatsCache
+
+
+class _FakeDB:
+    def __init__(self):
+        self.rows = [{"param_value": 1.0, "mean_reward": 0.5, "n": 2}]
+        self.loads = 0
+
+    def get_learning_stats(self, symbol, param_name):
+        self.loads += 1
+        return self.rows
+
+
+class _FakePGconn:
+    def __init__(self, payloads):
+        self.queue = [SimpleNamespace(relname=b"learning_stats_changed", extra=p, be_pid=1) for p in payloads]
+
+    def consume_input(self):
+        pass
+
+    def notifies(self):
+        return self.queue.pop(0) if self.queue else None
+
+
+def test_notify_invalidates_only_the_named_key():
+    db = _FakeDB()
+    cache = LearningStatsCache(lambda: db, ttl=3600, flush_interval=3600, listen=False)
+    cache.get_stats("BTC-USDT", "cooldown")
+    cache.get_stats("ETH-USDT", "cooldown")
+    assert db.loads == 2
+
+    reader, writer = socket.socketpair()
+    writer.send(b"x")  # socket legível, como quando o servidor envia um NOTIFY
+    conn = SimpleNamespace(fileno=reader.fileno, pgconn=_FakePGconn([b"BTC-USDT\tcooldown"]))
+    assert cache._poll_notifies(conn, timeout=1.0) == 1
+
+    db.rows = [{"param_value": 1.0, "mean_reward": 0.9, "n": 3}]
+    assert cache.get_stats("BTC-USDT", "cooldown") == {1.0: (0.9, 3)}
+    assert cache.get_stats("ETH-USDT", "cooldown") == {1.0: (0.5, 2)}
+    assert db.loads == 3
+    reader.close()
+    writer.close()
+    cache.close()
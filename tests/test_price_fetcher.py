@@ -0,0 +1,39 @@
+import time
+
+from autocoinbot.price_fetcher import HedgedPriceFetcher
+
+
+def test_hedge_wins_when_first_request_hangs():
+    calls = []
+
+    def fetcher(symbol, timeout):
+        calls.append(timeout)
+        if len(calls) == 1:
+            time.sleep(0.5)
+            return None
+        return {"mid_price": 100.0}
+
+    pf = HedgedPriceFetcher(fetcher, budget=0.3)
+    started = time.monotonic()
+    ob = pf.fetch("BTC-USDT")
+    assert ob["mid_price"] == 100.0 and ob["stale"] is False
+    assert time.monotonic() - started < 0.3
+    assert pf.stats()["hedge_wins"] == 1
+
+
+def test_deadline_falls_back_to_last_price_marked_stale():
+    slow = {"on": False}
+
+    def fetcher(symbol, timeout):
+        if slow["on"]:
+            time.sleep(0.4)
+        return {"mid_price": 42.0}
+
+    pf = HedgedPriceFetcher(fetcher, budget=0.1)
+    assert pf.fetch("ETH-USDT")["stale"] is False
+    slow["on"] = True
+    started = time.monotonic()
+    ob = pf.fetch("ETH-USDT")
+    assert time.monotonic() - started < 0.2
+    assert ob["stale"] is True and ob["mid_price"] == 42.0
+    assert pf.fetch("ETH-USDT", allow_stale=False) is None
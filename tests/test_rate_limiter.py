@@ -0,0 +1,63 @@
+import threading
+import time
+
+from autocoinbot import rate_limiter
+
+
+def _limiter(tmp_path, quota=20):
+    return rate_limiter.TokenBucketLimiter(
+        state_path=str(tmp_path / "rl.bin"),
+        quotas={"public": quota, "spot": quota, "management": quota},
+        window=1.0,
+        safety=1.0,
+    )
+
+
+def test_endpoint_cost_uses_weight_table():
+    assert rate_limiter.endpoint_cost("/api/v1/market/orderbook/level1?symbol=BTC-USDT") == ("public", 2)
+    assert rate_limiter.endpoint_cost("/api/v1/orders", "POST") == ("spot", 2)
+    assert rate_limiter.endpoint_cost("/api/v1/accounts") == ("management", 5)
+    assert rate_limiter.endpoint_cost("https://api.kucoin.com/api/v1/fills?pageSize=200") == ("spot", 10)
+    assert rate_limiter.endpoint_cost(None) == ("public", 1)
+
+
+def test_non_blocking_acquire_does_not_overdraw(tmp_path):
+    lim = _limiter(tmp_path)
+    assert lim.acquire("public", 15, block=False)
+    assert not lim.acquire("public", 15, block=False)
+    assert lim.snapshot()["process"]["rejected"] == 1
+
+
+def test_threads_share_one_budget(tmp_path):
+    lim = _limiter(tmp_path)
+
+    def worker():
+        for _ in range(10):
+            lim.acquire("public", 1)
+
+    t0 = time.monotonic()
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    # 40 tokens, 20 de burst, reposição de 20/s -> ~1s
+    assert 0.8 <= time.monotonic() - t0 < 2.0
+
+
+def test_state_is_shared_through_file(tmp_path):
+    a = _limiter(tmp_path)
+    b = _limiter(tmp_path)
+    assert a.acquire("spot", 20, block=False)
+    assert not b.acquire("spot", 10, block=False)
+
+
+def test_429_penalizes_the_endpoint_pool(tmp_path, monkeypatch):
+    lim = _limiter(tmp_path)
+    monkeypatch.setattr(rate_limiter, "_LIMITER", lim)
+    seconds = rate_limiter.penalize_for("https://api.kucoin.com/api/v1/orders", "POST",
+                                        {"gw-ratelimit-reset": "500"})
+    assert seconds == 0.5
+    assert lim.snapshot()["spot"]["tokens"] < 0
+    assert not lim.acquire("spot", 1, block=False)
+    assert lim.acquire("public", 1, block=False)
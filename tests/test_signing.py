@@ -0,0 +1,30 @@
+import base64
+import hashlib
+import hmac
+
+import pytest
+
+from autocoinbot.signing import Signer
+
+
+def _b64(secret, msg):
+    return base64.b64encode(hmac.new(secret.encode(), msg.encode(), hashlib.sha256).digest()).decode()
+
+
+@pytest.mark.parametrize("secret", ["short-secret", "x" * 100])
+def test_matches_plain_hmac_for_v1_and_v2(secret):
+    ts = 1_700_000_000_123
+    for version in ("1", "2"):
+        h = Signer("key", secret, "pass", version).headers("post", "/api/v1/orders", '{"a":1}', ts)
+        assert h["KC-API-SIGN"] == _b64(secret, f'{ts}POST/api/v1/orders{{"a":1}}')
+        assert h["KC-API-TIMESTAMP"] == str(ts)
+        assert h["KC-API-PASSPHRASE"] == ("pass" if version == "1" else _b64(secret, "pass"))
+
+
+def test_batch_shares_timestamp_and_rejects_missing_credentials():
+    signer = Signer("key", "secret", "pass", "2")
+    batch = signer.headers_many([("GET", "/api/v1/accounts"), ("POST", "/api/v1/orders", "{}")], ts=5)
+    assert [h["KC-API-TIMESTAMP"] for h in batch] == ["5", "5"]
+    assert batch[1]["KC-API-SIGN"] == signer.headers("POST", "/api/v1/orders", "{}", ts=5)["KC-API-SIGN"]
+    with pytest.raises(ValueError):
+        Signer("key", "", "pass")
@@ -0,0 +1,32 @@
+from autocoinbot.symbol_rules import SymbolRule, SymbolRulesCache
+
+BTC = {"symbol": "BTC-USDT", "baseMinSize": "0.00001", "baseIncrement": "0.00000001",
+       "quoteMinSize": "0.1", "minFunds": "0.1", "priceIncrement": "0.1", "enableTrading": True}
+
+
+def test_prepare_size_rounds_down_and_rejects_below_minimum():
+    rule = SymbolRule.from_api(BTC)
+    size, reject = rule.prepare_size(0.123456789, price=60000)
+    assert size == 0.12345678 and reject is None
+    _, reject = rule.prepare_size(0.000009, price=60000)
+    assert "below the minimum" in reject
+    _, reject = rule.prepare_size(0.00001, price=5000)  # 0.05 USDT < minFunds
+    assert "below the minimum" in reject
+
+
+def test_cache_persists_and_serves_from_disk(tmp_path):
+    path = str(tmp_path / "rules.json")
+    calls = []
+    cache = SymbolRulesCache(lambda: calls.append(1) or [BTC], path=path)
+    assert cache.get("btc-usdt").base_min_size is not None
+    reloaded = SymbolRulesCache(lambda: calls.append(1) or [], path=path)
+    assert reloaded.get("BTC-USDT") == cache.get("BTC-USDT")
+    assert len(calls) == 1
+
+
+def test_failed_first_load_is_not_retried_on_every_order(tmp_path):
+    calls = []
+    cache = SymbolRulesCache(lambda: calls.append(1) or [], path=str(tmp_path / "rules.json"))
+    assert cache.get("BTC-USDT") is None
+    assert cache.get("BTC-USDT") is None
+    assert len(calls) == 1
@@ -0,0 +1,47 @@
+import threading
+import time
+
+from autocoinbot import ticker_board
+
+
+def _fetcher(calls, price=100.0, delay=0.1):
+    def fetch(symbol):
+        calls.append(symbol)
+        time.sleep(delay)
+        return {"mid_price": price}
+    return fetch
+
+
+def test_one_fetch_per_symbol_across_boards(tmp_path):
+    calls = []
+    # Instâncias separadas simulam processos distintos (fds e flocks próprios).
+    boards = [ticker_board.TickerBoard(_fetcher(calls), directory=str(tmp_path)) for _ in range(3)]
+    results = []
+
+    def reader(board):
+        results.append(board.get("BTC-USDT", max_age=5.0))
+
+    threads = [threading.Thread(target=reader, args=(boards[i % 3],)) for i in range(12)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert calls == ["BTC-USDT"]
+    assert all(r and r["mid_price"] == 100.0 for r in results)
+
+
+def test_stale_entry_served_within_bound_on_failure(tmp_path):
+    def failing(symbol):
+        raise RuntimeError("boom")
+
+    board = ticker_board.TickerBoard(failing, directory=str(tmp_path), max_stale=30.0)
+    board.publish("ETH-USDT", {"mid_price": 10.0, "stale": False, "age_s": 0.0})
+    time.sleep(0.05)
+    entry = board.get("ETH-USDT", max_age=0.01)
+    assert entry["mid_price"] == 10.0
+    assert entry["stale"] is True and entry["age_s"] >= 0.05
+    assert board.get("ETH-USDT", max_age=5.0)["stale"] is False
+
+    board.max_stale = 0.01
+    assert board.get("ETH-USDT", max_age=0.01) is None
@@ -0,0 +1,79 @@
+import time
+
+import pytest
+
+pytest.importorskip("websockets")
+
+from autocoinbot.ws_market import MarketFeed
+from autocoinbot.ws_stub_server import StubKucoinWS
+
+
+@pytest.fixture
+def stub():
+    server = StubKucoinWS(tick_interval=0.02).start()
+    yield server
+    server.stop()
+
+
+def _feed(stub, **kw):
+    kw.setdefault("reconnect_base", 0.05)
+    return MarketFeed(["BTC-USDT"], token_provider=stub.token_info, **kw).start()
+
+
+def test_ticks_arrive_and_wake_waiters(stub):
+    seen = []
+    feed = _feed(stub, on_tick=seen.append)
+    q = feed.subscribe_queue()
+    try:
+        first = feed.wait_for_tick("BTC-USDT", timeout=5)
+        assert first and first["mid_price"] > 0 and first["best_ask"] > first["best_bid"]
+        nxt = feed.wait_for_tick("BTC-USDT", after_seq=first["sequence"], timeout=5)
+        assert nxt["sequence"] > first["sequence"]
+        assert seen and q.qsize() > 0
+        assert feed.latest("btc-usdt", max_age=5) is not None
+    finally:
+        feed.stop()
+
+
+def test_reconnects_after_drop_and_flags_gap(stub):
+    gaps = []
+    feed = _feed(stub, on_gap=lambda sym, reason: gaps.append(reason))
+    try:
+        tick = feed.wait_for_tick("BTC-USDT", timeout=5)
+        stub.drop_all()
+        deadline = time.time() + 5
+        while stub.connections < 2 and time.time() < deadline:
+            time.sleep(0.02)
+        after = feed.wait_for_tick("BTC-USDT", after_seq=tick["sequence"], timeout=5)
+        assert stub.connections >= 2
+        assert feed.stats()["reconnects"] >= 1
+        assert after is not None and "reconnect" in gaps
+    finally:
+        feed.stop()
+
+
+def test_sequence_jump_is_reported(stub):
+    gaps = []
+    feed = _feed(stub, max_seq_gap=100, on_gap=lambda sym, reason: gaps.append(reason))
+    try:
+        tick = feed.wait_for_tick("BTC-USDT", timeout=5)
+        stub.skip_sequence(1000)
+        feed.wait_for_tick("BTC-USDT", after_seq=tick["sequence"] + 1000, timeout=5)
+        assert any(r.startswith("sequence") for r in gaps)
+    finally:
+        feed.stop()
+
+
+def test_heartbeat_timeout_forces_reconnect():
+    server = StubKucoinWS(tick_interval=0.02, ping_interval=0.1, ping_timeout=0.1,
+                          respond_pings=False).start()
+    feed = MarketFeed(["BTC-USDT"], token_provider=server.token_info, reconnect_base=0.05).start()
+    try:
+        deadline = time.time() + 5
+        while feed.stats()["heartbeat_timeouts"] == 0 and time.time() < deadline:
+            time.sleep(0.05)
+        assert feed.stats()["heartbeat_timeouts"] >= 1
+        assert server.pings >= 1
+    finally:
+        feed.stop()
+        server.stop()
@@ -0,0 +1,68 @@
+import time
+
+import pytest
+
+pytest.importorskip("websockets")
+
+from autocoinbot.ws_private import AccountStream, BALANCE_TOPIC, ORDERS_TOPIC
+from autocoinbot.ws_stub_server import StubKucoinWS
+
+
+@pytest.fixture
+def stub():
+    server = StubKucoinWS(tick_interval=0.05).start()
+    yield server
+    server.stop()
+
+
+def _stream(stub):
+    accounts = [{"type": "trade", "currency": "BTC", "balance": "1", "available": "0.5", "holds": "0.5"}]
+    orders = [{"id": "o1", "symbol": "BTC-USDT", "side": "sell", "type": "limit",
+               "price": "100", "size": "0.5", "dealSize": "0", "isActive": True}]
+    stream = AccountStream(token_provider=stub.token_info, seed_accounts=lambda: accounts,
+                           seed_orders=lambda: orders, reconnect_base=0.05).start()
+    deadline = time.time() + 5
+    while not stream.is_live() and time.time() < deadline:
+        time.sleep(0.02)
+    return stream
+
+
+def test_seed_then_events_update_state(stub):
+    stream = _stream(stub)
+    try:
+        assert stream.available("btc") == 0.5
+        assert [o["orderId"] for o in stream.open_orders("BTC-USDT")] == ["o1"]
+
+        stub.publish(BALANCE_TOPIC, "account.balance", {
+            "currency": "BTC", "total": "1", "available": "1", "hold": "0",
+            "relationEvent": "trade.hold", "time": str(int(time.time() * 1000) + 1000),
+        })
+        stub.publish(ORDERS_TOPIC, "orderChange", {
+            "orderId": "o1", "symbol": "BTC-USDT", "type": "canceled", "status": "done",
+            "ts": (int(time.time() * 1000) + 1000) * 1_000_000,
+        })
+        assert stream.wait_for_balance_change(5) or stream.available("BTC") == 1.0
+        deadline = time.time() + 5
+        while stream.open_orders() and time.time() < deadline:
+            time.sleep(0.02)
+        assert stream.available("BTC") == 1.0
+        assert stream.open_orders() == []
+        assert stream.balances("trade")[0]["holds"] == 0.0
+    finally:
+        stream.stop()
+
+
+def test_drop_marks_stream_not_live_until_reseeded(stub):
+    stream = _stream(stub)
+    try:
+        assert stream.is_live()
+        stub.drop_all()
+        deadline = time.time() + 5
+        while stream.stats()["reconnects"] == 0 and time.time() < deadline:
+            time.sleep(0.02)
+        while not stream.is_live() and time.time() < deadline:
+            time.sleep(0.02)
+        assert stream.stats()["seeds"] >= 2
+        assert stream.available("BTC") == 0.5
+    finally:
+        stream.stop()